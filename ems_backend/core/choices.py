@@ -19,4 +19,9 @@ class ApprovalType(models.TextChoices):
 class Decision(models.TextChoices):
     APPROVE = "Approved", "APPROVED"
     REJECT = "Rejected", "REJECTED"
-    WITHDRAW = "Withdrawn", "WITHDRAWN"
\ No newline at end of file
+    WITHDRAW = "Withdrawn", "WITHDRAWN"
+
+class OutboxState(models.TextChoices):
+    PENDING = "pending", "PENDING"
+    SENT = "sent", "SENT"
+    FAILED = "failed", "FAILED"
@@ -0,0 +1,107 @@
+import contextvars
+import hashlib
+import re
+import time
+from contextlib import contextmanager
+
+
+# Stats of the request being handled in this context; contextvars follow sync_to_async, so async views count too
+_current = contextvars.ContextVar('request_stats', default=None)
+
+IN_LIST = re.compile(r'\bIN \((?:%s, )*%s\)')
+LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+WHITESPACE = re.compile(r'\s+')
+
+
+class RequestStats:
+    __slots__ = ('queries', 'db_time', 'statements', 'timings', 'captured')
+
+    def __init__(self, capture=False):
+        self.queries = 0
+        self.db_time = 0.0
+        # SQL text -> executions; Django sends parameters separately, so the text already groups an N+1 loop
+        self.statements = {}
+        self.timings = {}
+        # (sql, seconds) of every query, only for requests sampled for a slow-request dump
+        self.captured = [] if capture else None
+
+    def add_time(self, name, seconds):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def duplicates(self, threshold):
+        # [(fingerprint, count, sql)] of statements run at least `threshold` times, worst first. Only repeated
+        # statements are normalized, which keeps this off the per-query path.
+        groups = {}
+        for sql, count in self.statements.items():
+            if count < 2:
+                continue
+            normalized = normalize_sql(sql)
+            total, _ = groups.get(normalized, (0, sql))
+            groups[normalized] = (total + count, sql)
+        found = [
+            (fingerprint(normalized), count, sql)
+            for normalized, (count, sql) in groups.items()
+            if count >= threshold
+        ]
+        return sorted(found, key=lambda item: -item[1])
+
+
+def normalize_sql(sql):
+    sql = IN_LIST.sub('IN (...)', sql)
+    sql = LITERAL.sub('?', sql)
+    return WHITESPACE.sub(' ', sql).strip()
+
+
+def fingerprint(normalized_sql):
+    return hashlib.md5(normalized_sql.encode()).hexdigest()[:12]
+
+
+def current_stats():
+    return _current.get()
+
+
+def start_request(capture=False):
+    stats = RequestStats(capture)
+    return stats, _current.set(stats)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    # Installed on every connection (see install_query_recorder); costs one context lookup outside requests
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        stats.queries += 1
+        stats.db_time += elapsed
+        stats.statements[sql] = stats.statements.get(sql, 0) + 1
+        if stats.captured is not None:
+            stats.captured.append((sql, elapsed))
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    # connection_created receiver; wrappers live on the connection, so each new connection gets one
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def timed(name):
+    # Adds the block's wall time to the current request under `name` (a Server-Timing metric)
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.add_time(name, time.perf_counter() - started)
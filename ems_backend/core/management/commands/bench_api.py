@@ -0,0 +1,343 @@
+import datetime
+import json
+import logging
+import re
+import statistics
+import time
+import tracemalloc
+from unittest import mock
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment,
+)
+from django.urls import URLPattern, URLResolver, get_resolver
+from rest_framework.test import APIClient
+from rest_framework.throttling import SimpleRateThrottle
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from users.models import User, Team, UserRole
+from leaves.models import LeaveType, LeaveAllocation, LeaveRequest, LeaveApproval, HolidayCalendar
+from leaves.seed import OrgSeeder
+from core.choices import ApprovalType, Decision
+
+
+PREFIXES = ('api/leaves/', 'api/users/')
+ROLES = ('HR', 'Team Lead', 'Employee')
+WRITE_METHODS = ('post', 'put', 'patch', 'delete')
+
+
+class Command(BaseCommand):
+    help = "Seed a throwaway org and record query count, latency and memory of every leaves/users route per role"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--teams', type=int, default=5, help="Teams in the synthetic org")
+        parser.add_argument('--employees', type=int, default=200, help="Employees in the synthetic org")
+        parser.add_argument('--years', type=int, default=1, help="Years of leave history")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed for the synthetic org")
+        parser.add_argument('--iterations', type=int, default=20, help="Timed requests per endpoint and role")
+        parser.add_argument('--warmup', type=int, default=2, help="Untimed requests before measuring")
+        parser.add_argument('--route', action='append', help="Only routes whose name or path contains this (repeatable)")
+        parser.add_argument('--baseline', help="JSON baseline to compare against (and to write with --save-baseline)")
+        parser.add_argument('--save-baseline', action='store_true', help="Write this run's numbers to --baseline")
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help="Allowed relative increase of p95 latency and memory over the baseline")
+        parser.add_argument('--query-tolerance', type=int, default=0, help="Allowed extra queries over the baseline")
+        parser.add_argument('--min-delta-ms', type=float, default=5.0,
+                            help="Latency increases smaller than this never count as regressions")
+        parser.add_argument('--min-delta-kb', type=float, default=32.0,
+                            help="Memory increases smaller than this never count as regressions")
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON")
+
+    def handle(self, *args, **options):
+        if options['save_baseline'] and not options['baseline']:
+            raise CommandError("--save-baseline needs --baseline PATH")
+
+        # Everything runs against a fresh test database, which is dropped afterwards
+        setup_test_environment(debug=False)
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            # Per-second throttle windows keep the throttle's cache work realistic without ever tripping it
+            rates = {scope: '1000000/s' for scope in SimpleRateThrottle.THROTTLE_RATES}
+            # Likewise no /metrics samples, request log lines or slow-request dumps from the synthetic traffic
+            quiet = override_settings(METRICS_ENABLED=False, SLOW_REQUEST_SAMPLE_RATE=0)
+            with mock.patch.dict(SimpleRateThrottle.THROTTLE_RATES, rates), quiet, \
+                    mock.patch.object(logging.getLogger('ems.requests'), 'disabled', True):
+                results = self.run_benchmarks(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        meta = {key: options[key] for key in ('teams', 'employees', 'years', 'seed', 'iterations')}
+        if options['json']:
+            self.stdout.write(json.dumps({'meta': meta, 'results': results}, indent=2))
+        else:
+            self.print_results(results)
+
+        if options['save_baseline']:
+            with open(options['baseline'], 'w', encoding='utf-8') as handle:
+                json.dump({'meta': meta, 'results': results}, handle, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {options['baseline']}"))
+        elif options['baseline']:
+            self.compare(results, meta, options)
+
+    def run_benchmarks(self, options):
+        self.stdout.write(f"Seeding {options['employees']} employees in {options['teams']} teams, {options['years']} year(s)")
+        seeder = OrgSeeder(
+            teams=options['teams'], employees=options['employees'], years=options['years'], seed=options['seed'],
+            prefix='bench',
+        )
+        seeder.run()
+        self.today = seeder.as_of
+
+        team = seeder.team_list[0]
+        actors = {
+            'HR': seeder.hr_users[0],
+            'Team Lead': User.objects.get(pk=team.team_lead_id),
+            'Employee': User.objects.filter(team=team, role__name='Employee').order_by('pk').first(),
+        }
+        self.clients = {}
+        for role, user in actors.items():
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}")
+            self.clients[role] = client
+
+        self.fixtures = self.build_fixtures(actors, team, seeder.leave_types[0])
+        results = {}
+        for name, route, view in self.routes(options['route']):
+            for method in self.allowed_methods(view):
+                for role in ROLES:
+                    call = self.build_call(name, route, view, method, role)
+                    if call is None:
+                        continue
+                    key = f"{method.upper()} /{route} [{role}]"
+                    results[key] = self.measure(self.clients[role], method, *call, options)
+        return results
+
+    def routes(self, only):
+        # (name, route with placeholders, view callback) for every pattern under the benchmarked prefixes
+        def walk(patterns, prefix):
+            for pattern in patterns:
+                if isinstance(pattern, URLResolver):
+                    yield from walk(pattern.url_patterns, prefix + str(pattern.pattern))
+                elif isinstance(pattern, URLPattern):
+                    yield pattern.name, prefix + str(pattern.pattern), pattern.callback
+
+        for name, route, view in walk(get_resolver().url_patterns, ''):
+            if not route.startswith(PREFIXES):
+                continue
+            if only and not any(fragment in (name or '') or fragment in route for fragment in only):
+                continue
+            yield name, route, view
+
+    def allowed_methods(self, view):
+        view_class = getattr(view, 'view_class', None)
+        if view_class is None:
+            return ['get']
+        return [method for method in ('get',) + WRITE_METHODS if hasattr(view_class, method)]
+
+    def build_fixtures(self, actors, team, leave_type):
+        # Requests owned by the benchmark employee, created through the API so their history is consistent
+        employee, lead = actors['Employee'], actors['Team Lead']
+        pending = [self.create_request(leave_type) for _ in range(3)]
+        approved = self.create_request(leave_type)
+        self.clients['Team Lead'].post(
+            f"/api/leaves/requests/{approved.pk}/approve/",
+            {'approval_type': ApprovalType.TEAM_LEAD, 'decision': Decision.APPROVE}, format='json',
+        )
+        self.clients['HR'].post(
+            f"/api/leaves/requests/{approved.pk}/approve/",
+            {'approval_type': ApprovalType.HR, 'decision': Decision.APPROVE}, format='json',
+        )
+        # A day the create scenario can book; found through a request that is rolled back again
+        with transaction.atomic():
+            free_day = self.create_request(leave_type).start_date
+            transaction.set_rollback(True)
+        holiday = HolidayCalendar.objects.create(name="Bench holiday", date=datetime.date(self.today.year + 10, 1, 1))
+        return {
+            'employee': employee,
+            'lead': lead,
+            'team': team,
+            'leave_type': leave_type,
+            'pending': pending,
+            'approved': approved,
+            'free_day': free_day,
+            'models': {
+                LeaveType: leave_type.pk,
+                HolidayCalendar: holiday.pk,
+                LeaveAllocation: LeaveAllocation.objects.filter(employee=employee).order_by('-valid_month').first().pk,
+                LeaveRequest: pending[0].pk,
+                LeaveApproval: LeaveApproval.objects.filter(leave_request=approved).first().pk,
+                UserRole: employee.role_id,
+                Team: team.pk,
+                User: employee.pk,
+            },
+        }
+
+    def create_request(self, leave_type):
+        # The first future working day the employee can still take leave on
+        day = self.today + datetime.timedelta(days=7)
+        for _ in range(120):
+            response = self.clients['Employee'].post('/api/leaves/requests/', {
+                'leave_type': leave_type.pk,
+                'start_date': day.isoformat(),
+                'end_date': day.isoformat(),
+                'reason': "Benchmark fixture",
+            }, format='json')
+            if response.status_code == 201:
+                return LeaveRequest.objects.get(pk=response.data['id'])
+            day += datetime.timedelta(days=1)
+        raise CommandError("Could not find a free day for the benchmark employee's fixture requests")
+
+    def build_call(self, name, route, view, method, role):
+        # (path, body, rolled_back) for one route/method/role, or None when there is nothing sensible to send
+        fixtures = self.fixtures
+        kwargs = {}
+        for placeholder in re.findall(r'<(?:\w+:)?(\w+)>', route):
+            if placeholder == 'pk':
+                kwargs['pk'] = self.sample_pk(name, view)
+            elif placeholder in ('employee_id', 'user_id'):
+                kwargs[placeholder] = fixtures['employee'].pk if placeholder == 'employee_id' else fixtures['lead'].pk
+            elif placeholder == 'team_id':
+                kwargs[placeholder] = fixtures['team'].pk
+            elif placeholder == 'leave_request_id':
+                kwargs[placeholder] = fixtures['approved'].pk
+        if None in kwargs.values():
+            return None
+        path = '/' + re.sub(r'<(?:\w+:)?(\w+)>', lambda match: str(kwargs[match.group(1)]), route)
+
+        if method == 'get':
+            if name == 'leave-calendar':
+                path += f"?from={self.today.replace(day=1).isoformat()}&to={(self.today.replace(day=1) + datetime.timedelta(days=27)).isoformat()}"
+            return path, None, False
+
+        body = self.write_body(name, method, role)
+        if body is None:
+            return None
+        return path, body, True
+
+    def sample_pk(self, name, view):
+        # Approval actions take a request in the right state; detail views any row of their model
+        if name == 'leave-approve':
+            return self.fixtures['pending'][0].pk
+        if name == 'leave-withdraw':
+            return self.fixtures['approved'].pk
+        queryset = getattr(getattr(view, 'view_class', None), 'queryset', None)
+        return self.fixtures['models'].get(queryset.model) if queryset is not None else None
+
+    def write_body(self, name, method, role):
+        # Writes run inside a rolled-back transaction, so each iteration sees the same starting state
+        fixtures = self.fixtures
+        if method != 'post':
+            return None
+        if name == 'leave-request-list-create' and role == 'Employee':
+            day = fixtures['free_day']
+            return {'leave_type': fixtures['leave_type'].pk, 'start_date': day.isoformat(),
+                    'end_date': day.isoformat(), 'reason': "Benchmark"}
+        if name == 'leave-approve' and role == 'Team Lead':
+            return {'approval_type': ApprovalType.TEAM_LEAD, 'decision': Decision.APPROVE}
+        if name == 'leave-bulk-approve' and role == 'Team Lead':
+            return {'ids': [request.pk for request in fixtures['pending']],
+                    'approval_type': ApprovalType.TEAM_LEAD, 'decision': Decision.APPROVE}
+        if name == 'leave-withdraw' and role == 'HR':
+            return {'notes': "Benchmark"}
+        if name == 'leave-allocation-bulk' and role == 'HR':
+            month = (self.today.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+            return {'valid_month': month.isoformat(), 'allocated_days': 2, 'overwrite': False}
+        if name == 'leave-type-list-create' and role == 'HR':
+            return {'name': "Bench leave"}
+        if name == 'team-list-create' and role == 'HR':
+            return {'name': "Bench team"}
+        if name == 'holiday-list-create' and role == 'HR':
+            return {'name': "Bench day off", 'date': datetime.date(self.today.year + 10, 6, 1).isoformat()}
+        return None
+
+    def send(self, client, method, path, body, rolled_back):
+        def call():
+            response = client.generic(
+                method.upper(), path, json.dumps(body) if body is not None else '', content_type='application/json',
+            )
+            # Streaming responses only run their queries while being consumed
+            if response.streaming:
+                b''.join(response.streaming_content)
+            return response
+
+        if not rolled_back:
+            return call()
+        with transaction.atomic():
+            response = call()
+            transaction.set_rollback(True)
+        return response
+
+    def measure(self, client, method, path, body, rolled_back, options):
+        for _ in range(options['warmup']):
+            self.send(client, method, path, body, rolled_back)
+
+        # Read the count straight away: the next request's request_started signal empties the query log
+        with CaptureQueriesContext(connection) as queries:
+            response = self.send(client, method, path, body, rolled_back)
+        query_count = len(queries.captured_queries)
+
+        tracemalloc.start()
+        self.send(client, method, path, body, rolled_back)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        timings = []
+        for _ in range(max(1, options['iterations'])):
+            started = time.perf_counter()
+            self.send(client, method, path, body, rolled_back)
+            timings.append((time.perf_counter() - started) * 1000)
+        quantiles = statistics.quantiles(timings, n=100) if len(timings) > 1 else timings * 99
+
+        return {
+            'status': response.status_code,
+            'queries': query_count,
+            'p50_ms': round(quantiles[49], 2),
+            'p95_ms': round(quantiles[94], 2),
+            'memory_kb': round(peak / 1024, 1),
+        }
+
+    def print_results(self, results):
+        width = max((len(key) for key in results), default=0)
+        self.stdout.write(f"{'endpoint'.ljust(width)}  status  queries   p50 ms   p95 ms   mem KB")
+        for key, result in results.items():
+            self.stdout.write(
+                f"{key.ljust(width)}  {result['status']:>6}  {result['queries']:>7}  {result['p50_ms']:>7}  "
+                f"{result['p95_ms']:>7}  {result['memory_kb']:>7}"
+            )
+
+    def compare(self, results, meta, options):
+        try:
+            with open(options['baseline'], encoding='utf-8') as handle:
+                baseline = json.load(handle)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read baseline {options['baseline']}: {e}")
+
+        if baseline.get('meta') != meta:
+            self.stdout.write(self.style.WARNING(f"Baseline was recorded with {baseline.get('meta')}, this run used {meta}"))
+
+        tolerance = options['tolerance']
+        regressions = []
+        for key, result in results.items():
+            base = baseline.get('results', {}).get(key)
+            if base is None:
+                self.stdout.write(self.style.WARNING(f"{key}: not in the baseline"))
+                continue
+            if result['status'] != base['status']:
+                regressions.append(f"{key}: status {base['status']} -> {result['status']}")
+            if result['queries'] > base['queries'] + options['query_tolerance']:
+                regressions.append(f"{key}: queries {base['queries']} -> {result['queries']}")
+            if (result['p95_ms'] > base['p95_ms'] * (1 + tolerance)
+                    and result['p95_ms'] - base['p95_ms'] > options['min_delta_ms']):
+                regressions.append(f"{key}: p95 {base['p95_ms']}ms -> {result['p95_ms']}ms")
+            if (result['memory_kb'] > base['memory_kb'] * (1 + tolerance)
+                    and result['memory_kb'] - base['memory_kb'] > options['min_delta_kb']):
+                regressions.append(f"{key}: memory {base['memory_kb']}KB -> {result['memory_kb']}KB")
+
+        for line in regressions:
+            self.stdout.write(self.style.ERROR(line))
+        if regressions:
+            raise CommandError(f"{len(regressions)} regression(s) against {options['baseline']}")
+        self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}"))
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import statistics
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+class Command(BaseCommand):
+    help = "Hit running servers with N concurrent clients and compare throughput/latency (e.g. WSGI vs ASGI)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', help="Absolute URLs to benchmark, typically one per server")
+        parser.add_argument('--user', help="Email of the user whose access token is sent (default: first superuser)")
+        parser.add_argument('--token', help="Access token to send instead of minting one for --user")
+        parser.add_argument('--concurrency', type=int, default=500, help="Concurrent clients")
+        parser.add_argument('--requests', type=int, default=5000, help="Requests per URL")
+        parser.add_argument('--timeout', type=float, default=30, help="Seconds before a request counts as an error")
+        parser.add_argument('--json', action='store_true', help="Print the results as JSON")
+
+    def handle(self, *args, **options):
+        headers = {'Authorization': f"Bearer {options['token'] or self.mint_token(options['user'])}"}
+        results = [
+            asyncio.run(self.run(url, headers, options['concurrency'], options['requests'], options['timeout']))
+            for url in options['urls']
+        ]
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for result in results:
+            self.stdout.write(
+                f"{result['url']}\n"
+                f"  {result['requests']} requests, {result['concurrency']} clients, {result['seconds']}s\n"
+                f"  {result['throughput']} req/s, p50 {result['p50_ms']}ms, p95 {result['p95_ms']}ms, p99 {result['p99_ms']}ms\n"
+                f"  statuses {result['statuses']}, errors {result['errors']}"
+            )
+
+    def mint_token(self, email):
+        User = get_user_model()
+        user = User.objects.filter(email=email).first() if email else User.objects.filter(is_superuser=True).first()
+        if user is None:
+            raise CommandError("No user to authenticate as; pass --user, --token or create a superuser")
+        return str(RefreshToken.for_user(user).access_token)
+
+    async def fetch(self, url, headers):
+        # One HTTP/1.1 request per connection, so sync and async servers are measured the same way
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        path = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+        lines = [f"GET {path} HTTP/1.1", f"Host: {parts.netloc}", "Connection: close"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+
+        reader, writer = await asyncio.open_connection(parts.hostname, port, ssl=True if parts.scheme == 'https' else None)
+        try:
+            writer.write(("\r\n".join(lines) + "\r\n\r\n").encode())
+            await writer.drain()
+            status_line = await reader.readline()
+            await reader.read()
+        finally:
+            writer.close()
+        return int(status_line.split()[1])
+
+    async def run(self, url, headers, concurrency, total, timeout):
+        pending = iter(range(total))
+        latencies, statuses = [], Counter()
+        errors = 0
+
+        async def client():
+            nonlocal errors
+            # Clients pull from the shared iterator until every request has been issued
+            for _ in pending:
+                started = time.perf_counter()
+                try:
+                    status = await asyncio.wait_for(self.fetch(url, headers), timeout)
+                except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+                statuses[status] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        seconds = time.perf_counter() - started
+
+        quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99 or [0] * 99
+        return {
+            'url': url,
+            'requests': total,
+            'concurrency': concurrency,
+            'seconds': round(seconds, 2),
+            'throughput': round(len(latencies) / seconds, 1) if seconds else 0,
+            'p50_ms': round(quantiles[49] * 1000, 1),
+            'p95_ms': round(quantiles[94] * 1000, 1),
+            'p99_ms': round(quantiles[98] * 1000, 1),
+            'statuses': dict(statuses),
+            'errors': errors,
+        }
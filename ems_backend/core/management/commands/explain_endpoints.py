@@ -0,0 +1,112 @@
+import re
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.urls import URLPattern, URLResolver, get_resolver
+from rest_framework import mixins
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+
+SQLITE_SCAN = re.compile(r'\bSCAN (?:TABLE )?(\w+)\b(?! USING (?:COVERING )?INDEX)')
+POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+DEFAULT_PREFIXES = ('api/users/', 'api/leaves/')
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the SQL behind every list endpoint and fail on sequential scans of large tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Email of the user to run the endpoints as (default: first superuser)")
+        parser.add_argument('--max-scan-rows', type=int, default=1000,
+                            help="Largest table allowed to be read by a sequential scan")
+        parser.add_argument('--prefix', action='append', default=None,
+                            help="URL prefix to inspect; repeatable (default: api/users/ and api/leaves/)")
+        parser.add_argument('--verbose-plans', action='store_true', help="Print the full plan of every endpoint")
+
+    def handle(self, *args, **options):
+        user = self.get_user(options['user'])
+        table_rows = {}
+        failures = []
+
+        prefixes = options['prefix'] or DEFAULT_PREFIXES
+        for route, view_class in self.list_endpoints(prefixes):
+            queryset = self.build_queryset(view_class, route, user)
+            if queryset is None:
+                continue
+
+            plan = queryset.explain()
+            scans = self.sequential_scans(plan)
+            large = []
+            for table in scans:
+                if table not in table_rows:
+                    table_rows[table] = self.count_rows(table)
+                if table_rows[table] > options['max_scan_rows']:
+                    large.append(f"{table} ({table_rows[table]} rows)")
+
+            if large:
+                failures.append(route)
+                self.stdout.write(self.style.ERROR(f"{route}: sequential scan on {', '.join(large)}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{route}: ok"))
+            if options['verbose_plans'] or large:
+                self.stdout.write(plan)
+
+        if failures:
+            raise CommandError(f"{len(failures)} endpoint(s) scan tables above {options['max_scan_rows']} rows")
+
+    def get_user(self, email):
+        User = get_user_model()
+        if email:
+            user = User.objects.filter(email=email).first()
+        else:
+            user = User.objects.filter(is_superuser=True).first()
+        if user is None:
+            raise CommandError("No user to run the endpoints as; pass --user or create a superuser")
+        return user
+
+    def list_endpoints(self, prefixes):
+        # Walk the URLconf and yield (route, view class) for every list view under the prefixes
+        def walk(patterns, prefix):
+            for pattern in patterns:
+                if isinstance(pattern, URLResolver):
+                    yield from walk(pattern.url_patterns, prefix + str(pattern.pattern))
+                elif isinstance(pattern, URLPattern):
+                    view_class = getattr(pattern.callback, 'view_class', None)
+                    if view_class and issubclass(view_class, mixins.ListModelMixin):
+                        yield prefix + str(pattern.pattern), view_class
+
+        for route, view_class in walk(get_resolver().url_patterns, ''):
+            if any(route.startswith(prefix) for prefix in prefixes):
+                yield route, view_class
+
+    def build_queryset(self, view_class, route, user):
+        # Build the same queryset the list endpoint would paginate, without rendering it
+        kwargs = {name: 1 for name in re.findall(r'<(?:\w+:)?(\w+)>', route)}
+        request = APIRequestFactory().get('/' + route)
+        force_authenticate(request, user=user)
+
+        view = view_class()
+        view.setup(request, **kwargs)
+        view.format_kwarg = None
+        view.request = view.initialize_request(request, **kwargs)
+        view.request.user = user
+        try:
+            queryset = view.filter_queryset(view.get_queryset())
+        except Exception as e:
+            self.stdout.write(self.style.WARNING(f"{route}: skipped ({e})"))
+            return None
+
+        page_size = getattr(view.paginator, 'page_size', None) or 10
+        return queryset[:page_size]
+
+    def sequential_scans(self, plan):
+        pattern = POSTGRES_SCAN if connection.vendor == 'postgresql' else SQLITE_SCAN
+        return set(pattern.findall(plan))
+
+    def count_rows(self, table):
+        for model in apps.get_models():
+            if model._meta.db_table == table:
+                return model._base_manager.count()
+        return 0
@@ -0,0 +1,225 @@
+import bisect
+import glob
+import json
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+
+from django.conf import settings
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf)
+HTTP_METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+# name -> (type, help); gauges are computed when /metrics is scraped
+METRICS = {
+    'ems_http_requests_total': ('counter', 'HTTP requests by URL name, method and status class'),
+    'ems_http_request_duration_seconds': ('histogram', 'Request latency by URL name and method'),
+    'ems_db_queries_total': ('counter', 'Database queries by URL name'),
+    'ems_leave_approvals_total': ('counter', 'Committed approval decisions by approval type and decision'),
+    'ems_cache_requests_total': ('counter', 'Cache lookups by cache and result'),
+    'ems_cache_hit_ratio': ('gauge', 'Hits over lookups per cache since the metrics directory was created'),
+    'ems_leave_requests_pending': ('gauge', 'Active leave requests waiting on a decision, by leave status'),
+}
+
+HEADER = struct.Struct('i')
+VALUE = struct.Struct('d')
+INITIAL_SIZE = 1 << 16
+
+
+def metrics_dir():
+    return getattr(settings, 'METRICS_DIR', '') or os.path.join(tempfile.gettempdir(), 'ems-metrics')
+
+
+def read_entries(data, used):
+    # Yields (key, value offset, value) from a metrics file's bytes
+    offset = 8
+    while offset < used:
+        length = HEADER.unpack_from(data, offset)[0]
+        key = bytes(data[offset + 4:offset + 4 + length]).decode()
+        position = offset + 4 + length
+        position += -position % 8
+        yield key, position, VALUE.unpack_from(data, position)[0]
+        offset = position + 8
+
+
+class MetricFile:
+    # One process's values, memory-mapped: [u32 bytes used][4 spare] then entries of
+    # [u32 key length][utf-8 key, padded to 8 bytes][f64 value]. Only the owning process writes to it, so
+    # workers never coordinate; /metrics sums every file in METRICS_DIR.
+
+    def __init__(self, path):
+        self.file = open(path, 'a+b')
+        if os.fstat(self.file.fileno()).st_size == 0:
+            self.file.truncate(INITIAL_SIZE)
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        self.used = HEADER.unpack_from(self.map, 0)[0] or 8
+        self.positions = {key: position for key, position, _ in read_entries(self.map, self.used)}
+
+    def add(self, key, amount):
+        position = self.positions.get(key)
+        if position is None:
+            position = self.allocate(key)
+        VALUE.pack_into(self.map, position, VALUE.unpack_from(self.map, position)[0] + amount)
+
+    def allocate(self, key):
+        encoded = key.encode()
+        position = self.used + 4 + len(encoded)
+        position += -position % 8
+        end = position + 8
+        if end > len(self.map):
+            size = max(len(self.map) * 2, end)
+            self.map.close()
+            self.file.truncate(size)
+            self.map = mmap.mmap(self.file.fileno(), size)
+
+        HEADER.pack_into(self.map, self.used, len(encoded))
+        self.map[self.used + 4:self.used + 4 + len(encoded)] = encoded
+        VALUE.pack_into(self.map, position, 0.0)
+        # Published last, so a concurrent reader never sees a half-written entry
+        self.used = end
+        HEADER.pack_into(self.map, 0, end)
+        self.positions[key] = position
+        return position
+
+
+class ProcessValues:
+    # The current process's MetricFile, reopened after a fork. The lock is per process and uncontended for sync
+    # workers; it only keeps threaded workers from losing increments.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pid = None
+        self.file = None
+        self.keys = {}
+
+    def add(self, name, labels, amount):
+        with self.lock:
+            if self.pid != os.getpid():
+                os.makedirs(metrics_dir(), exist_ok=True)
+                self.file = MetricFile(os.path.join(metrics_dir(), f"metrics_{os.getpid()}.db"))
+                self.pid = os.getpid()
+                self.keys = {}
+            key = self.keys.get((name, labels))
+            if key is None:
+                key = self.keys[(name, labels)] = json.dumps([name, labels])
+            self.file.add(key, amount)
+
+
+_values = ProcessValues()
+
+
+def metrics_enabled():
+    return getattr(settings, 'METRICS_ENABLED', True)
+
+
+def inc(name, amount=1, **labels):
+    if metrics_enabled():
+        _values.add(name, tuple(sorted(labels.items())), amount)
+
+
+def observe(name, value, buckets=LATENCY_BUCKETS, **labels):
+    # Buckets are stored per bucket and made cumulative when rendered
+    if not metrics_enabled():
+        return
+    labels = tuple(sorted(labels.items()))
+    bucket = buckets[min(bisect.bisect_left(buckets, value), len(buckets) - 1)]
+    _values.add(f"{name}_bucket", labels + (('le', format_le(bucket)),), 1)
+    _values.add(f"{name}_sum", labels, value)
+    _values.add(f"{name}_count", labels, 1)
+
+
+def format_le(bucket):
+    return '+Inf' if bucket == math.inf else repr(float(bucket))
+
+
+def record_request(request, response, elapsed, queries):
+    match = getattr(request, 'resolver_match', None)
+    route = (match.url_name or 'unnamed') if match else 'unmatched'
+    method = request.method if request.method in HTTP_METHODS else 'OTHER'
+    inc('ems_http_requests_total', route=route, method=method, status=f"{response.status_code // 100}xx")
+    observe('ems_http_request_duration_seconds', elapsed, route=route, method=method)
+    inc('ems_db_queries_total', queries, route=route)
+
+
+def record_cache(cache, hit):
+    inc('ems_cache_requests_total', cache=cache, result='hit' if hit else 'miss')
+
+
+def collect():
+    # {(name, labels): value} summed over every process file, including those of workers that have exited
+    totals = {}
+    for path in glob.glob(os.path.join(metrics_dir(), 'metrics_*.db')):
+        try:
+            with open(path, 'rb') as handle:
+                data = handle.read()
+        except OSError:
+            continue
+        if len(data) < 8:
+            continue
+        for key, _, value in read_entries(data, HEADER.unpack_from(data, 0)[0]):
+            name, labels = json.loads(key)
+            series = (name, tuple(tuple(pair) for pair in labels))
+            totals[series] = totals.get(series, 0.0) + value
+    return totals
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')) for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render(totals, gauges):
+    # Prometheus text format (0.0.4); gauges: {name: {labels: value}}
+    by_name = {}
+    for (name, labels), value in totals.items():
+        by_name.setdefault(name, {})[labels] = value
+
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        if kind == 'histogram':
+            lines += render_histogram(name, by_name)
+            continue
+        series = gauges.get(name) if kind == 'gauge' else by_name.get(name)
+        for labels, value in sorted((series or {}).items()):
+            lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def render_histogram(name, by_name):
+    lines = []
+    buckets = {}
+    for labels, value in by_name.get(f"{name}_bucket", {}).items():
+        base = tuple(pair for pair in labels if pair[0] != 'le')
+        buckets.setdefault(base, {})[dict(labels)['le']] = value
+
+    for base in sorted(buckets):
+        running = 0
+        for bucket in LATENCY_BUCKETS:
+            running += buckets[base].get(format_le(bucket), 0)
+            lines.append(f"{name}_bucket{format_labels(base + (('le', format_le(bucket)),))} {format_value(running)}")
+        lines.append(f"{name}_sum{format_labels(base)} {format_value(by_name.get(f'{name}_sum', {}).get(base, 0))}")
+        lines.append(f"{name}_count{format_labels(base)} {format_value(by_name.get(f'{name}_count', {}).get(base, 0))}")
+    return lines
+
+
+def cache_hit_ratios(totals):
+    lookups = {}
+    for (name, labels), value in totals.items():
+        if name == 'ems_cache_requests_total':
+            labels = dict(labels)
+            hits, total = lookups.get(labels['cache'], (0, 0))
+            lookups[labels['cache']] = (hits + (value if labels['result'] == 'hit' else 0), total + value)
+    return {(('cache', cache),): hits / total for cache, (hits, total) in lookups.items() if total}
@@ -0,0 +1,107 @@
+import json
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject, empty
+
+from core.instrumentation import start_request, end_request
+from core.metrics import record_request
+
+
+logger = logging.getLogger('ems.requests')
+slow_logger = logging.getLogger('ems.requests.slow')
+
+
+def request_user_id(request):
+    # Never resolves a lazy user here; that would cost a query after the response is built
+    user = getattr(request, 'user', None)
+    if isinstance(user, SimpleLazyObject):
+        user = None if user._wrapped is empty else user._wrapped
+    return getattr(user, 'pk', None)
+
+
+class RequestInstrumentationMiddleware:
+    # Counts queries, DB time, serializer time and repeated SQL (N+1) per request, reports them in a
+    # Server-Timing header and one JSON log line on the ems.requests logger, and dumps every query of a
+    # sampled request that turned out slow to ems.requests.slow, and feeds the per-route /metrics series.
+    # Keep it first in MIDDLEWARE.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = getattr(settings, 'SERVER_TIMING_HEADER', True)
+        self.duplicate_threshold = getattr(settings, 'REQUEST_DUPLICATE_QUERY_THRESHOLD', 5)
+        self.slow_ms = getattr(settings, 'SLOW_REQUEST_MS', 1000)
+        self.sample_rate = getattr(settings, 'SLOW_REQUEST_SAMPLE_RATE', 0.01)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        stats, token = start_request(self.sample())
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            end_request(token)
+        return self.finish(request, response, stats, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        stats, token = start_request(self.sample())
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_request(token)
+        return self.finish(request, response, stats, time.perf_counter() - started)
+
+    def sample(self):
+        # Only sampled requests keep their full query list, so a slow one can be dumped afterwards
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def finish(self, request, response, stats, elapsed):
+        record_request(request, response, elapsed, stats.queries)
+        duplicates = stats.duplicates(self.duplicate_threshold)
+        serialize = stats.timings.get('serialize', 0.0)
+
+        if self.server_timing:
+            metrics = [
+                f"total;dur={elapsed * 1000:.1f}",
+                f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries"',
+            ]
+            metrics += [f"{name};dur={seconds * 1000:.1f}" for name, seconds in stats.timings.items()]
+            if duplicates:
+                metrics.append(f'dup;desc="{duplicates[0][1]}x {duplicates[0][0]}"')
+            response['Server-Timing'] = ', '.join(metrics)
+
+        slow = stats.captured is not None and elapsed * 1000 >= self.slow_ms
+        if not (slow or logger.isEnabledFor(logging.INFO)):
+            return response
+
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'user': request_user_id(request),
+            'duration_ms': round(elapsed * 1000, 1),
+            'db_ms': round(stats.db_time * 1000, 1),
+            'queries': stats.queries,
+            'serialize_ms': round(serialize * 1000, 1),
+            'duplicates': [
+                {'fingerprint': key, 'count': count, 'sql': sql[:200]} for key, count, sql in duplicates[:3]
+            ],
+        }
+        logger.info(json.dumps(record))
+        if slow:
+            # SQL and timings only; parameters can carry personal data or password hashes
+            record['query_log'] = [
+                {'sql': sql, 'ms': round(seconds * 1000, 2)} for sql, seconds in stats.captured
+            ]
+            slow_logger.warning(json.dumps(record))
+        return response
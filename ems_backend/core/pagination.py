@@ -0,0 +1,262 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+async def afetch(queryset, chunk_size):
+    # aiterator() only honours prefetch_related() when given a chunk size
+    return [row async for row in queryset.aiterator(chunk_size=max(chunk_size, 1))]
+
+
+class EMSPagination(PageNumberPagination):
+    """
+    Page-number pagination with two opt-ins:
+
+    - ``?pagination=cursor`` (then ``?cursor=<token>``) switches to keyset pagination on
+      the list's ordering field plus ``id``, so deep pages cost the same as the first one.
+    - ``?count=false`` skips the ``COUNT(*)`` in either mode.
+
+    Async views call ``apaginate_queryset``, which builds the same pages with ``acount()``/``aiterator()``.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    mode_query_param = 'pagination'
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.count = None
+
+        if self.use_keyset(request):
+            self.mode = 'keyset'
+            if self.include_count(request):
+                self.count = queryset.count()
+            return self.paginate_keyset(queryset, request)
+
+        if self.include_count(request):
+            self.mode = 'page'
+            return super().paginate_queryset(queryset, request, view)
+
+        self.mode = 'page_without_count'
+        return self.paginate_without_count(queryset, request)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.count = None
+
+        if self.use_keyset(request):
+            self.mode = 'keyset'
+            if self.include_count(request):
+                self.count = await queryset.acount()
+            queryset, page_size, cursor = self.keyset_queryset(queryset, request)
+            return self.finish_keyset(await afetch(queryset, page_size + 1), page_size, cursor)
+
+        if self.include_count(request):
+            self.mode = 'page'
+            return await self.apaginate_page_numbers(queryset, request)
+
+        self.mode = 'page_without_count'
+        queryset, page_size = self.page_without_count_queryset(queryset, request)
+        return self.finish_page_without_count(await afetch(queryset, page_size + 1), page_size)
+
+    async def apaginate_page_numbers(self, queryset, request):
+        # PageNumberPagination.paginate_queryset with the count and the page read asynchronously
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()  # shadows the cached_property, so no sync COUNT(*)
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        self.page.object_list = await afetch(self.page.object_list, page_size)
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        return list(self.page)
+
+    def use_keyset(self, request):
+        return (
+            self.cursor_query_param in request.query_params
+            or request.query_params.get(self.mode_query_param) == 'cursor'
+        )
+
+    def include_count(self, request):
+        return request.query_params.get(self.count_query_param, 'true').lower() not in ('false', '0', 'no')
+
+    def get_paginated_response(self, data):
+        if self.mode == 'page':
+            return super().get_paginated_response(data)
+
+        payload = OrderedDict()
+        if self.count is not None:
+            payload['count'] = self.count
+        payload['next'] = self.get_next_link()
+        payload['previous'] = self.get_previous_link()
+        payload['results'] = data
+        return Response(payload)
+
+    def get_next_link(self):
+        if self.mode == 'page':
+            return super().get_next_link()
+        if self.mode == 'keyset':
+            return self.encode_cursor(self.next_position, reverse=False)
+        if not self.has_next:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.mode == 'page':
+            return super().get_previous_link()
+        if self.mode == 'keyset':
+            return self.encode_cursor(self.previous_position, reverse=True)
+        if self.page_number <= 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.page_number - 1)
+
+    # Page numbers without COUNT(*)
+
+    def paginate_without_count(self, queryset, request):
+        queryset, page_size = self.page_without_count_queryset(queryset, request)
+        return self.finish_page_without_count(list(queryset), page_size)
+
+    def page_without_count_queryset(self, queryset, request):
+        # The page plus one row, which tells whether there is a next page
+        page_size = self.get_page_size(request) or self.page_size
+        try:
+            self.page_number = int(request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            self.page_number = 0
+        if self.page_number < 1:
+            raise NotFound(self.invalid_page_message.format(page_number=self.page_number, message=''))
+
+        offset = (self.page_number - 1) * page_size
+        return queryset[offset:offset + page_size + 1], page_size
+
+    def finish_page_without_count(self, rows, page_size):
+        self.has_next = len(rows) > page_size
+        return rows[:page_size]
+
+    # Keyset pagination
+
+    def get_keyset_ordering(self, queryset):
+        # First ordering term of the list, tie-broken by primary key in the same direction.
+        # Returns (name, field, descending); name may be a concrete column or a SQL annotation.
+        model = queryset.model
+        pk = model._meta.pk
+        ordering = list(queryset.query.order_by) or list(model._meta.ordering) or ['-pk']
+        term = ordering[0] if isinstance(ordering[0], str) else '-pk'
+        descending = term.startswith('-')
+        field_name = term.lstrip('-')
+
+        if field_name in ('pk', pk.name):
+            return pk.name, pk, descending
+        annotation = queryset.query.annotations.get(field_name)
+        if annotation is not None:
+            return field_name, annotation.output_field, descending
+        try:
+            field = model._meta.get_field(field_name)
+        except FieldDoesNotExist:
+            return pk.name, pk, descending
+        if not field.concrete or field.is_relation:
+            return pk.name, pk, descending
+        return field.name, field, descending
+
+    def paginate_keyset(self, queryset, request):
+        queryset, page_size, cursor = self.keyset_queryset(queryset, request)
+        return self.finish_keyset(list(queryset), page_size, cursor)
+
+    def keyset_queryset(self, queryset, request):
+        # The page plus one row in keyset order, and the decoded cursor
+        page_size = self.get_page_size(request) or self.page_size
+        name, field, descending = self.get_keyset_ordering(queryset)
+        self.keyset_name = name
+        pk_name = queryset.model._meta.pk.name
+
+        cursor = self.decode_cursor(request, name, field)
+        reverse = cursor['reverse'] if cursor else False
+        backwards = descending != reverse
+
+        if cursor:
+            queryset = queryset.filter(self.keyset_filter(name, pk_name, cursor, backwards))
+
+        prefix = '-' if backwards else ''
+        order_by = [prefix + name]
+        if name != pk_name:
+            order_by.append(prefix + pk_name)
+
+        # The position is annotated so it survives serializer-driven only() deferral
+        queryset = queryset.annotate(keyset_position=F(name))
+        return queryset.order_by(*order_by)[:page_size + 1], page_size, cursor
+
+    def finish_keyset(self, rows, page_size, cursor):
+        reverse = cursor['reverse'] if cursor else False
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        has_next = has_more if not reverse else cursor is not None
+        has_previous = cursor is not None if not reverse else has_more
+        self.next_position = rows[-1] if rows and has_next else None
+        self.previous_position = rows[0] if rows and has_previous else None
+        return rows
+
+    def keyset_filter(self, name, pk_name, cursor, backwards):
+        op = 'lt' if backwards else 'gt'
+        if name == pk_name:
+            return Q(**{f'{pk_name}__{op}': cursor['pk']})
+        return Q(**{f'{name}__{op}': cursor['value']}) | Q(
+            **{name: cursor['value'], f'{pk_name}__{op}': cursor['pk']}
+        )
+
+    def encode_cursor(self, row, reverse):
+        if row is None:
+            return None
+        payload = {
+            'f': self.keyset_name,
+            'v': self.position_to_string(row.keyset_position),
+            'pk': row.pk,
+            'r': reverse,
+        }
+        token = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+        url = remove_query_param(self.request.build_absolute_uri(), self.mode_query_param)
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def position_to_string(self, value):
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return str(value)
+
+    def decode_cursor(self, request, name, field):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+            if payload['f'] != name:
+                raise ValueError('cursor was issued for a different ordering')
+            return {
+                'value': field.to_python(payload['v']),
+                'pk': int(payload['pk']),
+                'reverse': bool(payload['r']),
+            }
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
@@ -1,9 +1,33 @@
 from rest_framework import permissions
 from core.choices import Status
+from core.principal import get_principal, aget_principal
+from core.policies import EVERYTHING, NOTHING, Match, any_of
+
+
+READ = ("list", "retrieve")
+WRITE = ("update", "partial_update")
 
 
 def get_user_role_name(user):
-    return getattr(getattr(user, "role", None), "name", None)
+    principal = get_principal(user)
+    return principal.role_name if principal else None
+
+
+def get_user_team_id(user):
+    principal = get_principal(user)
+    return principal.team_id if principal else None
+
+
+async def acheck_permissions(request, view):
+    # Async views: once the principal is loaded every check below is in-memory, so it is safe on the event loop
+    await aget_principal(request.user)
+    for permission in view.get_permissions():
+        if not permission.has_permission(request, view):
+            view.permission_denied(
+                request,
+                message=getattr(permission, "message", None),
+                code=getattr(permission, "code", None),
+            )
 
 
 def get_action(request, view):
@@ -20,6 +44,37 @@ def get_action(request, view):
     return None
 
 
+class PolicyPermission(permissions.BasePermission):
+    # Object rules declared once, per role, as (actions, rule) grants (see core.policies). scope() filters list
+    # querysets with the rules granting "list"; has_object_permission() evaluates the same rules on the loaded
+    # object. Superusers and unrestricted_roles pass everything.
+    unrestricted_roles = ("HR",)
+    grants = {}
+
+    def rule_for(self, principal, action):
+        if principal is None:
+            return NOTHING
+        if principal.is_superuser or principal.role_name in self.unrestricted_roles:
+            return EVERYTHING
+        return any_of(rule for actions, rule in self.grants.get(principal.role_name, ()) if action in actions)
+
+    def related_paths(self):
+        # Relations the in-memory checks walk; select them on anything passed to has_object_permission()
+        return set().union(*(rule.related_paths() for grants in self.grants.values() for _, rule in grants))
+
+    def scope(self, request, queryset):
+        principal = get_principal(request.user)
+        rule = self.rule_for(principal, "list")
+        return queryset if rule is EVERYTHING else queryset.filter(rule.q(principal))
+
+    def allows(self, request, obj, action):
+        principal = get_principal(request.user)
+        return self.rule_for(principal, action).check(principal, obj)
+
+    def has_object_permission(self, request, view, obj):
+        return self.allows(request, obj, get_action(request, view))
+
+
 class IsHR(permissions.BasePermission):
     def has_permission(self, request, view):
         return (
@@ -49,19 +104,20 @@ class IsEmployee(permissions.BasePermission):
 
 class IsTeamLeadOfEmployee(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
+        led_team_ids = get_principal(request.user).led_team_ids
         if hasattr(obj, "team"):
-            return obj.team and obj.team.team_lead == request.user
+            return obj.team_id in led_team_ids
         elif hasattr(obj, "employee"):
-            return obj.employee.team and obj.employee.team.team_lead == request.user
+            return obj.employee.team_id in led_team_ids
         return False
     
 
 class IsOwner(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         if hasattr(obj, "employee"):
-            return obj.employee == request.user
+            return obj.employee_id == request.user.pk
         elif hasattr(obj, "user"):
-            return obj.user == request.user
+            return obj.user_id == request.user.pk
         return obj == request.user
 
 
@@ -95,9 +151,7 @@ class UserPermissions(permissions.BasePermission):
 
         if role == "HR":
             return True
-        if role == "Team Lead" and getattr(obj, "team", None) == getattr(
-            request.user, "team", None
-        ):
+        if role == "Team Lead" and getattr(obj, "team_id", None) == get_user_team_id(request.user):
             return action == "retrieve"
         if role == "Employee" and obj == request.user:
             return action in ["retrieve", "update", "partial_update"]
@@ -155,14 +209,23 @@ class LeaveAllocationPermissions(permissions.BasePermission):
         role = get_user_role_name(request.user)
         action = get_action(request, view)
 
-        if role == "Employee" and obj.employee == request.user:
+        if role == "Employee" and obj.employee_id == request.user.pk:
             return action == "retrieve"
 
         return False
 
 
 
-class LeaveRequestPermissions(permissions.BasePermission):
+class LeaveRequestPermissions(PolicyPermission):
+    # Team Leads read their team's requests and may act on any but their own; employees read their own
+    grants = {
+        "Team Lead": [
+            (READ, Match("employee__team_id", "team_id")),
+            (WRITE, Match("employee__team_id", "team_id") & ~Match("employee_id", "user_id")),
+        ],
+        "Employee": [(READ, Match("employee_id", "user_id"))],
+    }
+
     def has_permission(self, request, view):
         if not request.user or not request.user.is_authenticated:
             return False
@@ -183,30 +246,17 @@ class LeaveRequestPermissions(permissions.BasePermission):
 
         return False
 
-    def has_object_permission(self, request, view, obj):
-        if request.user.is_superuser or get_user_role_name(request.user) == "HR":
-            return True
-
-        role = get_user_role_name(request.user)
-        action = get_action(request, view)
-
-        # Team Lead can approve/reject requests from their team members
-        if (
-            role == "Team Lead"
-            and obj.employee.team == getattr(request.user, "team", None)
-            and obj.employee != request.user
-        ):
-            return action in ["retrieve", "update", "partial_update"]
-
-        # Employees can only view their own requests
-        if role == "Employee" and obj.employee == request.user:
-            return action in ["retrieve", "list"]
-
-        return False
-    
 
+class LeaveApprovalPermissions(PolicyPermission):
+    # Same shape as LeaveRequestPermissions, through the approval's leave request
+    grants = {
+        "Team Lead": [
+            (READ, Match("leave_request__employee__team_id", "team_id")),
+            (WRITE, Match("leave_request__employee__team_id", "team_id") & ~Match("leave_request__employee_id", "user_id")),
+        ],
+        "Employee": [(READ, Match("leave_request__employee_id", "user_id"))],
+    }
 
-class LeaveApprovalPermissions(permissions.BasePermission):
     def has_permission(self, request, view):
         if not request.user or not request.user.is_authenticated:
             return False
@@ -226,24 +276,40 @@ class LeaveApprovalPermissions(permissions.BasePermission):
 
         return False
 
-    def has_object_permission(self, request, view, obj):
-        if request.user.is_superuser or get_user_role_name(request.user) == "HR":
+
+class LeaveBalancePermissions(permissions.BasePermission):
+    # Read-only; rows are scoped by role in the view
+    def has_permission(self, request, view):
+        if not request.user or not request.user.is_authenticated:
+            return False
+
+        if request.user.is_superuser:
             return True
 
         role = get_user_role_name(request.user)
-        action = get_action(request, view)
+        return request.method in permissions.SAFE_METHODS and role in ["HR", "Team Lead", "Employee"]
 
-        # Team Lead can manage approvals for their team members' requests
-        if (
-            role == "Team Lead"
-            and obj.leave_request.employee.team == getattr(request.user, "team", None)
-            and obj.leave_request.employee != request.user
-        ):
-            return action in ["retrieve", "update", "partial_update"]
 
-        # Employees can only view approvals for their own requests
-        if role == "Employee" and obj.leave_request.employee == request.user:
-            return action == "retrieve"
+class LeaveCalendarPermissions(permissions.BasePermission):
+    # Team availability is for the people approving leave
+    def has_permission(self, request, view):
+        if not request.user or not request.user.is_authenticated:
+            return False
 
-        return False
+        if request.user.is_superuser:
+            return True
+
+        role = get_user_role_name(request.user)
+        return request.method in permissions.SAFE_METHODS and role in ["HR", "Team Lead"]
+
+
+class HolidayPermissions(permissions.BasePermission):
+    # Everyone can read the holiday calendar; only HR maintains it
+    def has_permission(self, request, view):
+        if not request.user or not request.user.is_authenticated:
+            return False
+
+        if request.user.is_superuser or request.method in permissions.SAFE_METHODS:
+            return True
 
+        return get_user_role_name(request.user) == "HR"
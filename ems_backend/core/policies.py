@@ -0,0 +1,120 @@
+from django.db.models import Q
+
+
+# Object rules for the permission classes. A rule compiles two ways from one definition: to a Q filter that
+# scopes list querysets, and to an in-memory check for an object that is already loaded. The check only walks
+# the relations in related_paths(), so selecting those keeps object permission checks free of queries.
+
+class Rule:
+    def q(self, principal):
+        raise NotImplementedError
+
+    def check(self, principal, obj):
+        raise NotImplementedError
+
+    def related_paths(self):
+        return set()
+
+    def __and__(self, other):
+        return AllOf(self, other)
+
+    def __or__(self, other):
+        return AnyOf(self, other)
+
+    def __invert__(self):
+        return Not(self)
+
+
+class Everything(Rule):
+    def q(self, principal):
+        return Q()
+
+    def check(self, principal, obj):
+        return True
+
+
+class Nothing(Rule):
+    def q(self, principal):
+        return Q(pk__in=[])
+
+    def check(self, principal, obj):
+        return False
+
+
+class Match(Rule):
+    # `path` (an ORM lookup such as 'leave_request__employee__team_id') equals an attribute of the principal.
+    # A principal without that attribute (a team lead with no team) matches nothing rather than every NULL.
+    def __init__(self, path, principal_attr):
+        self.path = path
+        self.attrs = path.split('__')
+        self.principal_attr = principal_attr
+
+    def q(self, principal):
+        value = getattr(principal, self.principal_attr)
+        return Q(pk__in=[]) if value is None else Q(**{self.path: value})
+
+    def check(self, principal, obj):
+        value = getattr(principal, self.principal_attr)
+        if value is None:
+            return False
+        for attr in self.attrs:
+            obj = getattr(obj, attr)
+            if obj is None:
+                return False
+        return obj == value
+
+    def related_paths(self):
+        return {'__'.join(self.attrs[:-1])} if len(self.attrs) > 1 else set()
+
+
+class AllOf(Rule):
+    def __init__(self, *rules):
+        self.rules = rules
+
+    def q(self, principal):
+        q = Q()
+        for rule in self.rules:
+            q &= rule.q(principal)
+        return q
+
+    def check(self, principal, obj):
+        return all(rule.check(principal, obj) for rule in self.rules)
+
+    def related_paths(self):
+        return set().union(*(rule.related_paths() for rule in self.rules))
+
+
+class AnyOf(AllOf):
+    def q(self, principal):
+        q = self.rules[0].q(principal)
+        for rule in self.rules[1:]:
+            q |= rule.q(principal)
+        return q
+
+    def check(self, principal, obj):
+        return any(rule.check(principal, obj) for rule in self.rules)
+
+
+class Not(Rule):
+    def __init__(self, rule):
+        self.rule = rule
+
+    def q(self, principal):
+        return ~self.rule.q(principal)
+
+    def check(self, principal, obj):
+        return not self.rule.check(principal, obj)
+
+    def related_paths(self):
+        return self.rule.related_paths()
+
+
+EVERYTHING = Everything()
+NOTHING = Nothing()
+
+
+def any_of(rules):
+    rules = list(rules)
+    if not rules:
+        return NOTHING
+    return rules[0] if len(rules) == 1 else AnyOf(*rules)
@@ -0,0 +1,123 @@
+import time
+from dataclasses import dataclass
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core.metrics import record_cache
+
+
+PRINCIPAL_CACHE_PREFIX = "principal"
+PRINCIPAL_VERSION_KEY = "principal:version"
+
+
+@dataclass(frozen=True)
+class Principal:
+    # Role/team facts the permission layer needs, resolved once per request
+    user_id: int
+    role_name: str
+    team_id: int
+    led_team_ids: frozenset
+    is_superuser: bool
+
+    def to_cache(self):
+        return (self.user_id, self.role_name, self.team_id, tuple(self.led_team_ids), self.is_superuser)
+
+    @classmethod
+    def from_cache(cls, value):
+        user_id, role_name, team_id, led_team_ids, is_superuser = value
+        return cls(user_id, role_name, team_id, frozenset(led_team_ids), is_superuser)
+
+
+def _cache_timeout():
+    return getattr(settings, "PRINCIPAL_CACHE_TIMEOUT", 300)
+
+
+def _get_version():
+    # Role/team edits bump a shared version instead of hunting down every affected key
+    version = cache.get(PRINCIPAL_VERSION_KEY)
+    if version is None:
+        # Clock-seeded so an evicted key never brings back principals cached under an older version
+        cache.add(PRINCIPAL_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(PRINCIPAL_VERSION_KEY)
+    return version
+
+
+def _cache_key(user_id):
+    return f"{PRINCIPAL_CACHE_PREFIX}:{_get_version()}:{user_id}"
+
+
+def build_principal(user):
+    # Expects role/team to be select_related; led teams are the only extra lookup
+    from users.models import Team
+
+    role = getattr(user, "role", None)
+    led_team_ids = Team.objects.filter(team_lead_id=user.pk).values_list("id", flat=True)
+    return Principal(
+        user_id=user.pk,
+        role_name=getattr(role, "name", None),
+        team_id=user.team_id,
+        led_team_ids=frozenset(led_team_ids),
+        is_superuser=user.is_superuser,
+    )
+
+
+def load_principal(user):
+    # Shared cache first, then the database
+    key = _cache_key(user.pk)
+    cached = cache.get(key)
+    record_cache('principals', cached is not None)
+    if cached is not None:
+        return Principal.from_cache(cached)
+
+    principal = build_principal(user)
+    cache.set(key, principal.to_cache(), _cache_timeout())
+    return principal
+
+
+def get_principal(user):
+    # Memoized on the user object, which lives exactly as long as the request
+    if not user or not user.is_authenticated:
+        return None
+
+    principal = getattr(user, "_principal", None)
+    if principal is None:
+        principal = load_principal(user)
+        user._principal = principal
+    return principal
+
+
+async def aget_principal(user):
+    # Async views: the cache/database lookup runs in a worker thread, then memoizes like get_principal
+    if not user or not user.is_authenticated:
+        return None
+
+    principal = getattr(user, "_principal", None)
+    if principal is None:
+        principal = await sync_to_async(load_principal)(user)
+        user._principal = principal
+    return principal
+
+
+def _delete_principal(user_id):
+    cache.delete(_cache_key(user_id))
+
+
+def _bump_version():
+    try:
+        cache.incr(PRINCIPAL_VERSION_KEY)
+    except ValueError:
+        cache.set(PRINCIPAL_VERSION_KEY, time.time_ns(), None)
+
+
+def invalidate_principal(user_id):
+    # Now and again after commit, so a request racing the transaction can't re-cache the old role/team
+    _delete_principal(user_id)
+    transaction.on_commit(lambda: _delete_principal(user_id))
+
+
+def invalidate_all_principals():
+    _bump_version()
+    transaction.on_commit(_bump_version)
@@ -0,0 +1,100 @@
+import copy
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core.metrics import record_cache
+
+
+REFERENCE_VERSION_PREFIX = "reference"
+
+# Per-process tables of small lookup models (leave types, roles, teams): label -> ReferenceTable.
+# Each table remembers the shared version it was loaded at and is rebuilt once that version moves.
+_tables = {}
+
+
+class ReferenceTable:
+    def __init__(self, model, version):
+        self.version = version
+        self.checked_at = time.monotonic()
+        self.by_id = {}
+        self.by_name = {}
+        for row in model._default_manager.all():
+            self.by_id[row.pk] = row
+            name = getattr(row, 'name', None)
+            if name:
+                self.by_name[name.strip().lower()] = row
+
+
+def _check_interval():
+    return getattr(settings, 'REFERENCE_DATA_CHECK_INTERVAL', 5)
+
+
+def _version_key(label):
+    return f"{REFERENCE_VERSION_PREFIX}:{label}:version"
+
+
+def _shared_version(label):
+    key = _version_key(label)
+    version = cache.get(key)
+    if version is None:
+        # Clock-seeded so an evicted key never reuses a version some process already loaded at
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(label):
+    try:
+        cache.incr(_version_key(label))
+    except ValueError:
+        cache.set(_version_key(label), time.time_ns(), None)
+
+
+def reference_table(model):
+    # The shared version is re-read at most every few seconds, so lookups normally never leave the process
+    label = model._meta.label_lower
+    table = _tables.get(label)
+    now = time.monotonic()
+    if table is not None and now - table.checked_at < _check_interval():
+        record_cache('reference', True)
+        return table
+
+    version = _shared_version(label)
+    stale = table is None or table.version != version
+    record_cache('reference', not stale)
+    if stale:
+        table = _tables[label] = ReferenceTable(model, version)
+    table.checked_at = now
+    return table
+
+
+def get_reference(model, pk):
+    # A copy, so callers can't mutate the shared row; a miss falls back to the database in case another
+    # process created the row since our last version check
+    row = reference_table(model).by_id.get(pk)
+    if row is None:
+        row = model._default_manager.filter(pk=pk).first()
+        if row is not None:
+            _tables.pop(model._meta.label_lower, None)
+    return copy.copy(row) if row is not None else None
+
+
+def get_reference_by_name(model, name):
+    row = reference_table(model).by_name.get(name.strip().lower())
+    return copy.copy(row) if row is not None else None
+
+
+def reference_rows(model):
+    return [copy.copy(row) for row in reference_table(model).by_id.values()]
+
+
+def invalidate_reference(model):
+    # Drop this process's table now; other processes see the bump on their next check. Bumping again after
+    # commit catches readers that reloaded while the write was still uncommitted.
+    label = model._meta.label_lower
+    _tables.pop(label, None)
+    _bump(label)
+    transaction.on_commit(lambda: _bump(label))
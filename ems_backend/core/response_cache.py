@@ -0,0 +1,59 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+RESPONSE_CACHE_PREFIX = "response"
+
+
+def get_response_cache():
+    return caches[getattr(settings, "RESPONSE_CACHE_ALIAS", "default")]
+
+
+def get_response_cache_timeout():
+    return getattr(settings, "RESPONSE_CACHE_TIMEOUT", 300)
+
+
+def model_namespace(model):
+    return model._meta.label_lower
+
+
+def _version_key(namespace):
+    return f"{RESPONSE_CACHE_PREFIX}:{namespace}:version"
+
+
+def _new_version():
+    # Seeded from the clock so an evicted version key never comes back as a number that was already used
+    return time.time_ns()
+
+
+def get_namespace_versions(namespaces):
+    # One round trip for the common case where every version key exists
+    cache = get_response_cache()
+    keys = [_version_key(namespace) for namespace in namespaces]
+    found = cache.get_many(keys)
+    versions = []
+    for key in keys:
+        version = found.get(key)
+        if version is None:
+            cache.add(key, _new_version(), None)
+            version = cache.get(key)
+        versions.append(version)
+    return versions
+
+
+def invalidate_namespace(namespace):
+    # Entries are never deleted; bumping the version makes every key built from the old one unreachable
+    cache = get_response_cache()
+    try:
+        cache.incr(_version_key(namespace))
+    except ValueError:
+        cache.set(_version_key(namespace), _new_version(), None)
+
+
+def invalidate_model_responses(model):
+    # After commit, so a reader can't re-cache the old rows under the new version
+    namespace = model_namespace(model)
+    transaction.on_commit(lambda: invalidate_namespace(namespace))
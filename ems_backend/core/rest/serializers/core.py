@@ -0,0 +1,118 @@
+import time
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from rest_framework import serializers
+
+from core.choices import Status
+from core.instrumentation import current_stats
+from core.reference import get_reference
+
+
+class EagerLoadingMixin:
+    # Derives select_related/prefetch_related/only() from the serializer's own fields.
+    # Meta.expandable_fields maps a relation to the serializer embedded for ?expand=<name>.
+
+    def get_expand(self):
+        # Expansion only applies to the top-level serializer, never to embedded ones
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        if parent is not None:
+            return ()
+        return self.context.get('expand', ())
+
+    def get_fields(self):
+        fields = super().get_fields()
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+
+        for name in self.get_expand():
+            if name in expandable and name in fields:
+                fields[name] = expandable[name](read_only=True)
+        return fields
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, expand=(), defer=True, fields=()):
+        # fields: extra model fields the view itself reads (kept out of the only() deferral)
+        serializer = cls(context={'expand': expand})
+        select_related, prefetch_related, only = [], [], list(fields)
+        collect_eager_loading(serializer, queryset.model, '', select_related, prefetch_related, only)
+
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        if defer:
+            queryset = queryset.only(*only)
+        return queryset
+
+
+class InstrumentedSerializerMixin:
+    # Adds the top-level serializer's to_representation time to the request's Server-Timing "serialize" metric.
+    # Embedded serializers are skipped so nested time isn't counted twice.
+
+    def to_representation(self, instance):
+        stats = current_stats()
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        if stats is None or parent is not None:
+            return super().to_representation(instance)
+
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            stats.add_time('serialize', time.perf_counter() - started)
+
+
+def collect_eager_loading(serializer, model, prefix, select_related, prefetch_related, only):
+    # Walk serializer fields and record the lookups needed to render them without per-row queries
+    only.append(prefix + model._meta.pk.name)
+
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*' or '.' in field.source:
+            continue
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            continue
+
+        path = prefix + field.source
+        if model_field.many_to_many or model_field.one_to_many:
+            prefetch_related.append(path)
+        elif isinstance(field, serializers.BaseSerializer):
+            only.append(path)
+            select_related.append(path)
+            collect_eager_loading(
+                field, model_field.related_model, path + '__', select_related, prefetch_related, only
+            )
+        else:
+            only.append(path)
+
+
+class ReferencePrimaryKeyField(serializers.PrimaryKeyRelatedField):
+    # PrimaryKeyRelatedField for small lookup tables (core.reference): ids resolve from the in-process registry,
+    # so validating a write, or a list of ids, costs no queries. active_only rejects soft-deleted rows.
+
+    def __init__(self, model=None, active_only=False, **kwargs):
+        self.model = model
+        self.active_only = active_only
+        if not kwargs.get('read_only'):
+            # Kept for the browsable API and schema generation; lookups never use it
+            kwargs.setdefault('queryset', model._default_manager.all())
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        try:
+            if isinstance(data, bool):
+                raise TypeError
+            pk = self.model._meta.pk.to_python(data)
+        except (TypeError, ValueError, ValidationError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+        row = get_reference(self.model, pk)
+        if row is None or (self.active_only and row.status != Status.ACTIVE):
+            self.fail('does_not_exist', pk_value=data)
+        return row
@@ -0,0 +1,325 @@
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, Max
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.functional import classproperty
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from core.metrics import record_cache
+from core.export import CSV_CONTENT_TYPE, XLSX_CONTENT_TYPE, iter_csv, iter_xlsx, openpyxl
+from core.pagination import afetch
+from core.permissions import PolicyPermission, acheck_permissions
+from core.principal import get_principal
+from core.response_cache import get_namespace_versions, get_response_cache, get_response_cache_timeout, model_namespace
+
+
+class EagerLoadingViewMixin:
+    # Applies the serializer's eager loading and forwards ?expand=a,b to it on reads
+    eager_loading_fields = ()
+
+    def get_expand(self):
+        if self.request.method not in SAFE_METHODS:
+            return ()
+        value = self.request.query_params.get('expand', '')
+        return tuple(name.strip() for name in value.split(',') if name.strip())
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['expand'] = self.get_expand()
+        return context
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+
+        if self.request.method in SAFE_METHODS and hasattr(serializer_class, 'setup_eager_loading'):
+            queryset = serializer_class.setup_eager_loading(queryset, self.get_expand(), fields=self.eager_loading_fields)
+        return queryset
+
+
+class PolicyScopedQuerysetMixin:
+    # Scopes the queryset with the view's PolicyPermission rules, so lists and detail lookups share the object
+    # rule. Detail lookups also select what the rule reads, keeping has_object_permission() off the database.
+    def get_policy(self):
+        return next((p for p in self.get_permissions() if isinstance(p, PolicyPermission)), None)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        policy = self.get_policy()
+        if policy is None:
+            return queryset
+        if (self.lookup_url_kwarg or self.lookup_field) in self.kwargs:
+            queryset = queryset.select_related(*policy.related_paths())
+        return policy.scope(self.request, queryset)
+
+
+class StreamingExportMixin:
+    # Streams the list view's rows as CSV (?export_format=xlsx for Excel) without pagination.
+    # Rows are read with values_list(...).iterator(), so no model instances are built and memory stays flat.
+    # export_fields: sequence of (column header, ORM lookup) pairs.
+    export_fields = ()
+    export_filename = 'export'
+    export_chunk_size = 2000
+    export_format_param = 'export_format'
+    # Exports stream from a sync iterator, so they never take the AsyncListViewMixin path
+    async_reads = False
+
+    def get_export_rows(self):
+        # Same role scoping, search and ordering as the list itself
+        queryset = self.filter_queryset(self.get_queryset())
+        lookups = [lookup for _, lookup in self.export_fields]
+        return queryset.values_list(*lookups).iterator(chunk_size=self.export_chunk_size)
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.query_params.get(self.export_format_param, 'csv').lower()
+        if export_format not in ('csv', 'xlsx'):
+            return Response({'error': 'export_format must be csv or xlsx'}, status=400)
+        if export_format == 'xlsx' and openpyxl is None:
+            return Response({'error': 'XLSX export is not available on this server (openpyxl is not installed)'}, status=400)
+
+        headers = [header for header, _ in self.export_fields]
+        rows = self.get_export_rows()
+        if export_format == 'xlsx':
+            content, content_type = iter_xlsx(headers, rows, title=self.export_filename[:31]), XLSX_CONTENT_TYPE
+        else:
+            content, content_type = iter_csv(headers, rows), CSV_CONTENT_TYPE
+
+        response = StreamingHttpResponse(content, content_type=content_type)
+        filename = f"{self.export_filename}-{timezone.localdate():%Y%m%d}.{export_format}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class AsyncListViewMixin:
+    # Serves GET/HEAD of a list view natively under ASGI when ASYNC_VIEWS is on: authentication and
+    # throttling run in a worker thread, permissions on the loop, rows come from acount()/aiterator().
+    # Other methods keep the sync, transactional code path. get_queryset() must stay lazy; views
+    # whose scoping needs a query override aget_queryset().
+    async_reads = True
+
+    @classproperty
+    def view_is_async(cls):
+        return cls.async_reads and getattr(settings, 'ASYNC_VIEWS', False)
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.view_is_async:
+            return super().dispatch(request, *args, **kwargs)
+        return self.adispatch(request, *args, **kwargs)
+
+    async def adispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return await sync_to_async(super().dispatch)(request, *args, **kwargs)
+
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.ainitial(request, *args, **kwargs)
+            response = await self.alist(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def ainitial(self, request, *args, **kwargs):
+        # APIView.initial, with the blocking steps moved off the event loop
+        self.format_kwarg = self.get_format_suffix(**kwargs)
+        request.accepted_renderer, request.accepted_media_type = self.perform_content_negotiation(request)
+        request.version, request.versioning_scheme = self.determine_version(request, *args, **kwargs)
+
+        await sync_to_async(self.perform_authentication)(request)
+        await acheck_permissions(request, self)
+        await sync_to_async(self.check_throttles)(request)
+
+    async def aget_queryset(self):
+        return self.get_queryset()
+
+    async def alist(self, request, *args, **kwargs):
+        return await self.alist_response(self.filter_queryset(await self.aget_queryset()))
+
+    async def alist_response(self, queryset):
+        request = self.request
+        paginator = self.paginator
+        if paginator is not None and hasattr(paginator, 'apaginate_queryset'):
+            page = await paginator.apaginate_queryset(queryset, request, view=self)
+        elif paginator is not None:
+            page = await sync_to_async(paginator.paginate_queryset)(queryset, request, view=self)
+        else:
+            page = None
+
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer(await afetch(queryset, 1000), many=True)
+        return Response(serializer.data)
+
+
+class ConditionalGetMixin:
+    # ETag/Last-Modified on GET, so polling clients get a 304 before anything is serialized.
+    # Detail: the object's alias + updated_at. List: MAX(updated_at) and COUNT(*) over the scoped, filtered
+    # queryset (edits move the max, soft deletes drop the count). Relations embedded by ?expand= are part of the
+    # body, so their updated_at counts too. Both are hashed with the user and the full path, since scope, page
+    # and ?expand= all change the body. Goes before AsyncListViewMixin in the bases.
+    conditional_field = 'updated_at'
+
+    @property
+    def eager_loading_fields(self):
+        # Keeps the validators' columns out of EagerLoadingViewMixin's only() deferral
+        expanded = tuple(f"{path}__{self.conditional_field}" for path in self.get_expanded_relations())
+        return ('alias', self.conditional_field) + expanded
+
+    def get_expanded_relations(self):
+        # ORM paths of the forward relations ?expand= embeds in this response
+        serializer_meta = getattr(self.get_serializer_class(), 'Meta', None)
+        expandable = getattr(serializer_meta, 'expandable_fields', {})
+        if not expandable or not hasattr(self, 'get_expand'):
+            return ()
+        paths = []
+        for name in self.get_expand():
+            try:
+                field = serializer_meta.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if name in expandable and (field.many_to_one or field.one_to_one) and any(
+                related.name == self.conditional_field for related in field.related_model._meta.concrete_fields
+            ):
+                paths.append(name)
+        return tuple(paths)
+
+    def get_etag(self, *parts):
+        key = repr((self.request.user.pk, self.request.get_full_path(), *parts))
+        return f'W/"{hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()}"'
+
+    def get_last_modified(self, instance):
+        modified = [getattr(instance, self.conditional_field)]
+        for path in self.get_expanded_relations():
+            related = getattr(instance, path)
+            if related is not None:
+                modified.append(getattr(related, self.conditional_field))
+        return max((value for value in modified if value is not None), default=None)
+
+    def get_list_state(self, aggregate):
+        # aggregate -> (etag, last_modified)
+        modified = [value for name, value in aggregate.items() if name != 'count' and value is not None]
+        return self.get_etag(*sorted(aggregate.items())), max(modified, default=None)
+
+    def get_list_aggregates(self):
+        aggregates = {'count': Count('pk'), 'last_modified': Max(self.conditional_field)}
+        for path in self.get_expanded_relations():
+            aggregates[f"modified_{path}"] = Max(f"{path}__{self.conditional_field}")
+        return aggregates
+
+    def not_modified(self, etag, last_modified):
+        # A 304 when the client's If-None-Match / If-Modified-Since still hold, else None
+        response = get_conditional_response(
+            self.request, etag=etag, last_modified=last_modified and int(last_modified.timestamp())
+        )
+        return response and self.set_validators(response, etag, last_modified)
+
+    def set_validators(self, response, etag, last_modified):
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified.timestamp())
+            # Revalidate on every use instead of heuristic freshness from Last-Modified
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        last_modified = self.get_last_modified(instance)
+        etag = self.get_etag(instance.alias, last_modified)
+        response = self.not_modified(etag, last_modified)
+        if response is None:
+            response = Response(self.get_serializer(instance).data)
+        return self.set_validators(response, etag, last_modified)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        etag, last_modified = self.get_list_state(queryset.aggregate(**self.get_list_aggregates()))
+        response = self.not_modified(etag, last_modified)
+        if response is None:
+            response = self.list_response(queryset)
+        return self.set_validators(response, etag, last_modified)
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(await self.aget_queryset())
+        etag, last_modified = self.get_list_state(await queryset.aaggregate(**self.get_list_aggregates()))
+        response = self.not_modified(etag, last_modified)
+        if response is None:
+            response = await self.alist_response(queryset)
+        return self.set_validators(response, etag, last_modified)
+
+    def list_response(self, queryset):
+        # ListModelMixin.list from an already filtered queryset
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+
+class ResponseCacheMixin:
+    # Caches list GET responses (data plus validators) per endpoint, role scope and query string, for read-mostly
+    # reference lists. Keys embed the version of every namespace in response_cache_models; a post_save/post_delete
+    # on one of those models bumps its version (core.response_cache), so stale entries are simply never read again.
+    # The default scope is the caller's role and team: only correct while get_queryset() depends on nothing else.
+    # Views that filter per user must add the user to get_response_cache_scope(). Goes before ConditionalGetMixin.
+    response_cache_models = ()
+    response_cache_headers = ('ETag', 'Last-Modified', 'Cache-Control')
+
+    def get_response_cache_models(self):
+        return self.response_cache_models or (self.queryset.model,)
+
+    def get_response_cache_scope(self):
+        principal = get_principal(self.request.user)
+        if principal is None:
+            return None
+        return (principal.is_superuser, principal.role_name, principal.team_id)
+
+    def get_response_cache_key(self):
+        namespaces = [model_namespace(model) for model in self.get_response_cache_models()]
+        versions = get_namespace_versions(namespaces)
+        key = repr((
+            self.request.build_absolute_uri(self.request.path),  # links in the body carry scheme and host
+            sorted(self.kwargs.items()),
+            self.get_response_cache_scope(),
+            sorted(self.request.query_params.lists()),
+        ))
+        digest = hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()
+        return f"response:{type(self).__name__}:{':'.join(map(str, versions))}:{digest}"
+
+    def list(self, request, *args, **kwargs):
+        cache = get_response_cache()
+        key = self.get_response_cache_key()
+        cached = cache.get(key)
+        record_cache('responses', cached is not None)
+        if cached is not None:
+            data, headers = cached
+            response = Response(data, headers=headers)
+            return get_conditional_response(
+                request,
+                etag=headers.get('ETag'),
+                last_modified=parse_http_date_safe(headers.get('Last-Modified', '')),
+                response=response,
+            )
+
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            headers = {name: response[name] for name in self.response_cache_headers if response.has_header(name)}
+            cache.set(key, (response.data, headers), get_response_cache_timeout())
+        return response
@@ -1,8 +1,10 @@
+from core.principal import get_principal
+
+
 def get_user_role(user):
-    if not user or not user.is_authenticated:
+    principal = get_principal(user)
+    if principal is None:
         return None
-    if user.is_superuser:
+    if principal.is_superuser:
         return "SuperAdmin"
-    if hasattr(user, "role") and user.role:
-        return user.role.name
-    return None
+    return principal.role_name
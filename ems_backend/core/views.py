@@ -0,0 +1,45 @@
+import hmac
+
+from django.conf import settings
+from django.db.models import Count
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.http import require_GET
+
+from core.choices import Status
+from core.metrics import cache_hit_ratios, collect, render
+from leaves.balances import PENDING_STATUSES
+from leaves.models import LeaveRequest
+
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def pending_leave_requests():
+    # One grouped query per scrape; the gauge is the database's answer, not something each worker keeps
+    counts = {status: 0 for status in PENDING_STATUSES}
+    rows = (
+        LeaveRequest.objects.filter(status=Status.ACTIVE, leave_status__in=PENDING_STATUSES)
+        .values('leave_status')
+        .annotate(total=Count('pk'))
+        .order_by()
+    )
+    counts.update({row['leave_status']: row['total'] for row in rows})
+    return {(('leave_status', status),): total for status, total in counts.items()}
+
+
+@require_GET
+def metrics(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}"):
+            return JsonResponse({'error': 'A valid metrics token is required.'}, status=401)
+    elif not (settings.DEBUG or getattr(settings, 'METRICS_PUBLIC', False)):
+        # Closed by default: route names, error rates and pending counts are not for anonymous callers
+        return JsonResponse({'error': 'Set METRICS_TOKEN to scrape metrics.'}, status=403)
+
+    totals = collect()
+    gauges = {
+        'ems_cache_hit_ratio': cache_hit_ratios(totals),
+        'ems_leave_requests_pending': pending_leave_requests(),
+    }
+    return HttpResponse(render(totals, gauges), content_type=PROMETHEUS_CONTENT_TYPE)
@@ -11,7 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
-from decouple import config
+from decouple import config, Csv
 from pathlib import Path
 from datetime import timedelta
 
@@ -58,6 +58,7 @@ INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + PROJECT_APPS
 
 
 MIDDLEWARE = [
+    'core.middleware.RequestInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -86,6 +87,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'ems_backend.wsgi.application'
 
+# Serve the hot leave list endpoints as native async views; enable when running under an ASGI server
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -111,6 +115,29 @@ DATABASES = {
 # }
 
 
+# Cache
+# Local memory by default; point CACHE_BACKEND/CACHE_LOCATION at Redis to share across workers
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='ems-default'),
+    },
+    # Cached list responses (see core.rest.views.core.ResponseCacheMixin); kept apart so they can't evict principals
+    'responses': {
+        'BACKEND': config('RESPONSE_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('RESPONSE_CACHE_LOCATION', default='ems-responses'),
+    },
+}
+
+# Cache alias and lifetime (seconds) of cached list responses
+RESPONSE_CACHE_ALIAS = config('RESPONSE_CACHE_ALIAS', default='responses')
+RESPONSE_CACHE_TIMEOUT = config('RESPONSE_CACHE_TIMEOUT', default=300, cast=int)
+
+# Seconds a resolved role/team principal stays cached per user
+PRINCIPAL_CACHE_TIMEOUT = config('PRINCIPAL_CACHE_TIMEOUT', default=300, cast=int)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -157,7 +184,7 @@ AUTH_USER_MODEL = 'users.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.PrincipalJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',  
     ),
     'DEFAULT_SCHEMA_CLASS': 'rest_framework.schemas.openapi.AutoSchema',
@@ -169,7 +196,7 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.EMSPagination',
     'PAGE_SIZE': 10,
 
     'DEFAULT_THROTTLE_CLASSES': [
@@ -192,3 +219,76 @@ SIMPLE_JWT = {
     "SIGNING_KEY": SECRET_KEY,
     "AUTH_HEADER_TYPES": ("Bearer",),
 }
+
+
+# Leave allocation defaults
+DEFAULT_MONTHLY_LEAVE_DAYS = config('DEFAULT_MONTHLY_LEAVE_DAYS', default=2, cast=int)
+
+# Weekday numbers (Monday=0) excluded when counting leave days
+LEAVE_WEEKEND_DAYS = config('LEAVE_WEEKEND_DAYS', default='4,5', cast=Csv(int))
+
+# Seconds between checks of the shared holiday calendar version (see leaves.calendar)
+HOLIDAY_CALENDAR_CHECK_INTERVAL = config('HOLIDAY_CALENDAR_CHECK_INTERVAL', default=5, cast=int)
+
+# Seconds between checks of the shared version of cached reference tables (see core.reference)
+REFERENCE_DATA_CHECK_INTERVAL = config('REFERENCE_DATA_CHECK_INTERVAL', default=5, cast=int)
+
+# Processes used to hash passwords in manage.py import_users (default: CPU count); uploads hash in-process
+USER_IMPORT_HASH_WORKERS = config('USER_IMPORT_HASH_WORKERS', default=0, cast=int) or None
+# Rows accepted by POST /api/users/import/; larger files go through manage.py import_users
+USER_IMPORT_MAX_ROWS = config('USER_IMPORT_MAX_ROWS', default=200, cast=int)
+
+
+# Per-request instrumentation (core.middleware.RequestInstrumentationMiddleware)
+# Send query count, DB and serializer time to clients in a Server-Timing header
+SERVER_TIMING_HEADER = config('SERVER_TIMING_HEADER', default=True, cast=bool)
+# Executions of the same SQL in one request reported as a likely N+1
+REQUEST_DUPLICATE_QUERY_THRESHOLD = config('REQUEST_DUPLICATE_QUERY_THRESHOLD', default=5, cast=int)
+# Share of requests that keep their full query list, dumped to ems.requests.slow when slower than SLOW_REQUEST_MS
+SLOW_REQUEST_SAMPLE_RATE = config('SLOW_REQUEST_SAMPLE_RATE', default=0.01, cast=float)
+SLOW_REQUEST_MS = config('SLOW_REQUEST_MS', default=1000, cast=int)
+# Level of the one-line-per-request JSON log (ems.requests); WARNING keeps only slow-request dumps
+REQUEST_LOG_LEVEL = config('REQUEST_LOG_LEVEL', default='INFO')
+
+# Prometheus metrics at /metrics (core.metrics). Each worker process writes its counters to its own file in
+# METRICS_DIR (default: <tmp>/ems-metrics) and a scrape sums them; empty the directory when the service starts
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_DIR = config('METRICS_DIR', default='')
+# Bearer token required to scrape /metrics. Without one the endpoint answers 403 unless DEBUG is on
+# or METRICS_PUBLIC is set (only for a scrape port that is unreachable from the public network)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+METRICS_PUBLIC = config('METRICS_PUBLIC', default=False, cast=bool)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'requests': {'class': 'logging.StreamHandler', 'formatter': 'message'},
+    },
+    'loggers': {
+        'ems.requests': {'handlers': ['requests'], 'level': REQUEST_LOG_LEVEL, 'propagate': False},
+    },
+}
+
+
+# Email (used by the SMTP outbox backend)
+EMAIL_HOST = config('EMAIL_HOST', default='localhost')
+EMAIL_PORT = config('EMAIL_PORT', default=25, cast=int)
+EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
+EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
+EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=False, cast=bool)
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='ems@riseuplabs.com')
+
+
+# Notification outbox (drained by manage.py run_outbox_worker)
+# Backends: leaves.outbox_backends.ConsoleBackend / FileBackend / SMTPBackend / WebhookBackend
+OUTBOX_BACKEND = config('OUTBOX_BACKEND', default='leaves.outbox_backends.ConsoleBackend')
+OUTBOX_FILE_PATH = config('OUTBOX_FILE_PATH', default=os.path.join(BASE_DIR, 'outbox.log'))
+OUTBOX_WEBHOOK_URL = config('OUTBOX_WEBHOOK_URL', default='')
+OUTBOX_WEBHOOK_TIMEOUT = config('OUTBOX_WEBHOOK_TIMEOUT', default=10, cast=int)
+OUTBOX_MAX_ATTEMPTS = config('OUTBOX_MAX_ATTEMPTS', default=8, cast=int)
+OUTBOX_RETRY_BASE_SECONDS = config('OUTBOX_RETRY_BASE_SECONDS', default=30, cast=int)
+OUTBOX_RETRY_MAX_SECONDS = config('OUTBOX_RETRY_MAX_SECONDS', default=3600, cast=int)
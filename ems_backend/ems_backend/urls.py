@@ -22,6 +22,8 @@ from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
+from core.views import metrics
+
 
 schema_view = get_schema_view(
    openapi.Info(
@@ -49,6 +51,9 @@ urlpatterns = [
     path("api/users/", include("users.rest.urls")),
     path("api/leaves/", include("leaves.rest.urls")),
 
+    # Prometheus scrape endpoint
+    path('metrics', metrics, name='metrics'),
+
     # Swagger UI
     re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema_view.without_ui(cache_timeout=0), name='schema-json'),
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
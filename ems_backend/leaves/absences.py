@@ -0,0 +1,94 @@
+import datetime
+
+from core.choices import LeaveStatus
+from leaves.models import LeaveRequest
+
+
+MAX_CALENDAR_DAYS = 366
+
+
+def calendar_leaves(start, end, team_ids=None):
+    # Approved and pending leaves overlapping [start, end], read in one query
+    qs = LeaveRequest.objects.open().overlapping(start, end)
+    if team_ids is not None:
+        qs = qs.filter(employee__team_id__in=team_ids)
+
+    return list(
+        qs.order_by('start_date', 'employee_id').values(
+            'id', 'employee_id', 'employee__username', 'employee__first_name', 'employee__last_name',
+            'employee__team_id', 'leave_type_id', 'leave_type__name',
+            'start_date', 'end_date', 'days_requested', 'leave_status',
+        )
+    )
+
+
+def _merge_periods(periods):
+    merged = []
+    for start, end in sorted(periods):
+        if merged and start <= merged[-1][1] + datetime.timedelta(days=1):
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def _daily_counts(periods_by_employee, start, end):
+    # Difference array over the window; each employee counts once per day even with overlapping leaves
+    size = (end - start).days + 1
+    deltas = [0] * (size + 1)
+    for periods in periods_by_employee.values():
+        for period_start, period_end in _merge_periods(periods):
+            first = max((period_start - start).days, 0)
+            last = min((period_end - start).days, size - 1)
+            deltas[first] += 1
+            deltas[last + 1] -= 1
+
+    counts, running = [], 0
+    for delta in deltas[:size]:
+        running += delta
+        counts.append(running)
+    return counts
+
+
+def absence_calendar(start, end, team_ids=None):
+    leaves = calendar_leaves(start, end, team_ids)
+
+    approved, pending, any_status = {}, {}, {}
+    for leave in leaves:
+        period = (leave['start_date'], leave['end_date'])
+        bucket = approved if leave['leave_status'] == LeaveStatus.HR_APPROVED else pending
+        bucket.setdefault(leave['employee_id'], []).append(period)
+        any_status.setdefault(leave['employee_id'], []).append(period)
+
+    approved_counts = _daily_counts(approved, start, end)
+    pending_counts = _daily_counts(pending, start, end)
+    total_counts = _daily_counts(any_status, start, end)
+
+    days = [
+        {
+            'date': start + datetime.timedelta(days=offset),
+            'approved': approved_counts[offset],
+            'pending': pending_counts[offset],
+            'total': total_counts[offset],
+        }
+        for offset in range(len(total_counts))
+    ]
+    entries = [
+        {
+            'id': leave['id'],
+            'employee': {
+                'id': leave['employee_id'],
+                'username': leave['employee__username'],
+                'first_name': leave['employee__first_name'],
+                'last_name': leave['employee__last_name'],
+                'team': leave['employee__team_id'],
+            },
+            'leave_type': {'id': leave['leave_type_id'], 'name': leave['leave_type__name']},
+            'start_date': leave['start_date'],
+            'end_date': leave['end_date'],
+            'days_requested': leave['days_requested'],
+            'leave_status': leave['leave_status'],
+        }
+        for leave in leaves
+    ]
+    return {'days': days, 'leaves': entries}
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import LeaveType, LeaveAllocation, LeaveRequest, LeaveApproval
+from .models import LeaveType, LeaveAllocation, LeaveRequest, LeaveApproval, LeaveBalanceSummary, HolidayCalendar, NotificationOutbox
+from .calendar import working_days_by_month
 
 # LeaveType
 @admin.register(LeaveType)
@@ -17,6 +18,13 @@ class LeaveAllocationAdmin(admin.ModelAdmin):
     search_fields = ('employee__email', 'leave_type__name')
     autocomplete_fields = ('employee', 'leave_type')
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_remaining_days()
+
+    @admin.display(ordering='remaining_days')
+    def remaining_days(self, obj):
+        return obj.remaining_days
+
 
 # LeaveRequest
 @admin.register(LeaveRequest)
@@ -25,6 +33,15 @@ class LeaveRequestAdmin(admin.ModelAdmin):
     list_filter = ('leave_status', 'team_lead_approval', 'hr_approval', 'status', 'leave_type')
     search_fields = ('employee__email', 'leave_type__name', 'reason')
     autocomplete_fields = ('employee', 'leave_type', 'approved_by_team_lead', 'approved_by_hr')
+    readonly_fields = ('days_requested', 'days_by_month')
+
+    def save_model(self, request, obj, form, change):
+        # Day counts come from the working-day calendar, as they do for API submissions
+        if not change or {'start_date', 'end_date'} & set(form.changed_data):
+            month_days = working_days_by_month(obj.start_date, obj.end_date)
+            obj.days_requested = sum(month_days.values())
+            obj.days_by_month = {month.isoformat(): days for month, days in month_days.items()}
+        super().save_model(request, obj, form, change)
 
 
 # LeaveApproval
@@ -34,3 +51,31 @@ class LeaveApprovalAdmin(admin.ModelAdmin):
     list_filter = ('approval_type', 'decision', 'status')
     search_fields = ('leave_request__employee__email', 'approved_by__email', 'notes')
     autocomplete_fields = ('leave_request', 'approved_by')
+
+
+# LeaveBalanceSummary (maintained by leaves.balances; rebuild with manage.py rebuild_leave_balances)
+@admin.register(LeaveBalanceSummary)
+class LeaveBalanceSummaryAdmin(admin.ModelAdmin):
+    list_display = ('employee', 'leave_type', 'year', 'allocated_days', 'used_days', 'pending_days', 'remaining_days')
+    list_filter = ('year', 'leave_type')
+    search_fields = ('employee__email', 'leave_type__name')
+    list_select_related = ('employee', 'leave_type')
+    readonly_fields = ('employee', 'leave_type', 'year', 'allocated_days', 'used_days', 'pending_days')
+
+
+# HolidayCalendar
+@admin.register(HolidayCalendar)
+class HolidayCalendarAdmin(admin.ModelAdmin):
+    list_display = ('date', 'name', 'status')
+    list_filter = ('status',)
+    search_fields = ('name',)
+    date_hierarchy = 'date'
+
+
+# NotificationOutbox (written with approvals; drained by manage.py run_outbox_worker)
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = ('idempotency_key', 'event', 'state', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('state', 'event')
+    search_fields = ('idempotency_key', 'last_error')
+    readonly_fields = ('event', 'idempotency_key', 'recipients', 'payload', 'attempts', 'last_error', 'sent_at')
@@ -0,0 +1,172 @@
+import datetime
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import ExtractYear
+from django.utils import timezone
+from leaves.models import LeaveAllocation, LeaveRequest, LeaveBalanceSummary
+from core.choices import LeaveStatus, Status
+
+# Leave statuses still waiting on a decision; their days show up as pending
+PENDING_STATUSES = (LeaveStatus.PENDING, LeaveStatus.TEAM_LEAD_APPROVED)
+
+
+def request_balance_state(leave_status, status=Status.ACTIVE):
+    # (pending, used) weights a request contributes to its summary row
+    if leave_status is None or status != Status.ACTIVE:
+        return 0, 0
+    return int(leave_status in PENDING_STATUSES), int(leave_status == LeaveStatus.HR_APPROVED)
+
+
+def leave_request_usage(leave_request):
+    # Days a request charges, keyed by summary row; a leave across New Year splits between two rows
+    usage = {}
+    for month, days in leave_request.month_days().items():
+        key = (leave_request.employee_id, leave_request.leave_type_id, month.year)
+        usage[key] = usage.get(key, 0) + days
+    return usage
+
+
+def allocation_key(allocation):
+    return allocation.employee_id, allocation.leave_type_id, allocation.valid_month.year
+
+
+def adjust_balance(key, allocated=0, used=0, pending=0):
+    # Apply a delta after the source rows changed; a missing row is rebuilt from source instead
+    if not (allocated or used or pending):
+        return
+    employee_id, leave_type_id, year = key
+    updated = LeaveBalanceSummary.objects.filter(
+        employee_id=employee_id, leave_type_id=leave_type_id, year=year
+    ).update(
+        allocated_days=F('allocated_days') + allocated,
+        used_days=F('used_days') + used,
+        pending_days=F('pending_days') + pending,
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        refresh_balance_summaries([key])
+
+
+def apply_status_change(leave_request, old_leave_status, old_status=Status.ACTIVE):
+    # Move a request's days between pending/used after its status was saved
+    old_pending, old_used = request_balance_state(old_leave_status, old_status)
+    new_pending, new_used = request_balance_state(leave_request.leave_status, leave_request.status)
+    for key, days in leave_request_usage(leave_request).items():
+        adjust_balance(key, used=(new_used - old_used) * days, pending=(new_pending - old_pending) * days)
+
+
+def compute_balances(keys):
+    # Aggregate allocations and pending requests for the given keys straight from source
+    keys = set(keys)
+    if not keys:
+        return {}
+    employee_ids = {key[0] for key in keys}
+    leave_type_ids = {key[1] for key in keys}
+    years = {key[2] for key in keys}
+    first_day = datetime.date(min(years), 1, 1)
+    last_day = datetime.date(max(years), 12, 31)
+
+    balances = {key: [0, 0, 0] for key in keys}
+
+    allocations = (
+        LeaveAllocation.objects.filter(
+            status=Status.ACTIVE,
+            employee_id__in=employee_ids,
+            leave_type_id__in=leave_type_ids,
+            valid_month__range=(first_day, last_day),
+        )
+        .annotate(year=ExtractYear('valid_month'))
+        .values('employee_id', 'leave_type_id', 'year')
+        .annotate(allocated=Sum('allocated_days'), used=Sum('used_days'))
+    )
+    for row in allocations:
+        key = (row['employee_id'], row['leave_type_id'], row['year'])
+        if key in balances:
+            balances[key][0] = row['allocated']
+            balances[key][1] = row['used']
+
+    # Pending requests are summed per month split, which lives in JSON, so this part runs in Python
+    pending = LeaveRequest.objects.filter(
+        status=Status.ACTIVE,
+        leave_status__in=PENDING_STATUSES,
+        employee_id__in=employee_ids,
+        leave_type_id__in=leave_type_ids,
+    ).overlapping(first_day, last_day).only(
+        'employee_id', 'leave_type_id', 'start_date', 'days_requested', 'days_by_month'
+    )
+    for leave_request in pending:
+        for key, days in leave_request_usage(leave_request).items():
+            if key in balances:
+                balances[key][2] += days
+
+    return balances
+
+
+def refresh_balance_summaries(keys):
+    # Recompute and upsert summary rows for the keys in a constant number of queries
+    balances = compute_balances(keys)
+    if not balances:
+        return 0
+    LeaveBalanceSummary.objects.bulk_create(
+        [
+            LeaveBalanceSummary(
+                employee_id=employee_id,
+                leave_type_id=leave_type_id,
+                year=year,
+                allocated_days=allocated,
+                used_days=used,
+                pending_days=pending,
+            )
+            for (employee_id, leave_type_id, year), (allocated, used, pending) in balances.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['employee', 'leave_type', 'year'],
+        update_fields=['allocated_days', 'used_days', 'pending_days', 'updated_at'],
+    )
+    return len(balances)
+
+
+def year_balance_keys(year, employee_ids=None):
+    # Every key that has source data or an existing summary row for the year
+    first_day, last_day = datetime.date(year, 1, 1), datetime.date(year, 12, 31)
+    sources = [
+        LeaveAllocation.objects.filter(valid_month__range=(first_day, last_day)),
+        LeaveRequest.objects.overlapping(first_day, last_day),
+        LeaveBalanceSummary.objects.filter(year=year),
+    ]
+    keys = set()
+    for queryset in sources:
+        if employee_ids is not None:
+            queryset = queryset.filter(employee_id__in=employee_ids)
+        keys.update(
+            (employee_id, leave_type_id, year)
+            for employee_id, leave_type_id in queryset.values_list('employee_id', 'leave_type_id').distinct()
+        )
+    return keys
+
+
+def rebuild_year(year, chunk_size=1000):
+    # Recompute every summary row of the year, one transaction per chunk of keys
+    keys = sorted(year_balance_keys(year))
+    for start in range(0, len(keys), chunk_size):
+        with transaction.atomic():
+            refresh_balance_summaries(keys[start:start + chunk_size])
+    return len(keys)
+
+
+def verify_year(year, chunk_size=1000):
+    # Yield (key, stored, expected) for every summary row that disagrees with source data
+    keys = sorted(year_balance_keys(year))
+    for start in range(0, len(keys), chunk_size):
+        chunk = keys[start:start + chunk_size]
+        expected = compute_balances(chunk)
+        stored = {
+            (row.employee_id, row.leave_type_id, row.year): [row.allocated_days, row.used_days, row.pending_days]
+            for row in LeaveBalanceSummary.objects.filter(
+                year=year, employee_id__in={key[0] for key in chunk}
+            )
+        }
+        for key in chunk:
+            if stored.get(key, [0, 0, 0]) != expected[key]:
+                yield key, stored.get(key), expected[key]
@@ -0,0 +1,108 @@
+import array
+import datetime
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.choices import Status
+
+
+HOLIDAY_VERSION_KEY = "holiday_calendar:version"
+
+# Per-process tables: (year, weekend) -> prefix sums of working days; rebuilt when the shared version moves
+_year_tables = {}
+_version = {'value': None, 'checked_at': 0.0}
+
+
+def weekend_days():
+    # Weekday numbers (Monday=0) that never count as leave days
+    return frozenset(getattr(settings, 'LEAVE_WEEKEND_DAYS', (4, 5)))
+
+
+def _version_check_interval():
+    return getattr(settings, 'HOLIDAY_CALENDAR_CHECK_INTERVAL', 5)
+
+
+def _current_version():
+    # The shared version is re-read at most every few seconds so hot loops stay in memory
+    now = time.monotonic()
+    if _version['value'] is None or now - _version['checked_at'] >= _version_check_interval():
+        version = cache.get(HOLIDAY_VERSION_KEY)
+        if version is None:
+            # Clock-seeded so an evicted key never matches a version some process built its tables at
+            seed = time.time_ns()
+            cache.add(HOLIDAY_VERSION_KEY, seed, None)
+            version = cache.get(HOLIDAY_VERSION_KEY, seed)
+        if version != _version['value']:
+            _year_tables.clear()
+        _version.update(value=version, checked_at=now)
+    return _version['value']
+
+
+def invalidate_holidays():
+    # Holiday edits: drop this process's tables now, other processes on their next version check
+    try:
+        cache.incr(HOLIDAY_VERSION_KEY)
+    except ValueError:
+        cache.set(HOLIDAY_VERSION_KEY, time.time_ns(), None)
+    _year_tables.clear()
+    _version['value'] = None
+
+
+def holidays_in_year(year):
+    from leaves.models import HolidayCalendar
+
+    return set(
+        HolidayCalendar.objects.filter(
+            status=Status.ACTIVE, date__range=(datetime.date(year, 1, 1), datetime.date(year, 12, 31))
+        ).values_list('date', flat=True)
+    )
+
+
+def build_year_table(year, weekend):
+    # prefix[i] = working days among the first i days of the year
+    holidays = holidays_in_year(year)
+    day = datetime.date(year, 1, 1)
+    size = (datetime.date(year + 1, 1, 1) - day).days
+    prefix = array.array('H', bytes(2 * (size + 1)))
+    for index in range(size):
+        working = day.weekday() not in weekend and day not in holidays
+        prefix[index + 1] = prefix[index] + working
+        day += datetime.timedelta(days=1)
+    return prefix
+
+
+def year_table(year):
+    _current_version()
+    weekend = weekend_days()
+    table = _year_tables.get((year, weekend))
+    if table is None:
+        table = _year_tables[(year, weekend)] = build_year_table(year, weekend)
+    return table
+
+
+def working_days(start, end):
+    # Working days in the closed range [start, end]; one subtraction per calendar year spanned
+    if end < start:
+        return 0
+    days = 0
+    for year in range(start.year, end.year + 1):
+        table = year_table(year)
+        first = start if year == start.year else datetime.date(year, 1, 1)
+        last = end if year == end.year else datetime.date(year, 12, 31)
+        days += table[last.timetuple().tm_yday] - table[first.timetuple().tm_yday - 1]
+    return days
+
+
+def working_days_by_month(start, end):
+    # {first day of month: working days} for every month of [start, end] that has any
+    days_by_month = {}
+    month = start.replace(day=1)
+    while month <= end:
+        next_month = (month + datetime.timedelta(days=32)).replace(day=1)
+        days = working_days(max(start, month), min(end, next_month - datetime.timedelta(days=1)))
+        if days:
+            days_by_month[month] = days
+        month = next_month
+    return days_by_month
@@ -0,0 +1,48 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from leaves.models import LeaveType
+from leaves.services import provision_allocations
+
+
+class Command(BaseCommand):
+    help = "Create or refresh the monthly leave allocation of every active employee x leave type"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', required=True, help="Month to provision, as YYYY-MM")
+        parser.add_argument('--days', type=int, default=settings.DEFAULT_MONTHLY_LEAVE_DAYS,
+                            help="Days allocated per employee and leave type")
+        parser.add_argument('--leave-type', action='append', dest='leave_types',
+                            help="Leave type name to provision (repeatable; default: all active types)")
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Allocations written per transaction")
+        parser.add_argument('--no-overwrite', action='store_true',
+                            help="Keep existing allocations instead of resetting their allocated days")
+
+    def handle(self, *args, **options):
+        try:
+            valid_month = datetime.datetime.strptime(options['month'], '%Y-%m').date()
+        except ValueError:
+            raise CommandError("--month must look like YYYY-MM")
+        if options['days'] < 0:
+            raise CommandError("--days cannot be negative")
+
+        leave_type_ids = None
+        if options['leave_types']:
+            leave_type_ids = list(
+                LeaveType.objects.filter(name__in=options['leave_types']).values_list('id', flat=True)
+            )
+            if len(leave_type_ids) != len(set(options['leave_types'])):
+                raise CommandError("Unknown leave type in --leave-type")
+
+        result = provision_allocations(
+            valid_month,
+            options['days'],
+            leave_type_ids=leave_type_ids,
+            overwrite=not options['no_overwrite'],
+            chunk_size=options['chunk_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{valid_month:%Y-%m}: {result['created']} created, {result['updated']} updated, "
+            f"{result['skipped']} skipped"
+        ))
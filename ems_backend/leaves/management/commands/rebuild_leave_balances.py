@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from leaves.balances import rebuild_year, verify_year
+
+
+class Command(BaseCommand):
+    help = "Rebuild LeaveBalanceSummary rows from allocations and requests, or verify them against source data"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, action='append', dest='years',
+                            help="Year to process (repeatable; default: current year)")
+        parser.add_argument('--verify', action='store_true',
+                            help="Only compare stored rows with source data and fail on mismatches")
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Summary rows per transaction")
+
+    def handle(self, *args, **options):
+        years = options['years'] or [timezone.localdate().year]
+        mismatches = 0
+
+        for year in years:
+            if options['verify']:
+                for key, stored, expected in verify_year(year, options['chunk_size']):
+                    mismatches += 1
+                    self.stdout.write(self.style.ERROR(
+                        f"{year} employee={key[0]} leave_type={key[1]}: "
+                        f"stored={stored} expected={expected} (allocated, used, pending)"
+                    ))
+                self.stdout.write(f"{year}: verified")
+            else:
+                count = rebuild_year(year, options['chunk_size'])
+                self.stdout.write(self.style.SUCCESS(f"{year}: rebuilt {count} summary rows"))
+
+        if mismatches:
+            raise CommandError(f"{mismatches} summary row(s) disagree with source data")
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from leaves.outbox import deliver_batch, get_backend
+
+
+class Command(BaseCommand):
+    help = "Deliver queued approval notifications from the outbox, retrying failures with backoff"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help="Messages claimed per batch")
+        parser.add_argument('--lease', type=int, default=300,
+                            help="Seconds a claimed message stays hidden from other workers")
+        parser.add_argument('--sleep', type=float, default=2.0, help="Seconds to wait when the outbox is empty")
+        parser.add_argument('--once', action='store_true', help="Drain what is due now, then exit")
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        self.stdout.write(f"Outbox worker using {type(backend).__name__}")
+        try:
+            while True:
+                sent, retried, failed = deliver_batch(backend, options['batch_size'], options['lease'])
+                if sent or retried or failed:
+                    self.stdout.write(f"sent {sent}, retrying {retried}, failed {failed}")
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped")
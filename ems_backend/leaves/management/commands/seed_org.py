@@ -0,0 +1,59 @@
+import datetime
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from users.models import User
+from leaves.seed import OrgSeeder
+
+
+class Command(BaseCommand):
+    help = "Generate a synthetic org with leave history (users, teams, allocations, requests, approvals) for load testing"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=1000, help="Employees to create")
+        parser.add_argument('--teams', type=int, help="Teams to spread them over (default: one per 12 employees)")
+        parser.add_argument('--years', type=int, default=1, help="Years of leave history, ending with the current one")
+        parser.add_argument('--requests-per-year', type=int, default=6, help="Leave requests per employee and year")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed; the same seed and --as-of give the same org")
+        parser.add_argument('--as-of', help="Date the history is generated relative to, as YYYY-MM-DD (default: today)")
+        parser.add_argument('--prefix', default='seed', help="Prefix of the generated usernames, emails and team names")
+        parser.add_argument('--password', help="Password every generated user gets (default: unusable)")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Employees written per transaction")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per INSERT batch")
+
+    def handle(self, *args, **options):
+        if options['employees'] < 1:
+            raise CommandError("--employees must be at least 1")
+        as_of = None
+        if options['as_of']:
+            try:
+                as_of = datetime.date.fromisoformat(options['as_of'])
+            except ValueError:
+                raise CommandError("--as-of must look like YYYY-MM-DD")
+        if User.objects.filter(username__startswith=f"{options['prefix']}-").exists():
+            raise CommandError(f"Users prefixed '{options['prefix']}-' already exist; pick another --prefix")
+
+        started = time.monotonic()
+
+        def log(message):
+            self.stdout.write(f"{message} ({time.monotonic() - started:.0f}s)")
+
+        seeder = OrgSeeder(
+            teams=options['teams'] or max(1, options['employees'] // 12),
+            employees=options['employees'],
+            years=options['years'],
+            requests_per_year=options['requests_per_year'],
+            seed=options['seed'],
+            prefix=options['prefix'],
+            as_of=as_of,
+            chunk_size=options['chunk_size'],
+            batch_size=options['batch_size'],
+            # Hashed once here; every generated user shares it
+            password_hash=make_password(options['password']) if options['password'] else None,
+            log=log,
+        )
+        counts = seeder.run()
+        self.stdout.write(self.style.SUCCESS(
+            ", ".join(f"{count} {name}" for name, count in counts.items()) + f" in {time.monotonic() - started:.0f}s"
+        ))
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leaves', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leaveallocation',
+            index=models.Index(condition=models.Q(('status', 'Active')), fields=['employee', '-created_at'], name='leave_alloc_emp_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaveallocation',
+            index=models.Index(condition=models.Q(('status', 'Active')), fields=['valid_month', 'leave_type'], name='leave_alloc_month_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaveapproval',
+            index=models.Index(condition=models.Q(('status', 'Active')), fields=['-created_at'], name='leave_appr_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaveapproval',
+            index=models.Index(condition=models.Q(('status', 'Active')), fields=['leave_request', '-approval_date'], name='leave_appr_req_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaveapproval',
+            index=models.Index(condition=models.Q(('status', 'Active')), fields=['approved_by', '-approval_date'], name='leave_appr_by_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaverequest',
+            index=models.Index(condition=models.Q(('status', 'Active')), fields=['-created_at'], name='leave_req_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaverequest',
+            index=models.Index(condition=models.Q(('status', 'Active')), fields=['employee', '-created_at'], name='leave_req_emp_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaverequest',
+            index=models.Index(condition=models.Q(('status', 'Active')), fields=['leave_status', '-created_at'], name='leave_req_status_active_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:26
+
+import django.db.models.expressions
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leaves', '0003_leave_balance_summary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leaveallocation',
+            index=models.Index(django.db.models.expressions.CombinedExpression(models.F('allocated_days'), '-', models.F('used_days')), models.F('valid_month'), condition=models.Q(('status', 'Active')), name='leave_alloc_remaining_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Range index for DateRangeOverlaps on PostgreSQL; other backends rely on leave_req_emp_dates_idx
+def create_period_gist_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS leave_req_period_gist_idx ON leaves_leaverequest "
+        "USING gist (daterange(start_date, end_date, '[]')) WHERE status = 'Active'"
+    )
+
+
+def drop_period_gist_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS leave_req_period_gist_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leaves', '0004_leave_allocation_remaining_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leaverequest',
+            index=models.Index(condition=models.Q(('status', 'Active')), fields=['employee', 'start_date', 'end_date'], name='leave_req_emp_dates_idx'),
+        ),
+        migrations.RunPython(create_period_gist_index, drop_period_gist_index),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations
+
+
+# An employee's open requests may not share a day. PostgreSQL enforces this with an exclusion
+# constraint (btree_gist provides the = operator class for employee_id); other backends rely on
+# the overlap check in LeaveRequestSerializer.validate. Existing overlaps must be resolved first.
+def create_overlap_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    schema_editor.execute(
+        "ALTER TABLE leaves_leaverequest ADD CONSTRAINT leave_req_no_overlap EXCLUDE USING gist "
+        "(employee_id WITH =, daterange(start_date, end_date, '[]') WITH &&) "
+        "WHERE (status = 'Active' AND leave_status IN ('Pending', 'team_lead_approved', 'hr_approved'))"
+    )
+
+
+def drop_overlap_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("ALTER TABLE leaves_leaverequest DROP CONSTRAINT IF EXISTS leave_req_no_overlap")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leaves', '0005_leave_request_period_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_overlap_constraint, drop_overlap_constraint),
+    ]
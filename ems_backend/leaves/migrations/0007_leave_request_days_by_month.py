@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leaves', '0006_leave_request_no_overlap'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='leaverequest',
+            name='days_by_month',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
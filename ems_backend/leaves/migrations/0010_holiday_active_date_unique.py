@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leaves', '0009_notification_outbox'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='holidaycalendar',
+            name='date',
+            field=models.DateField(),
+        ),
+        migrations.AddConstraint(
+            model_name='holidaycalendar',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'Active')), fields=('date',), name='holiday_active_date_uniq'),
+        ),
+    ]
@@ -1,6 +1,9 @@
+import datetime
+
 from django.db import models
+from django.utils import timezone
 from core.models import BaseModel
-from core.choices import Status, LeaveStatus, ApprovalType, Decision
+from core.choices import Status, LeaveStatus, ApprovalType, Decision, OutboxState
 
 class LeaveType(BaseModel):
     name = models.CharField(max_length=50, unique=True)
@@ -9,6 +12,39 @@ class LeaveType(BaseModel):
     def __str__(self):
         return self.name
 
+class HolidayCalendar(BaseModel):
+    # Public holidays; leaves.calendar skips these (and weekends) when counting leave days
+    name = models.CharField(max_length=100)
+    date = models.DateField()
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.ACTIVE)
+    
+    def __str__(self):
+        return f"{self.date} - {self.name}"
+    
+    class Meta:
+        ordering = ['date']
+        constraints = [
+            # Soft-deleted rows keep their date, so a removed holiday can be added again
+            models.UniqueConstraint(fields=['date'], name='holiday_active_date_uniq', condition=models.Q(status=Status.ACTIVE)),
+        ]
+
+def remaining_days_expression():
+    # Must stay identical to the expression in leave_alloc_remaining_idx for the index to be used
+    return models.ExpressionWrapper(
+        models.F('allocated_days') - models.F('used_days'), output_field=models.IntegerField()
+    )
+
+class LeaveAllocationQuerySet(models.QuerySet):
+    def with_remaining_days(self):
+        return self.annotate(remaining_days=remaining_days_expression())
+
+    def for_year(self, year):
+        # Range on valid_month rather than __year so the month index stays usable
+        return self.filter(
+            valid_month__gte=datetime.date(year, 1, 1),
+            valid_month__lt=datetime.date(year + 1, 1, 1),
+        )
+
 class LeaveAllocation(BaseModel):
     employee = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='leave_allocations')
     leave_type = models.ForeignKey(LeaveType, on_delete=models.CASCADE, related_name='allocations')
@@ -17,15 +53,58 @@ class LeaveAllocation(BaseModel):
     valid_month = models.DateField()  # First day of the month
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.ACTIVE)
     
-    @property
-    def remaining_days(self):
-        return self.allocated_days - self.used_days
+    # remaining_days is not stored: annotate it with with_remaining_days() or use allocated_days - used_days
+    objects = LeaveAllocationQuerySet.as_manager()
     
     def __str__(self):
         return f"{self.employee.email} - {self.leave_type.name} - {self.valid_month}"
     
     class Meta:
         unique_together = ('employee', 'leave_type', 'valid_month')
+        indexes = [
+            models.Index(fields=['employee', '-created_at'], name='leave_alloc_emp_active_idx', condition=models.Q(status=Status.ACTIVE)),
+            models.Index(fields=['valid_month', 'leave_type'], name='leave_alloc_month_active_idx', condition=models.Q(status=Status.ACTIVE)),
+            models.Index(
+                models.F('allocated_days') - models.F('used_days'), models.F('valid_month'),
+                name='leave_alloc_remaining_idx', condition=models.Q(status=Status.ACTIVE),
+            ),
+        ]
+
+class DateRangeOverlaps(models.Func):
+    # Closed-interval overlap of a (start, end) column pair with a date window.
+    # PostgreSQL compares dateranges so leave_req_period_gist_idx applies; other backends
+    # use plain comparisons against leave_req_emp_dates_idx.
+    output_field = models.BooleanField()
+
+    def __init__(self, start_field, end_field, start, end):
+        super().__init__(models.F(start_field), models.F(end_field), models.Value(start), models.Value(end))
+
+    def compile_parts(self, compiler):
+        parts = [compiler.compile(expression) for expression in self.get_source_expressions()]
+        return [sql for sql, _ in parts], [params for _, params in parts]
+
+    def as_sql(self, compiler, connection, **extra_context):
+        (start_col, end_col, start, end), (p_start_col, p_end_col, p_start, p_end) = self.compile_parts(compiler)
+        sql = f'({start_col} <= {end} AND {end_col} >= {start})'
+        return sql, (*p_start_col, *p_end, *p_end_col, *p_start)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        (start_col, end_col, start, end), params = self.compile_parts(compiler)
+        sql = f"daterange({start_col}, {end_col}, '[]') && daterange({start}, {end}, '[]')"
+        return sql, tuple(param for group in params for param in group)
+
+# Requests that still hold their dates; rejected and withdrawn ones free them
+OPEN_LEAVE_STATUSES = (LeaveStatus.PENDING, LeaveStatus.TEAM_LEAD_APPROVED, LeaveStatus.HR_APPROVED)
+
+# PostgreSQL-only exclusion constraint over open requests, created in migration 0006
+LEAVE_OVERLAP_CONSTRAINT = 'leave_req_no_overlap'
+
+class LeaveRequestQuerySet(models.QuerySet):
+    def open(self):
+        return self.filter(status=Status.ACTIVE, leave_status__in=OPEN_LEAVE_STATUSES)
+
+    def overlapping(self, start, end):
+        return self.filter(DateRangeOverlaps('start_date', 'end_date', start, end))
 
 class LeaveRequest(BaseModel):
     employee = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='leave_requests')
@@ -52,12 +131,28 @@ class LeaveRequest(BaseModel):
     )
     leave_status = models.CharField(max_length=20, choices=LeaveStatus.choices, default=LeaveStatus.PENDING)
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.ACTIVE)
+    # {"YYYY-MM-01": days} charged to each month's allocation, fixed when the request is submitted
+    days_by_month = models.JSONField(default=dict, blank=True, editable=False)
+    
+    objects = LeaveRequestQuerySet.as_manager()
+    
+    def month_days(self):
+        # Requests saved before the split was recorded charge everything to their first month
+        if self.days_by_month:
+            return {datetime.date.fromisoformat(month): days for month, days in self.days_by_month.items()}
+        return {self.start_date.replace(day=1): self.days_requested}
     
     def __str__(self):
         return f"{self.employee.email} - {self.leave_type.name} - {self.start_date} to {self.end_date}"
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='leave_req_active_idx', condition=models.Q(status=Status.ACTIVE)),
+            models.Index(fields=['employee', '-created_at'], name='leave_req_emp_active_idx', condition=models.Q(status=Status.ACTIVE)),
+            models.Index(fields=['leave_status', '-created_at'], name='leave_req_status_active_idx', condition=models.Q(status=Status.ACTIVE)),
+            models.Index(fields=['employee', 'start_date', 'end_date'], name='leave_req_emp_dates_idx', condition=models.Q(status=Status.ACTIVE)),
+        ]
 
 class LeaveApproval(BaseModel):
     leave_request = models.ForeignKey(LeaveRequest, on_delete=models.CASCADE, related_name='approvals')
@@ -72,4 +167,55 @@ class LeaveApproval(BaseModel):
         return f"{self.approval_type} - {self.decision} - {self.leave_request}"
     
     class Meta:
-        ordering = ['-approval_date']
\ No newline at end of file
+        ordering = ['-approval_date']
+        indexes = [
+            models.Index(fields=['-created_at'], name='leave_appr_active_idx', condition=models.Q(status=Status.ACTIVE)),
+            models.Index(fields=['leave_request', '-approval_date'], name='leave_appr_req_active_idx', condition=models.Q(status=Status.ACTIVE)),
+            models.Index(fields=['approved_by', '-approval_date'], name='leave_appr_by_active_idx', condition=models.Q(status=Status.ACTIVE)),
+        ]
+
+class LeaveBalanceSummary(BaseModel):
+    # Denormalized per-year balance, kept in step by leaves.balances
+    employee = models.ForeignKey('users.User', on_delete=models.CASCADE, related_name='leave_balances')
+    leave_type = models.ForeignKey(LeaveType, on_delete=models.CASCADE, related_name='balances')
+    year = models.PositiveSmallIntegerField()
+    allocated_days = models.IntegerField(default=0)
+    used_days = models.IntegerField(default=0)
+    pending_days = models.IntegerField(default=0)
+    
+    @property
+    def remaining_days(self):
+        return self.allocated_days - self.used_days
+    
+    @property
+    def available_days(self):
+        return self.allocated_days - self.used_days - self.pending_days
+    
+    def __str__(self):
+        return f"{self.employee_id} - {self.leave_type_id} - {self.year}"
+    
+    class Meta:
+        unique_together = ('employee', 'leave_type', 'year')
+        indexes = [
+            models.Index(fields=['year', 'leave_type'], name='leave_balance_year_type_idx'),
+        ]
+
+class NotificationOutbox(BaseModel):
+    # Written in the same transaction as the event; delivered later by manage.py run_outbox_worker
+    event = models.CharField(max_length=50)
+    idempotency_key = models.CharField(max_length=100, unique=True)
+    recipients = models.JSONField(default=list)
+    payload = models.JSONField(default=dict)
+    state = models.CharField(max_length=20, choices=OutboxState.choices, default=OutboxState.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"{self.event} - {self.idempotency_key} - {self.state}"
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['next_attempt_at'], name='outbox_pending_due_idx', condition=models.Q(state=OutboxState.PENDING)),
+        ]
@@ -0,0 +1,119 @@
+import datetime
+import random
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from leaves.models import NotificationOutbox
+from core.choices import ApprovalType, Decision, OutboxState
+
+LEAVE_APPROVAL_EVENT = 'leave_approval'
+
+
+def approval_message(approval, leave_request):
+    # One outbox row per LeaveApproval; the approval's alias makes redelivery detectable downstream
+    employee = leave_request.employee
+    return NotificationOutbox(
+        event=LEAVE_APPROVAL_EVENT,
+        idempotency_key=f"{LEAVE_APPROVAL_EVENT}:{approval.alias}",
+        recipients=[employee.email],
+        payload={
+            'approval': str(approval.alias),
+            'approval_type': approval.approval_type,
+            'decision': approval.decision,
+            'notes': approval.notes or '',
+            'leave_request': leave_request.id,
+            'leave_status': leave_request.leave_status,
+            'leave_type': leave_request.leave_type_id,
+            'start_date': leave_request.start_date.isoformat(),
+            'end_date': leave_request.end_date.isoformat(),
+            'days_requested': leave_request.days_requested,
+            'employee': employee.email,
+            'approved_by': approval.approved_by.email,
+        },
+    )
+
+
+def enqueue_approval_notifications(pairs):
+    # pairs: (approval, leave_request); must run inside the transaction that created the approvals
+    messages = [approval_message(approval, leave_request) for approval, leave_request in pairs]
+    NotificationOutbox.objects.bulk_create(messages, ignore_conflicts=True)
+
+
+def render_message(message):
+    # (subject, body) shared by every backend that produces human-readable output
+    payload = message.payload
+    period = f"{payload['start_date']} to {payload['end_date']} ({payload['days_requested']} day(s))"
+    if payload['decision'] == Decision.WITHDRAW:
+        subject = "Your leave was withdrawn"
+    else:
+        stage = "team lead" if payload['approval_type'] == ApprovalType.TEAM_LEAD else "HR"
+        subject = f"Your leave was {payload['decision'].lower()} by {stage}"
+    lines = [
+        f"Leave request #{payload['leave_request']}: {period}",
+        f"Decision: {payload['decision']} by {payload['approved_by']}",
+        f"Current status: {payload['leave_status']}",
+    ]
+    if payload.get('notes'):
+        lines.append(f"Notes: {payload['notes']}")
+    return subject, "\n".join(lines)
+
+
+def get_backend():
+    return import_string(getattr(settings, 'OUTBOX_BACKEND', 'leaves.outbox_backends.ConsoleBackend'))()
+
+
+def retry_delay(attempts):
+    # Exponential backoff with jitter, capped
+    base = getattr(settings, 'OUTBOX_RETRY_BASE_SECONDS', 30)
+    cap = getattr(settings, 'OUTBOX_RETRY_MAX_SECONDS', 3600)
+    delay = min(cap, base * 2 ** max(attempts - 1, 0))
+    return datetime.timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def claim_batch(batch_size, lease_seconds):
+    # Lease due messages by pushing next_attempt_at forward; a crashed worker's lease simply expires
+    now = timezone.now()
+    with transaction.atomic():
+        messages = list(
+            NotificationOutbox.objects.select_for_update(skip_locked=True)
+            .filter(state=OutboxState.PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        if messages:
+            NotificationOutbox.objects.filter(pk__in=[message.pk for message in messages]).update(
+                next_attempt_at=now + datetime.timedelta(seconds=lease_seconds), updated_at=now
+            )
+    return messages
+
+
+def deliver_batch(backend, batch_size=100, lease_seconds=300, max_attempts=None):
+    # Returns (sent, retried, failed) for one claimed batch
+    max_attempts = max_attempts or getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 8)
+    messages = claim_batch(batch_size, lease_seconds)
+    sent, retried, failed = [], [], []
+    for message in messages:
+        message.attempts += 1
+        message.updated_at = timezone.now()
+        try:
+            backend.send(message)
+        except Exception as exc:  # any backend failure is retried
+            message.last_error = f"{type(exc).__name__}: {exc}"[:2000]
+            if message.attempts >= max_attempts:
+                message.state = OutboxState.FAILED
+                failed.append(message)
+            else:
+                message.next_attempt_at = timezone.now() + retry_delay(message.attempts)
+                retried.append(message)
+        else:
+            message.state = OutboxState.SENT
+            message.sent_at = timezone.now()
+            message.last_error = ''
+            sent.append(message)
+
+    if messages:
+        NotificationOutbox.objects.bulk_update(
+            messages, ['state', 'attempts', 'next_attempt_at', 'last_error', 'sent_at', 'updated_at']
+        )
+    return len(sent), len(retried), len(failed)
@@ -0,0 +1,90 @@
+import json
+import sys
+import urllib.request
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from leaves.outbox import render_message
+
+
+class BaseBackend:
+    # send(message) delivers one NotificationOutbox row or raises; the worker handles retries
+
+    def send(self, message):
+        raise NotImplementedError
+
+
+class ConsoleBackend(BaseBackend):
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def send(self, message):
+        subject, body = render_message(message)
+        self.stream.write(
+            f"[{message.idempotency_key}] To: {', '.join(message.recipients)}\n{subject}\n{body}\n\n"
+        )
+        self.stream.flush()
+
+
+class FileBackend(BaseBackend):
+    # One JSON line per delivery; the path comes from OUTBOX_FILE_PATH
+    def __init__(self, path=None):
+        self.path = path or getattr(settings, 'OUTBOX_FILE_PATH', '') or 'outbox.log'
+
+    def send(self, message):
+        subject, body = render_message(message)
+        record = {
+            'idempotency_key': message.idempotency_key,
+            'event': message.event,
+            'recipients': message.recipients,
+            'subject': subject,
+            'body': body,
+            'payload': message.payload,
+        }
+        with open(self.path, 'a', encoding='utf-8') as handle:
+            handle.write(json.dumps(record) + "\n")
+
+
+class SMTPBackend(BaseBackend):
+    # Uses Django's EMAIL_* settings; the idempotency key doubles as a stable Message-ID
+    def __init__(self):
+        self.connection = get_connection()
+
+    def send(self, message):
+        subject, body = render_message(message)
+        domain = settings.DEFAULT_FROM_EMAIL.rsplit('@', 1)[-1].strip('>')
+        email = EmailMessage(
+            subject=subject,
+            body=body,
+            to=message.recipients,
+            connection=self.connection,
+            headers={
+                'Message-ID': f"<{message.idempotency_key.replace(':', '.')}@{domain}>",
+                'X-Idempotency-Key': message.idempotency_key,
+            },
+        )
+        email.send(fail_silently=False)
+
+
+class WebhookBackend(BaseBackend):
+    # POSTs the raw event to OUTBOX_WEBHOOK_URL with an Idempotency-Key header
+    def __init__(self, url=None, timeout=None):
+        self.url = url or settings.OUTBOX_WEBHOOK_URL
+        self.timeout = timeout or getattr(settings, 'OUTBOX_WEBHOOK_TIMEOUT', 10)
+
+    def send(self, message):
+        body = json.dumps({
+            'event': message.event,
+            'idempotency_key': message.idempotency_key,
+            'recipients': message.recipients,
+            'payload': message.payload,
+        }).encode()
+        request = urllib.request.Request(
+            self.url,
+            data=body,
+            method='POST',
+            headers={'Content-Type': 'application/json', 'Idempotency-Key': message.idempotency_key},
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            if response.status >= 300:
+                raise RuntimeError(f"Webhook answered {response.status}")
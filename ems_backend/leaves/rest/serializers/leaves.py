@@ -1,22 +1,40 @@
 from rest_framework import serializers
 from django.utils import timezone
-from leaves.models import LeaveType, LeaveAllocation, LeaveRequest, LeaveApproval
+from leaves.models import LeaveType, LeaveAllocation, LeaveRequest, LeaveApproval, LeaveBalanceSummary, HolidayCalendar
 from core.choices import Status, LeaveStatus, ApprovalType, Decision
 from leaves.services import deduct_leave_days, withdraw_leave
+from leaves.calendar import working_days_by_month
+from core.permissions import get_user_role_name, get_user_team_id
+from core.rest.serializers.core import EagerLoadingMixin, InstrumentedSerializerMixin, ReferencePrimaryKeyField
+from users.rest.serializers.users import UserSummarySerializer
 
 
-class LeaveTypeSerializer(serializers.ModelSerializer):
+class LeaveTypeSerializer(InstrumentedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = LeaveType
         fields = ['id', 'alias', 'name']
 
-class LeaveAllocationSerializer(serializers.ModelSerializer):
-    remaining_days = serializers.IntegerField(read_only=True)
+class HolidayCalendarSerializer(InstrumentedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = HolidayCalendar
+        fields = ['id', 'alias', 'name', 'date']
+
+class LeaveAllocationSerializer(InstrumentedSerializerMixin, EagerLoadingMixin, serializers.ModelSerializer):
+    leave_type = ReferencePrimaryKeyField(model=LeaveType)
+    remaining_days = serializers.SerializerMethodField()
     
     class Meta:
         model = LeaveAllocation
         fields = ['id', 'employee', 'leave_type', 'allocated_days', 'used_days', 'remaining_days', 'valid_month']
         read_only_fields = ['used_days', 'remaining_days', 'created_at', 'updated_at']
+        expandable_fields = {
+            'employee': UserSummarySerializer,
+            'leave_type': LeaveTypeSerializer,
+        }
+
+    def get_remaining_days(self, obj):
+        # From the fields, so created/updated instances without the annotation serialize too
+        return obj.allocated_days - obj.used_days
 
     def validate(self, data):
         # Validate allocation data
@@ -24,61 +42,95 @@ class LeaveAllocationSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Allocated days cannot be negative")
         return data
     
-class LeaveRequestSerializer(serializers.ModelSerializer):
+class LeaveAllocationProvisionSerializer(serializers.Serializer):
+    valid_month = serializers.DateField(input_formats=['%Y-%m', '%Y-%m-%d'])
+    allocated_days = serializers.IntegerField(min_value=0)
+    leave_types = ReferencePrimaryKeyField(model=LeaveType, active_only=True, many=True, required=False)
+    employees = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    overwrite = serializers.BooleanField(default=True)
+
+    def validate_valid_month(self, value):
+        return value.replace(day=1)
+
+class LeaveRequestSerializer(InstrumentedSerializerMixin, EagerLoadingMixin, serializers.ModelSerializer):
+    leave_type = ReferencePrimaryKeyField(model=LeaveType)
+
     class Meta:
         model = LeaveRequest
-        fields = ['id', 'employee', 'leave_type', 'start_date', 'end_date', 'days_requested', 'reason', 'team_lead_approval', 'hr_approval', 'approved_by_team_lead', 'approved_by_hr', 'leave_status']
-        read_only_fields = ['employee', 'created_at', 'updated_at', 'team_lead_approval', 
+        fields = ['id', 'employee', 'leave_type', 'start_date', 'end_date', 'days_requested', 'days_by_month', 'reason', 'team_lead_approval', 'hr_approval', 'approved_by_team_lead', 'approved_by_hr', 'leave_status']
+        read_only_fields = ['employee', 'days_requested', 'days_by_month', 'created_at', 'updated_at', 'team_lead_approval', 
                            'hr_approval', 'approved_by_team_lead', 'approved_by_hr', 
                            'leave_status']
+        expandable_fields = {
+            'employee': UserSummarySerializer,
+            'leave_type': LeaveTypeSerializer,
+            'approved_by_team_lead': UserSummarySerializer,
+            'approved_by_hr': UserSummarySerializer,
+        }
         
     def validate(self, data):
 
-        # Check team membership
+        # Check team membership; an update is checked against the request's owner, not whoever edits it
         request = self.context.get('request')
-        employee = request.user if request else None
+        owner = self.instance.employee if self.instance else (request.user if request else None)
 
-        # employee = data['employee']
-        if not employee.team:
+        if not owner.team_id:
             raise serializers.ValidationError("Employee must belong to a team to apply for leave")
         
 
+        # A partial update keeps the request's current dates and leave type
+        start_date, end_date, leave_type = (
+            data.get(field, getattr(self.instance, field, None)) for field in ('start_date', 'end_date', 'leave_type')
+        )
+
         # Check if end date is after start date
-        if data['start_date'] > data['end_date']:
+        if start_date > end_date:
             raise serializers.ValidationError("End date must be after start date")
         
         # Check if dates are in the future
-        if data['start_date'] < timezone.now().date():
+        if start_date < timezone.now().date():
             raise serializers.ValidationError("Cannot request leave for past dates")
         
-        # Check leave balance
-        leave_type = data['leave_type']
-        days_requested = data['days_requested']
-        
-        # Get allocation for the month of start_date
-        month_start = data['start_date'].replace(day=1)
-        try:
-            allocation = LeaveAllocation.objects.get(
-                employee=employee,
-                leave_type=leave_type,
-                valid_month=month_start,
-                status=Status.ACTIVE
-            )
-            if allocation.remaining_days < days_requested:
+        # Days are counted server-side from the dates, skipping weekends, and split per month
+        month_days = working_days_by_month(start_date, end_date)
+        if not month_days:
+            raise serializers.ValidationError("The selected dates contain no working days")
+        data['days_requested'] = sum(month_days.values())
+        data['days_by_month'] = {month.isoformat(): days for month, days in month_days.items()}
+
+        # Reject overlaps with the employee's open requests; one query on leave_req_emp_dates_idx
+        overlapping = LeaveRequest.objects.open().filter(employee=owner).overlapping(start_date, end_date)
+        if self.instance:
+            overlapping = overlapping.exclude(pk=self.instance.pk)
+        if overlapping.exists():
+            raise serializers.ValidationError("These dates overlap another pending or approved leave request")
+
+        # Check leave balance of every month the leave touches in one query
+        remaining = dict(
+            LeaveAllocation.objects.with_remaining_days()
+            .filter(employee=owner, leave_type=leave_type, valid_month__in=month_days, status=Status.ACTIVE)
+            .values_list('valid_month', 'remaining_days')
+        )
+        for month, days in sorted(month_days.items()):
+            if month not in remaining:
+                raise serializers.ValidationError(f"No active leave allocation found for {month:%Y-%m}")
+            if remaining[month] < days:
                 raise serializers.ValidationError(
-                    f"Insufficient leave balance. Available: {allocation.remaining_days}"
+                    f"Insufficient leave balance for {month:%Y-%m}. Available: {remaining[month]}, needed: {days}"
                 )
-        except LeaveAllocation.DoesNotExist:
-            raise serializers.ValidationError("No active leave allocation found for this period")
         
         return data
     
 
-class LeaveApprovalSerializer(serializers.ModelSerializer):
+class LeaveApprovalSerializer(InstrumentedSerializerMixin, EagerLoadingMixin, serializers.ModelSerializer):
     class Meta:
         model = LeaveApproval
         fields = ['id', 'leave_request', 'approved_by', 'approval_type', 'decision', 'approval_date', 'notes']
         read_only_fields = ['approval_date', 'created_at', 'updated_at']
+        expandable_fields = {
+            'leave_request': LeaveRequestSerializer,
+            'approved_by': UserSummarySerializer,
+        }
 
 
     def validate(self, data):
@@ -90,12 +142,30 @@ class LeaveApprovalSerializer(serializers.ModelSerializer):
         # Check if user has permission to approve
         user = self.context['request'].user
         
+        role = get_user_role_name(user)
+        
         if approval_type == ApprovalType.TEAM_LEAD:
-            if user.role.name != 'Team Lead' or leave_request.employee.team != user.team:
+            team_id = get_user_team_id(user)
+            if role != 'Team Lead' or team_id is None or leave_request.employee.team_id != team_id:
                 raise serializers.ValidationError("You are not authorized to approve this request as team lead")
         
         elif approval_type == ApprovalType.HR:
-            if user.role.name != 'HR':
+            if role != 'HR':
                 raise serializers.ValidationError("Only HR can provide final approval")
         
-        return data
\ No newline at end of file
+        return data
+
+
+class LeaveBalanceSummarySerializer(InstrumentedSerializerMixin, EagerLoadingMixin, serializers.ModelSerializer):
+    remaining_days = serializers.IntegerField(read_only=True)
+    available_days = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = LeaveBalanceSummary
+        fields = ['id', 'employee', 'leave_type', 'year', 'allocated_days', 'used_days', 'pending_days',
+                  'remaining_days', 'available_days']
+        read_only_fields = fields
+        expandable_fields = {
+            'employee': UserSummarySerializer,
+            'leave_type': LeaveTypeSerializer,
+        }
@@ -0,0 +1,146 @@
+import datetime
+import threading
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+
+from core.choices import ApprovalType, Decision, LeaveStatus
+from leaves.models import LeaveAllocation, LeaveRequest, LeaveType
+from leaves.services import InsufficientLeaveBalance, process_leave_approval
+from users.models import User, UserRole
+
+
+class ApprovalBalanceTests(TestCase):
+    # Serial counterpart of the stress test below; runs on every backend
+    def setUp(self):
+        self.january = datetime.date(2030, 1, 1)
+        self.february = datetime.date(2030, 2, 1)
+        self.hr = User.objects.create_user(
+            email="hr@riseuplabs.com", username="hr", password="pw", role=UserRole.objects.create(name="HR")
+        )
+        self.employee = User.objects.create_user(
+            email="emp@riseuplabs.com", username="emp", password="pw", role=UserRole.objects.create(name="Employee")
+        )
+        self.leave_type = LeaveType.objects.create(name="Casual")
+        self.allocations = {
+            month: LeaveAllocation.objects.create(
+                employee=self.employee, leave_type=self.leave_type, valid_month=month, allocated_days=2
+            )
+            for month in (self.january, self.february)
+        }
+
+    def leave_request(self, start_date, end_date, days_by_month):
+        return LeaveRequest.objects.create(
+            employee=self.employee,
+            leave_type=self.leave_type,
+            start_date=start_date,
+            end_date=end_date,
+            days_requested=sum(days_by_month.values()),
+            days_by_month={month.isoformat(): days for month, days in days_by_month.items()},
+            reason="serial",
+        )
+
+    def approve(self, leave_request):
+        process_leave_approval(leave_request, self.hr, ApprovalType.HR, Decision.APPROVE)
+
+    def test_approval_past_allocated_days_is_refused(self):
+        self.approve(self.leave_request(datetime.date(2030, 1, 7), datetime.date(2030, 1, 8), {self.january: 2}))
+        overdraw = self.leave_request(datetime.date(2030, 1, 9), datetime.date(2030, 1, 9), {self.january: 1})
+
+        with self.assertRaises(InsufficientLeaveBalance):
+            self.approve(overdraw)
+
+        overdraw.refresh_from_db()
+        self.assertEqual(overdraw.leave_status, LeaveStatus.PENDING)
+        self.allocations[self.january].refresh_from_db()
+        self.assertEqual(self.allocations[self.january].used_days, 2)
+
+    def test_multi_month_request_charges_each_allocation(self):
+        self.approve(
+            self.leave_request(datetime.date(2030, 1, 31), datetime.date(2030, 2, 1), {self.january: 1, self.february: 1})
+        )
+
+        for allocation in self.allocations.values():
+            allocation.refresh_from_db()
+            self.assertEqual(allocation.used_days, 1)
+
+    def test_multi_month_request_short_in_one_month_charges_neither(self):
+        LeaveAllocation.objects.filter(pk=self.allocations[self.february].pk).update(used_days=2)
+
+        with self.assertRaises(InsufficientLeaveBalance):
+            self.approve(
+                self.leave_request(
+                    datetime.date(2030, 1, 31), datetime.date(2030, 2, 1), {self.january: 1, self.february: 1}
+                )
+            )
+
+        self.allocations[self.january].refresh_from_db()
+        self.assertEqual(self.allocations[self.january].used_days, 0)
+
+
+# SQLite ignores SELECT ... FOR UPDATE, so the allocation lock can only be exercised on a server database
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentApprovalTests(TransactionTestCase):
+    workers = 8
+    allocated_days = 3
+
+    def setUp(self):
+        self.month = datetime.date(2030, 1, 1)
+        self.hr = User.objects.create_user(
+            email="hr@riseuplabs.com", username="hr", password="pw", role=UserRole.objects.create(name="HR")
+        )
+        employee = User.objects.create_user(
+            email="emp@riseuplabs.com", username="emp", password="pw", role=UserRole.objects.create(name="Employee")
+        )
+        leave_type = LeaveType.objects.create(name="Casual")
+        self.allocation = LeaveAllocation.objects.create(
+            employee=employee, leave_type=leave_type, valid_month=self.month, allocated_days=self.allocated_days
+        )
+        self.request_ids = [
+            LeaveRequest.objects.create(
+                employee=employee,
+                leave_type=leave_type,
+                start_date=self.month + datetime.timedelta(days=day),
+                end_date=self.month + datetime.timedelta(days=day),
+                days_requested=1,
+                days_by_month={self.month.isoformat(): 1},
+                reason="stress",
+            ).pk
+            for day in range(self.workers)
+        ]
+
+    def approve_all_at_once(self):
+        barrier = threading.Barrier(self.workers)
+        results = []
+
+        def approve(pk):
+            try:
+                leave_request = LeaveRequest.objects.get(pk=pk)
+                barrier.wait()
+                process_leave_approval(leave_request, self.hr, ApprovalType.HR, Decision.APPROVE)
+                results.append('approved')
+            except InsufficientLeaveBalance:
+                results.append('refused')
+            except Exception as exc:
+                results.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=approve, args=(pk,)) for pk in self.request_ids]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_parallel_approvals_never_overdraw_one_allocation(self):
+        results = self.approve_all_at_once()
+
+        self.assertEqual([result for result in results if result not in ('approved', 'refused')], [])
+        self.allocation.refresh_from_db()
+        approved = LeaveRequest.objects.filter(pk__in=self.request_ids, leave_status=LeaveStatus.HR_APPROVED).count()
+        self.assertEqual(results.count('approved'), self.allocated_days)
+        self.assertEqual(approved, self.allocated_days)
+        # No lost updates: every committed approval is charged exactly once
+        self.assertEqual(self.allocation.used_days, approved)
+        self.assertLessEqual(self.allocation.used_days, self.allocation.allocated_days)
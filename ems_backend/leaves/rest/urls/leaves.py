@@ -1,12 +1,13 @@
 from django.urls import path
-from leaves.rest.views.approval_views import approve_leave, withdraw_leave_view
+from leaves.rest.views.approval_views import approve_leave, withdraw_leave_view, bulk_approve_leave
 from leaves.rest.views.leaves import (
     LeaveTypeListCreateView, LeaveTypeRetrieveUpdateDestroyView,
-    LeaveAllocationListCreateView, LeaveAllocationRetrieveUpdateDestroyView,
-    LeaveRequestListCreateView, LeaveRequestRetrieveUpdateDestroyView,
-    LeaveApprovalListCreateView, LeaveApprovalRetrieveUpdateDestroyView,
+    LeaveAllocationListCreateView, LeaveAllocationRetrieveUpdateDestroyView, LeaveAllocationProvisionView,
+    LeaveRequestListCreateView, LeaveRequestRetrieveUpdateDestroyView, LeaveRequestExportView,
+    LeaveApprovalListCreateView, LeaveApprovalRetrieveUpdateDestroyView, LeaveApprovalExportView,
     EmployeeLeaveAllocationListView, EmployeeLeaveRequestListView,
-    LeaveRequestApprovalListView, UserGivenApprovalsListView,
+    LeaveRequestApprovalListView, UserGivenApprovalsListView, LeaveBalanceSummaryListView,
+    LeaveCalendarView, HolidayListCreateView, HolidayRetrieveUpdateDestroyView,
 
 )
 
@@ -15,24 +16,38 @@ urlpatterns = [
     path('types/', LeaveTypeListCreateView.as_view(), name='leave-type-list-create'),
     path('types/<int:pk>/', LeaveTypeRetrieveUpdateDestroyView.as_view(), name='leave-type-detail'),
     
+    # Holiday calendar endpoints
+    path('holidays/', HolidayListCreateView.as_view(), name='holiday-list-create'),
+    path('holidays/<int:pk>/', HolidayRetrieveUpdateDestroyView.as_view(), name='holiday-detail'),
+
     # LeaveAllocation endpoints
     path('allocations/', LeaveAllocationListCreateView.as_view(), name='leave-allocation-list-create'),
+    path('allocations/bulk/', LeaveAllocationProvisionView.as_view(), name='leave-allocation-bulk'),
     path('allocations/<int:pk>/', LeaveAllocationRetrieveUpdateDestroyView.as_view(), name='leave-allocation-detail'),
     path('employees/<int:employee_id>/allocations/', EmployeeLeaveAllocationListView.as_view(), name='employee-leave-allocations'),
     
     # LeaveRequest endpoint
     path('requests/', LeaveRequestListCreateView.as_view(), name='leave-request-list-create'),
+    path('requests/export/', LeaveRequestExportView.as_view(), name='leave-request-export'),
     path('requests/<int:pk>/', LeaveRequestRetrieveUpdateDestroyView.as_view(), name='leave-request-detail'),
     path('employees/<int:employee_id>/requests/', EmployeeLeaveRequestListView.as_view(), name='employee-leave-requests'),
 
     # LeaveApproval endpoints
     path('approvals/', LeaveApprovalListCreateView.as_view(), name='leave-approval-list-create'),
+    path('approvals/export/', LeaveApprovalExportView.as_view(), name='leave-approval-export'),
     path('approvals/<int:pk>/', LeaveApprovalRetrieveUpdateDestroyView.as_view(), name='leave-approval-detail'),
     path('requests/<int:leave_request_id>/approvals/', LeaveRequestApprovalListView.as_view(), name='leave-request-approvals'),
     path('users/<int:user_id>/given-approvals/', UserGivenApprovalsListView.as_view(), name='user-given-approvals'),
 
+    # Balance summaries
+    path('balances/', LeaveBalanceSummaryListView.as_view(), name='leave-balance-list'),
+
+    # Team calendar
+    path('calendar/', LeaveCalendarView.as_view(), name='leave-calendar'),
+
     # Approval actions
     path('requests/<int:pk>/approve/', approve_leave, name='leave-approve'),
+    path('requests/bulk-approve/', bulk_approve_leave, name='leave-bulk-approve'),
     path('requests/<int:pk>/withdraw/', withdraw_leave_view, name='leave-withdraw'),
 ]
 
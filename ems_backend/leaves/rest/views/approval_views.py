@@ -2,14 +2,15 @@ from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from leaves.models import LeaveRequest
-from leaves.services import process_leave_approval, withdraw_leave
+from leaves.services import process_leave_approval, withdraw_leave, bulk_process_leave_approvals
 from core.choices import Status, LeaveStatus, ApprovalType, Decision
+from core.permissions import get_user_role_name, get_user_team_id
 
 @api_view(['POST'])
 def approve_leave(request, pk):
     # View to approve/reject leave
     try:
-        leave_request = LeaveRequest.objects.get(id=pk, status=Status.ACTIVE)
+        leave_request = LeaveRequest.objects.select_related('employee').get(id=pk, status=Status.ACTIVE)
         approval_type = request.data.get('approval_type')
         decision = request.data.get('decision')
         notes = request.data.get('notes', '')
@@ -26,16 +27,18 @@ def approve_leave(request, pk):
             return Response({'error': 'Invalid approval_type or decision'}, status=400)
         
         # Permission checks 
+        role = get_user_role_name(request.user)
         if approval_type == ApprovalType.TEAM_LEAD:
-            if request.user.role.name != 'Team Lead':
+            if role != 'Team Lead':
                 return Response({'error': 'Only Team Leads can approve as team lead'}, status=403)
-            if leave_request.employee.team != request.user.team:
+            team_id = get_user_team_id(request.user)
+            if team_id is None or leave_request.employee.team_id != team_id:
                 return Response({'error': 'Can only approve leaves for your team'}, status=403)
-            if leave_request.employee == request.user:
+            if leave_request.employee_id == request.user.pk:
                 return Response({'error': 'Cannot approve your own leave'}, status=403)
         
         elif approval_type == ApprovalType.HR:
-            if request.user.role.name != 'HR':
+            if role != 'HR':
                 return Response({'error': 'Only HR can give final approval'}, status=403)
         
         # Process approval
@@ -59,7 +62,7 @@ def withdraw_leave_view(request, pk):
         leave_request = LeaveRequest.objects.get(id=pk, status=Status.ACTIVE)
         
         # Permission check 
-        if request.user.role.name != 'HR':
+        if get_user_role_name(request.user) != 'HR':
             return Response({'error': 'Only HR can withdraw leaves'}, status=403)
         
         if leave_request.leave_status != LeaveStatus.HR_APPROVED:
@@ -77,4 +80,46 @@ def withdraw_leave_view(request, pk):
     except LeaveRequest.DoesNotExist:
         return Response({'error': 'Leave request not found'}, status=404)
     except Exception as e:
-        return Response({'error': str(e)}, status=400)
\ No newline at end of file
+        return Response({'error': str(e)}, status=400)
+
+
+BULK_APPROVAL_LIMIT = 500
+
+@api_view(['POST'])
+def bulk_approve_leave(request):
+    # Approve/reject many leave requests at once; each id gets its own result
+    ids = request.data.get('ids')
+    approval_type = request.data.get('approval_type')
+    decision = request.data.get('decision')
+    notes = request.data.get('notes', '')
+    
+    # Validate required fields
+    if not isinstance(ids, list) or not ids or not approval_type or not decision:
+        return Response({'error': 'ids (non-empty list), approval_type and decision are required'}, status=400)
+    if len(ids) > BULK_APPROVAL_LIMIT:
+        return Response({'error': f'At most {BULK_APPROVAL_LIMIT} requests per call'}, status=400)
+    
+    try:
+        ids = [int(leave_request_id) for leave_request_id in ids]
+        approval_type = ApprovalType(approval_type)
+        decision = Decision(decision)
+    except (TypeError, ValueError):
+        return Response({'error': 'Invalid ids, approval_type or decision'}, status=400)
+    if decision == Decision.WITHDRAW:
+        return Response({'error': 'Use the withdraw endpoint to withdraw leave'}, status=400)
+    
+    # Role check for the whole batch; team and ownership rules are checked per request
+    role = get_user_role_name(request.user)
+    if approval_type == ApprovalType.TEAM_LEAD and role != 'Team Lead':
+        return Response({'error': 'Only Team Leads can approve as team lead'}, status=403)
+    if approval_type == ApprovalType.HR and role != 'HR':
+        return Response({'error': 'Only HR can give final approval'}, status=403)
+    
+    results = bulk_process_leave_approvals(ids, request.user, approval_type, decision, notes)
+    succeeded = sum(1 for result in results if result['success'])
+    
+    return Response({
+        'succeeded': succeeded,
+        'failed': len(results) - succeeded,
+        'results': results,
+    }, status=status.HTTP_200_OK)
@@ -1,14 +1,22 @@
-from rest_framework import generics, status
+import datetime
+
+from django.db import IntegrityError, transaction
+from rest_framework import generics, status, serializers
 from rest_framework.response import Response
-from leaves.models import LeaveType, LeaveAllocation, LeaveRequest, LeaveApproval
+from leaves.models import LeaveType, LeaveAllocation, LeaveRequest, LeaveApproval, LeaveBalanceSummary, HolidayCalendar, LEAVE_OVERLAP_CONSTRAINT
 from leaves.rest.serializers.leaves import (
-    LeaveTypeSerializer, LeaveAllocationSerializer, 
-    LeaveRequestSerializer, LeaveApprovalSerializer
+    LeaveTypeSerializer, LeaveAllocationSerializer, LeaveAllocationProvisionSerializer,
+    LeaveRequestSerializer, LeaveApprovalSerializer, LeaveBalanceSummarySerializer, HolidayCalendarSerializer
 )
 from core.permissions import IsHR, LeaveAllocationPermissions, LeaveRequestPermissions, IsTeamLead, IsOwner, LeaveApprovalPermissions
+from core.permissions import get_user_role_name, get_user_team_id, LeaveBalancePermissions, LeaveCalendarPermissions, HolidayPermissions
+from core.principal import get_principal
 from core.choices import Status, LeaveStatus, ApprovalType, Decision
 from core.utils import get_user_role
-from leaves.services import process_leave_approval
+from core.rest.views.core import AsyncListViewMixin, ConditionalGetMixin, EagerLoadingViewMixin, PolicyScopedQuerysetMixin, ResponseCacheMixin, StreamingExportMixin
+from leaves.services import process_leave_approval, provision_allocations, LeaveProcessingError
+from leaves.balances import allocation_key, leave_request_usage, apply_status_change, refresh_balance_summaries
+from leaves.absences import absence_calendar, MAX_CALENDAR_DAYS
 
 
 
@@ -23,9 +31,50 @@ class SoftDeleteMixin:
         instance.status = Status.REMOVED
         instance.save()
 
+class AllocationBalanceFilterMixin:
+    # remaining_days is annotated in SQL so it can be filtered (?remaining_days__lt=2) and ordered on
+    remaining_days_lookups = ('remaining_days', 'remaining_days__lt', 'remaining_days__lte', 'remaining_days__gt', 'remaining_days__gte')
+
+    def get_queryset(self):
+        qs = super().get_queryset().with_remaining_days()
+        params = self.request.query_params
+
+        try:
+            if params.get('year'):
+                qs = qs.for_year(int(params['year']))
+            lookups = {
+                lookup: int(params[lookup]) for lookup in self.remaining_days_lookups if params.get(lookup)
+            }
+        except ValueError:
+            return qs.none()
+        return qs.filter(**lookups) if lookups else qs
+
+class BalanceSummaryMixin:
+    # Refresh the affected LeaveBalanceSummary rows whenever an allocation/request is written here
+    def get_balance_keys(self, instance):
+        if isinstance(instance, LeaveAllocation):
+            return {allocation_key(instance)}
+        return set(leave_request_usage(instance))
+
+    @transaction.atomic
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        refresh_balance_summaries(self.get_balance_keys(serializer.instance))
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        keys = self.get_balance_keys(serializer.instance)
+        super().perform_update(serializer)
+        refresh_balance_summaries(keys | self.get_balance_keys(serializer.instance))
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        refresh_balance_summaries(self.get_balance_keys(instance))
+
 
 # LeaveType Views
-class LeaveTypeListCreateView(ActiveQuerysetMixin, generics.ListCreateAPIView):
+class LeaveTypeListCreateView(ResponseCacheMixin, ConditionalGetMixin, ActiveQuerysetMixin, generics.ListCreateAPIView):
     queryset = LeaveType.objects.all()
     serializer_class = LeaveTypeSerializer
     permission_classes = [IsHR] 
@@ -35,37 +84,84 @@ class LeaveTypeListCreateView(ActiveQuerysetMixin, generics.ListCreateAPIView):
     ordering_fields = ["name", "created_at"]
     ordering = ["name"]
 
-class LeaveTypeRetrieveUpdateDestroyView(ActiveQuerysetMixin, SoftDeleteMixin, generics.RetrieveUpdateDestroyAPIView):
+class LeaveTypeRetrieveUpdateDestroyView(ConditionalGetMixin, ActiveQuerysetMixin, SoftDeleteMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = LeaveType.objects.all()
     serializer_class = LeaveTypeSerializer
     permission_classes = [IsHR]
 
 
+# Holiday calendar Views
+class HolidayListCreateView(ConditionalGetMixin, ActiveQuerysetMixin, generics.ListCreateAPIView):
+    queryset = HolidayCalendar.objects.all()
+    serializer_class = HolidayCalendarSerializer
+    permission_classes = [HolidayPermissions]
+
+    search_fields = ["name"]
+    ordering_fields = ["date", "name"]
+    ordering = ["date"]
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        year = self.request.query_params.get('year')
+        if year:
+            try:
+                return qs.filter(date__range=(datetime.date(int(year), 1, 1), datetime.date(int(year), 12, 31)))
+            except ValueError:
+                return qs.none()
+        return qs
+
+class HolidayRetrieveUpdateDestroyView(ConditionalGetMixin, ActiveQuerysetMixin, SoftDeleteMixin, generics.RetrieveUpdateDestroyAPIView):
+    queryset = HolidayCalendar.objects.all()
+    serializer_class = HolidayCalendarSerializer
+    permission_classes = [HolidayPermissions]
+
+
 # LeaveAllocation Views
-class LeaveAllocationListCreateView(ActiveQuerysetMixin, generics.ListCreateAPIView):
+class LeaveAllocationListCreateView(ConditionalGetMixin, EagerLoadingViewMixin, BalanceSummaryMixin, AllocationBalanceFilterMixin, ActiveQuerysetMixin, generics.ListCreateAPIView):
     queryset = LeaveAllocation.objects.all()
     serializer_class = LeaveAllocationSerializer
     permission_classes = [LeaveAllocationPermissions]
 
-    filterset_fields = ["employee", "leave_type", "status", "year"]
+    filterset_fields = ["employee", "leave_type", "status", "valid_month"]
     search_fields = ["employee__username", "employee__email", "leave_type__name"]
-    ordering_fields = ["year", "created_at"]
+    ordering_fields = ["valid_month", "remaining_days", "created_at"]
     ordering = ["-created_at"]
 
     def get_queryset(self):
         qs = super().get_queryset()
+        role = get_user_role_name(self.request.user)
         
         # HR can see all allocations
-        if self.request.user.role.name == 'HR':
+        if role == 'HR':
             return qs
         
         # Employees can only see their own allocations
-        if self.request.user.role.name == 'Employee':
+        if role == 'Employee':
             return qs.filter(employee=self.request.user)
         
         return qs.none()
 
-class LeaveAllocationRetrieveUpdateDestroyView(ActiveQuerysetMixin, SoftDeleteMixin, generics.RetrieveUpdateDestroyAPIView):
+class LeaveAllocationProvisionView(generics.GenericAPIView):
+    serializer_class = LeaveAllocationProvisionSerializer
+    permission_classes = [IsHR]
+
+    def post(self, request, *args, **kwargs):
+        # Upsert allocations for every active employee x leave type in one pass
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        leave_types = data.get('leave_types')
+        result = provision_allocations(
+            data['valid_month'],
+            data['allocated_days'],
+            leave_type_ids=[leave_type.id for leave_type in leave_types] if leave_types else None,
+            employee_ids=data.get('employees'),
+            overwrite=data['overwrite'],
+        )
+        return Response({'valid_month': data['valid_month'], **result}, status=status.HTTP_200_OK)
+
+class LeaveAllocationRetrieveUpdateDestroyView(ConditionalGetMixin, EagerLoadingViewMixin, BalanceSummaryMixin, ActiveQuerysetMixin, SoftDeleteMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = LeaveAllocation.objects.all()
     serializer_class = LeaveAllocationSerializer
     permission_classes = [LeaveAllocationPermissions]
@@ -73,7 +169,7 @@ class LeaveAllocationRetrieveUpdateDestroyView(ActiveQuerysetMixin, SoftDeleteMi
 
 
 # LeaveRequest Views
-class LeaveRequestListCreateView(ActiveQuerysetMixin, generics.ListCreateAPIView):
+class LeaveRequestListCreateView(ConditionalGetMixin, AsyncListViewMixin, EagerLoadingViewMixin, PolicyScopedQuerysetMixin, ActiveQuerysetMixin, generics.ListCreateAPIView):
     queryset = LeaveRequest.objects.all()
     serializer_class = LeaveRequestSerializer
     permission_classes = [LeaveRequestPermissions]
@@ -83,36 +179,50 @@ class LeaveRequestListCreateView(ActiveQuerysetMixin, generics.ListCreateAPIView
     ordering_fields = ["start_date", "end_date", "created_at"]
     ordering = ["-created_at"]
 
-    def get_queryset(self):
-        qs = super().get_queryset()
-        role = get_user_role(self.request.user)
-
-        if role == 'SuperAdmin':
-            return qs  
-        if role == 'HR':
-            return qs
-        if role == 'Team Lead':
-            return qs.filter(employee__team=self.request.user.team)
-        if role == 'Employee':
-            return qs.filter(employee=self.request.user)
-
-        return qs.none()
-    
+    @transaction.atomic
     def perform_create(self, serializer):
         role = get_user_role(self.request.user)
-        if role == 'Employee':
-            serializer.save(employee=self.request.user)
-        else:
-            serializer.save()
-
-class LeaveRequestRetrieveUpdateDestroyView(ActiveQuerysetMixin, SoftDeleteMixin, generics.RetrieveUpdateDestroyAPIView):
+        try:
+            if role == 'Employee':
+                serializer.save(employee=self.request.user)
+            else:
+                serializer.save()
+        except IntegrityError as exc:
+            # A concurrent submission won the race past validate(); PostgreSQL's exclusion constraint caught it
+            if LEAVE_OVERLAP_CONSTRAINT not in str(exc):
+                raise
+            raise serializers.ValidationError("These dates overlap another pending or approved leave request")
+        # New requests count as pending until decided
+        apply_status_change(serializer.instance, None)
+
+class LeaveRequestExportView(StreamingExportMixin, LeaveRequestListCreateView):
+    http_method_names = ['get', 'head', 'options']
+    export_filename = 'leave-requests'
+    export_fields = (
+        ('ID', 'id'),
+        ('Employee ID', 'employee_id'),
+        ('Employee Email', 'employee__email'),
+        ('Employee Name', 'employee__username'),
+        ('Team', 'employee__team__name'),
+        ('Leave Type', 'leave_type__name'),
+        ('Start Date', 'start_date'),
+        ('End Date', 'end_date'),
+        ('Days Requested', 'days_requested'),
+        ('Leave Status', 'leave_status'),
+        ('Team Lead Approval', 'team_lead_approval'),
+        ('HR Approval', 'hr_approval'),
+        ('Reason', 'reason'),
+        ('Created At', 'created_at'),
+    )
+
+class LeaveRequestRetrieveUpdateDestroyView(ConditionalGetMixin, EagerLoadingViewMixin, BalanceSummaryMixin, PolicyScopedQuerysetMixin, ActiveQuerysetMixin, SoftDeleteMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = LeaveRequest.objects.all()
     serializer_class = LeaveRequestSerializer
     permission_classes = [LeaveRequestPermissions]
 
 
 # LeaveApproval Views
-class LeaveApprovalListCreateView(ActiveQuerysetMixin, generics.ListCreateAPIView):
+class LeaveApprovalListCreateView(ConditionalGetMixin, EagerLoadingViewMixin, PolicyScopedQuerysetMixin, ActiveQuerysetMixin, generics.ListCreateAPIView):
     queryset = LeaveApproval.objects.all()
     serializer_class = LeaveApprovalSerializer
     permission_classes = [LeaveApprovalPermissions]  
@@ -122,24 +232,6 @@ class LeaveApprovalListCreateView(ActiveQuerysetMixin, generics.ListCreateAPIVie
     ordering_fields = ["created_at", "decision"]
     ordering = ["-created_at"]
 
-
-    def get_queryset(self):
-        qs = super().get_queryset()
-        role = get_user_role(self.request.user)
-
-        if role == 'SuperAdmin':
-            return qs  
-        if role == 'HR':
-            return qs
-        if role == 'Team Lead':
-            return qs.filter(
-                leave_request__employee__team=self.request.user.team
-            )
-        if role == 'Employee':
-            return qs.filter(leave_request__employee=self.request.user)
-
-        return qs.none()
-    
     def create(self, request, *args, **kwargs):
         # Override create to handle approval business logic"""
         serializer = self.get_serializer(data=request.data)
@@ -151,20 +243,25 @@ class LeaveApprovalListCreateView(ActiveQuerysetMixin, generics.ListCreateAPIVie
         notes = serializer.validated_data.get('notes', '')
         
         # Permission checks
+        role = get_user_role_name(request.user)
         if approval_type == ApprovalType.TEAM_LEAD:
-            if request.user.role.name != 'Team Lead':
+            if role != 'Team Lead':
                 return Response({'error': 'Only Team Leads can approve as team lead'}, status=403)
-            if leave_request.employee.team != request.user.team:
+            team_id = get_user_team_id(request.user)
+            if team_id is None or leave_request.employee.team_id != team_id:
                 return Response({'error': 'Can only approve leaves for your team'}, status=403)
-            if leave_request.employee == request.user:
+            if leave_request.employee_id == request.user.pk:
                 return Response({'error': 'Cannot approve your own leave'}, status=403)
         
         elif approval_type == ApprovalType.HR:
-            if request.user.role.name != 'HR':
+            if role != 'HR':
                 return Response({'error': 'Only HR can give final approval'}, status=403)
         
         # Process approval with business logic
-        approval = process_leave_approval(leave_request, request.user, approval_type, decision, notes)
+        try:
+            approval = process_leave_approval(leave_request, request.user, approval_type, decision, notes)
+        except LeaveProcessingError as e:
+            return Response({'error': str(e)}, status=400)
         
         # Return the created approval
         response_serializer = self.get_serializer(approval)
@@ -172,40 +269,39 @@ class LeaveApprovalListCreateView(ActiveQuerysetMixin, generics.ListCreateAPIVie
         return Response(response_serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
 
-class LeaveApprovalRetrieveUpdateDestroyView(ActiveQuerysetMixin, SoftDeleteMixin, generics.RetrieveUpdateDestroyAPIView):
+class LeaveApprovalExportView(StreamingExportMixin, LeaveApprovalListCreateView):
+    http_method_names = ['get', 'head', 'options']
+    export_filename = 'leave-approvals'
+    export_fields = (
+        ('ID', 'id'),
+        ('Leave Request ID', 'leave_request_id'),
+        ('Employee Email', 'leave_request__employee__email'),
+        ('Leave Type', 'leave_request__leave_type__name'),
+        ('Start Date', 'leave_request__start_date'),
+        ('End Date', 'leave_request__end_date'),
+        ('Days Requested', 'leave_request__days_requested'),
+        ('Approved By', 'approved_by__email'),
+        ('Approval Type', 'approval_type'),
+        ('Decision', 'decision'),
+        ('Approval Date', 'approval_date'),
+        ('Notes', 'notes'),
+    )
+
+class LeaveApprovalRetrieveUpdateDestroyView(ConditionalGetMixin, EagerLoadingViewMixin, PolicyScopedQuerysetMixin, ActiveQuerysetMixin, SoftDeleteMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = LeaveApproval.objects.all()
     serializer_class = LeaveApprovalSerializer
     permission_classes = [LeaveApprovalPermissions]
-    
-    def get_queryset(self):
-        qs = super().get_queryset()
-        
-        # HR can see all approvals
-        if self.request.user.role.name == 'HR':
-            return qs
-        
-        # Team Lead can see approvals for their team members' requests
-        if self.request.user.role.name == 'Team Lead':
-            return qs.filter(
-                leave_request__employee__team=self.request.user.team
-            )
-        
-        # Employees can only see approvals for their own requests
-        if self.request.user.role.name == 'Employee':
-            return qs.filter(leave_request__employee=self.request.user)
-        
-        return qs.none()
 
 
 # Employee-specific Lists
-class EmployeeLeaveAllocationListView(ActiveQuerysetMixin, generics.ListAPIView):
+class EmployeeLeaveAllocationListView(ConditionalGetMixin, EagerLoadingViewMixin, AllocationBalanceFilterMixin, ActiveQuerysetMixin, generics.ListAPIView):
     queryset = LeaveAllocation.objects.all()
     serializer_class = LeaveAllocationSerializer
     permission_classes = [LeaveAllocationPermissions]
 
-    filterset_fields = ["leave_type", "status", "year"]
+    filterset_fields = ["leave_type", "status", "valid_month"]
     search_fields = ["leave_type__name", "employee__username", "employee__email"]
-    ordering_fields = ["year", "created_at"]
+    ordering_fields = ["valid_month", "remaining_days", "created_at"]
     ordering = ["-created_at"]
 
 
@@ -213,37 +309,30 @@ class EmployeeLeaveAllocationListView(ActiveQuerysetMixin, generics.ListAPIView)
         employee_id = self.kwargs['employee_id']
         qs = super().get_queryset().filter(employee_id=employee_id)
         
+        role = get_user_role_name(self.request.user)
+        
         # Check if user has permission to view this employee's allocations
-        if (self.request.user.role.name == 'HR' or 
-            (self.request.user.role.name == 'Team Lead' and 
-             self.request.user.team.members.filter(id=employee_id).exists()) or
-            self.request.user.id == employee_id):
+        if role == 'HR' or self.request.user.id == employee_id:
             return qs
+        if role == 'Team Lead':
+            # A lead without a team sees nothing, not everyone whose team is also NULL
+            team_id = get_user_team_id(self.request.user)
+            return qs.filter(employee__team_id=team_id) if team_id is not None else qs.none()
         
         return qs.none()
 
 
-class EmployeeLeaveRequestListView(ActiveQuerysetMixin, generics.ListAPIView):
+class EmployeeLeaveRequestListView(ConditionalGetMixin, AsyncListViewMixin, EagerLoadingViewMixin, PolicyScopedQuerysetMixin, ActiveQuerysetMixin, generics.ListAPIView):
     queryset = LeaveRequest.objects.all()
     serializer_class = LeaveRequestSerializer
     permission_classes = [LeaveRequestPermissions]
 
     def get_queryset(self):
-        employee_id = self.kwargs['employee_id']
-        qs = super().get_queryset().filter(employee_id=employee_id)
-        
-        # Check if user has permission to view this employee's requests
-        if (self.request.user.role.name == 'HR' or 
-            (self.request.user.role.name == 'Team Lead' and 
-             self.request.user.team.members.filter(id=employee_id).exists()) or
-            self.request.user.id == employee_id):
-            return qs
-        
-        return qs.none()
+        return super().get_queryset().filter(employee_id=self.kwargs['employee_id'])
 
 
 # LeaveRequest-specific Approvals
-class LeaveRequestApprovalListView(ActiveQuerysetMixin, generics.ListAPIView):
+class LeaveRequestApprovalListView(ConditionalGetMixin, AsyncListViewMixin, EagerLoadingViewMixin, ActiveQuerysetMixin, generics.ListAPIView):
     queryset = LeaveApproval.objects.all() 
     serializer_class = LeaveApprovalSerializer
     permission_classes = [LeaveApprovalPermissions]
@@ -254,36 +343,27 @@ class LeaveRequestApprovalListView(ActiveQuerysetMixin, generics.ListAPIView):
     ordering = ["-created_at"]
 
     def get_queryset(self):
-        leave_request_id = self.kwargs['leave_request_id']
-        qs = LeaveApproval.objects.filter(status=Status.ACTIVE, leave_request_id=leave_request_id)
-        
-        # Check if user has permission to view this leave request's approvals
-        try:
-            from leaves.models import LeaveRequest
-            leave_request = LeaveRequest.objects.get(id=leave_request_id, status=Status.ACTIVE)
-            
-            # HR can see all
-            if self.request.user.role.name == 'HR':
-                return qs
-            
-            # Team Lead can see if it's from their team
-            if (self.request.user.role.name == 'Team Lead' and 
-                leave_request.employee.team == self.request.user.team):
-                return qs
-            
-            # Employee can see if it's their own request
-            if (self.request.user.role.name == 'Employee' and 
-                leave_request.employee == self.request.user):
-                return qs
-                
-        except LeaveRequest.DoesNotExist:
-            pass
-        
-        return qs.none()
-    
+        leave_request = self.leave_requests().filter(id=self.kwargs['leave_request_id']).first()
+        return self.scope_approvals(leave_request)
+
+    async def aget_queryset(self):
+        leave_request = await self.leave_requests().filter(id=self.kwargs['leave_request_id']).afirst()
+        return self.scope_approvals(leave_request)
+
+    def leave_requests(self):
+        # Selects what LeaveRequestPermissions' rules read, so the check below is in memory
+        return LeaveRequest.objects.select_related(*LeaveRequestPermissions().related_paths()).filter(status=Status.ACTIVE)
+
+    def scope_approvals(self, leave_request):
+        qs = LeaveApproval.objects.filter(status=Status.ACTIVE, leave_request_id=self.kwargs['leave_request_id'])
+        # Visible when the leave request itself is
+        if leave_request is None or not LeaveRequestPermissions().allows(self.request, leave_request, "list"):
+            return qs.none()
+        return qs
+
 
 # User-specific Given Approvals
-class UserGivenApprovalsListView(ActiveQuerysetMixin, generics.ListAPIView):
+class UserGivenApprovalsListView(ConditionalGetMixin, EagerLoadingViewMixin, ActiveQuerysetMixin, generics.ListAPIView):
     queryset = LeaveApproval.objects.all()
     serializer_class = LeaveApprovalSerializer
     permission_classes = [LeaveApprovalPermissions]
@@ -297,16 +377,89 @@ class UserGivenApprovalsListView(ActiveQuerysetMixin, generics.ListAPIView):
     def get_queryset(self):
         user_id = self.kwargs['user_id']
         qs = LeaveApproval.objects.filter(status=Status.ACTIVE, approved_by_id=user_id)
+        role = get_user_role_name(self.request.user)
         
-        if self.request.user.role.name == 'HR':
+        if role == 'HR':
             return qs
         
         # Users can only see their own given approvals
         if self.request.user.id == user_id:
             return qs
         
-        if (self.request.user.role.name == 'Team Lead' and 
-            self.request.user.team.members.filter(id=user_id).exists()):
-            return qs
+        if role == 'Team Lead':
+            # A lead without a team sees nothing, not everyone whose team is also NULL
+            team_id = get_user_team_id(self.request.user)
+            return qs.filter(approved_by__team_id=team_id) if team_id is not None else qs.none()
         
-        return qs.none()
\ No newline at end of file
+        return qs.none()
+
+
+# Leave balance summaries
+class LeaveBalanceSummaryListView(ConditionalGetMixin, AsyncListViewMixin, EagerLoadingViewMixin, generics.ListAPIView):
+    queryset = LeaveBalanceSummary.objects.all()
+    serializer_class = LeaveBalanceSummarySerializer
+    permission_classes = [LeaveBalancePermissions]
+
+    search_fields = ["employee__username", "employee__email", "leave_type__name"]
+    ordering_fields = ["year", "allocated_days", "used_days", "pending_days"]
+    ordering = ["-year", "employee_id", "leave_type_id"]
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        params = self.request.query_params
+
+        try:
+            if params.get('year'):
+                qs = qs.filter(year=int(params['year']))
+            if params.get('team'):
+                qs = qs.filter(employee__team_id=int(params['team']))
+            if params.get('leave_type'):
+                qs = qs.filter(leave_type_id=int(params['leave_type']))
+            if params.get('employee'):
+                qs = qs.filter(employee_id=int(params['employee']))
+        except ValueError:
+            return qs.none()
+
+        role = get_user_role(self.request.user)
+        if role in ('SuperAdmin', 'HR'):
+            return qs
+        if role == 'Team Lead':
+            # A lead without a team sees nothing, not everyone whose team is also NULL
+            team_id = get_user_team_id(self.request.user)
+            return qs.filter(employee__team_id=team_id) if team_id is not None else qs.none()
+        if role == 'Employee':
+            return qs.filter(employee=self.request.user)
+
+        return qs.none()
+
+
+# Team leave calendar
+class LeaveCalendarView(generics.GenericAPIView):
+    permission_classes = [LeaveCalendarPermissions]
+
+    def get(self, request, *args, **kwargs):
+        params = request.query_params
+        try:
+            start = datetime.date.fromisoformat(params.get('from', ''))
+            end = datetime.date.fromisoformat(params.get('to', ''))
+            team_id = int(params['team']) if params.get('team') else None
+        except ValueError:
+            return Response({'error': 'from and to must be YYYY-MM-DD dates and team an id'}, status=400)
+
+        if end < start:
+            return Response({'error': 'to must not be before from'}, status=400)
+        if (end - start).days + 1 > MAX_CALENDAR_DAYS:
+            return Response({'error': f'The window cannot exceed {MAX_CALENDAR_DAYS} days'}, status=400)
+
+        principal = get_principal(request.user)
+        if principal.is_superuser or principal.role_name == 'HR':
+            team_ids = [team_id] if team_id is not None else None
+        else:
+            # Team Leads see the teams they lead (and their own)
+            allowed = set(principal.led_team_ids) | ({principal.team_id} if principal.team_id else set())
+            if team_id is not None and team_id not in allowed:
+                return Response({'error': 'Can only view the calendar of your team'}, status=403)
+            team_ids = [team_id] if team_id is not None else sorted(allowed)
+
+        calendar = absence_calendar(start, end, team_ids)
+        return Response({'team': team_id, 'from': start, 'to': end, **calendar})
@@ -0,0 +1,314 @@
+import datetime
+import functools
+import random
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from users.models import User, Team, UserRole
+from leaves.models import LeaveType, LeaveAllocation, LeaveRequest, LeaveApproval, LeaveBalanceSummary
+from leaves.balances import PENDING_STATUSES
+from leaves.calendar import working_days
+from core.choices import LeaveStatus, ApprovalType, Decision, Status
+from core.principal import invalidate_all_principals
+from core.reference import invalidate_reference
+from core.response_cache import invalidate_model_responses
+
+
+SEED_ROLES = ('HR', 'Team Lead', 'Employee')
+SEED_LEAVE_TYPES = ('Casual', 'Sick', 'Annual')
+SEED_EMAIL_DOMAIN = 'riseuplabs.com'
+FIRST_NAMES = ('Amina', 'Rafi', 'Nadia', 'Tanvir', 'Sadia', 'Imran', 'Farah', 'Karim', 'Lina', 'Omar')
+LAST_NAMES = ('Rahman', 'Hossain', 'Islam', 'Ahmed', 'Chowdhury', 'Khan', 'Sarker', 'Das', 'Roy', 'Uddin')
+
+# Where a request's history ends, with weights. Past requests are decided; future ones may still be open.
+PAST_OUTCOMES = (('hr_approved', 75), ('team_lead_rejected', 10), ('hr_rejected', 7), ('withdrawn', 8))
+FUTURE_OUTCOMES = (('pending', 50), ('team_lead_approved', 25), ('hr_approved', 25))
+
+# outcome -> (leave_status, team_lead_approval, hr_approval, [(approval_type, decision), ...]), replaying the
+# transitions process_leave_approval and withdraw_leave make
+OUTCOMES = {
+    'pending': (LeaveStatus.PENDING, None, None, []),
+    'team_lead_approved': (LeaveStatus.TEAM_LEAD_APPROVED, True, None, [(ApprovalType.TEAM_LEAD, Decision.APPROVE)]),
+    'team_lead_rejected': (LeaveStatus.REJECTED, False, None, [(ApprovalType.TEAM_LEAD, Decision.REJECT)]),
+    'hr_approved': (LeaveStatus.HR_APPROVED, True, True, [
+        (ApprovalType.TEAM_LEAD, Decision.APPROVE), (ApprovalType.HR, Decision.APPROVE),
+    ]),
+    'hr_rejected': (LeaveStatus.REJECTED, True, False, [
+        (ApprovalType.TEAM_LEAD, Decision.APPROVE), (ApprovalType.HR, Decision.REJECT),
+    ]),
+    'withdrawn': (LeaveStatus.WITHDRAWN, True, False, [
+        (ApprovalType.TEAM_LEAD, Decision.APPROVE), (ApprovalType.HR, Decision.APPROVE), (ApprovalType.HR, Decision.WITHDRAW),
+    ]),
+}
+
+# Values of these field types go to the driver as they are; everything else is prepared by its field
+PLAIN_TYPES = {
+    'AutoField', 'BigAutoField', 'ForeignKey', 'IntegerField', 'PositiveIntegerField', 'PositiveSmallIntegerField',
+    'SmallIntegerField', 'BigIntegerField', 'BooleanField', 'CharField', 'TextField', 'EmailField',
+}
+# Generated dates and timestamps repeat heavily (month starts, days at 09:00), so their prepared form is memoized
+MEMOIZED_TYPES = {'DateField', 'DateTimeField'}
+
+
+def month_range(first, last):
+    month = first.replace(day=1)
+    while month <= last:
+        yield month
+        month = (month + datetime.timedelta(days=32)).replace(day=1)
+
+
+def next_id(model):
+    return (model._base_manager.aggregate(top=Max('pk'))['top'] or 0) + 1
+
+
+class RowWriter:
+    # Buffers plain tuples and INSERTs them with executemany. At millions of rows bulk_create spends most of its
+    # time building model instances and compiling every value; here each row is a tuple, only columns that need
+    # it go through get_db_prep_save, and `constants` are prepared once and appended to every row.
+
+    def __init__(self, model, fields, constants=None, batch_size=5000):
+        # The wrapper itself rather than the django.db.connection proxy, which costs a thread-local lookup per value
+        self.connection = connection = connections[DEFAULT_DB_ALIAS]
+        opts = model._meta
+        constants = constants or {}
+        qn = connection.ops.quote_name
+        columns = [opts.get_field(name).column for name in [*fields, *constants]]
+        self.sql = "INSERT INTO %s (%s) VALUES (%s)" % (
+            qn(opts.db_table), ', '.join(qn(column) for column in columns), ', '.join(['%s'] * len(columns)),
+        )
+        self.prepare = []
+        for index, field in enumerate(opts.get_field(name) for name in fields):
+            if field.get_internal_type() in PLAIN_TYPES:
+                continue
+            prepare = functools.partial(field.get_db_prep_save, connection=connection)
+            if field.get_internal_type() in MEMOIZED_TYPES:
+                prepare = functools.lru_cache(maxsize=4096)(prepare)
+            self.prepare.append((index, prepare))
+        self.constants = tuple(
+            opts.get_field(name).get_db_prep_save(value, connection=connection) for name, value in constants.items()
+        )
+        self.batch_size = batch_size
+        self.rows = []
+        self.count = 0
+
+    def add(self, *values):
+        values = list(values)
+        for index, prepare in self.prepare:
+            if values[index] is not None:
+                values[index] = prepare(values[index])
+        self.rows.append(tuple(values) + self.constants)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            with self.connection.cursor() as cursor:
+                cursor.executemany(self.sql, self.rows)
+            self.count += len(self.rows)
+            self.rows = []
+
+
+class OrgSeeder:
+    # Generates a consistent org: HR, teams with leads, employees, monthly allocations for `years` of history
+    # (plus the months ahead), leave requests whose approvals, statuses and used_days agree with each other,
+    # and the matching balance summaries. Employees are written chunk by chunk so memory stays flat.
+    # The same seed and as_of give the same org; only the alias UUIDs differ between runs.
+
+    def __init__(self, teams=10, employees=100, years=1, requests_per_year=6, seed=0, prefix='seed',
+                 as_of=None, chunk_size=1000, batch_size=5000, password_hash=None, log=None):
+        self.teams = max(1, teams)
+        self.employees = employees
+        self.years = max(1, years)
+        self.requests_per_year = requests_per_year
+        self.prefix = prefix
+        self.as_of = as_of or timezone.localdate()
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        # Hashing is the slow part of creating users, so everyone shares one hash computed up front
+        self.password_hash = password_hash or make_password(None)
+        self.log = log or (lambda message: None)
+        self.rng = random.Random(seed)
+        self.allocated_days = settings.DEFAULT_MONTHLY_LEAVE_DAYS
+        self.now = timezone.now()
+
+        first_month = datetime.date(self.as_of.year - self.years + 1, 1, 1)
+        last_month = max(datetime.date(self.as_of.year, 12, 1), (self.as_of + datetime.timedelta(days=92)).replace(day=1))
+        self.months = list(month_range(first_month, last_month))
+        self.counts = {'users': 0, 'teams': 0, 'allocations': 0, 'requests': 0, 'approvals': 0, 'summaries': 0}
+
+    def run(self):
+        self.roles = {name: UserRole.objects.get_or_create(name=name)[0] for name in SEED_ROLES}
+        self.leave_types = [LeaveType.objects.get_or_create(name=name)[0] for name in SEED_LEAVE_TYPES]
+
+        with transaction.atomic():
+            self.hr_users = self.create_users(
+                [self.user(f"hr-{index:03d}", self.roles['HR'], None) for index in range(max(1, self.employees // 500))]
+            )
+            self.team_list = self.create_teams()
+
+        self.user_id = next_id(User)
+        self.request_id = next_id(LeaveRequest)
+        created = 0
+        while created < self.employees:
+            size = min(self.chunk_size, self.employees - created)
+            with transaction.atomic():
+                self.seed_chunk(range(created, created + size))
+            created += size
+            self.log(f"{created}/{self.employees} employees")
+
+        # Rows were inserted with explicit ids, so backends with sequences need them moved past the new rows
+        connection = connections[DEFAULT_DB_ALIAS]
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [User, LeaveRequest]):
+                cursor.execute(sql)
+        return self.counts
+
+    def user(self, suffix, role, team):
+        username = f"{self.prefix}-{suffix}"
+        return User(
+            username=username,
+            email=f"{username}@{SEED_EMAIL_DOMAIN}",
+            first_name=self.rng.choice(FIRST_NAMES),
+            last_name=self.rng.choice(LAST_NAMES),
+            password=self.password_hash,
+            role=role,
+            team=team,
+        )
+
+    def create_users(self, users):
+        created = User.objects.bulk_create(users, batch_size=self.batch_size)
+        self.counts['users'] += len(created)
+        return created
+
+    def create_teams(self):
+        leads = self.create_users([self.user(f"lead-{index:04d}", self.roles['Team Lead'], None) for index in range(self.teams)])
+        teams = Team.objects.bulk_create(
+            [Team(name=f"{self.prefix} team {index + 1:04d}", team_lead=lead) for index, lead in enumerate(leads)],
+            batch_size=self.batch_size,
+        )
+        for lead, team in zip(leads, teams):
+            lead.team = team
+        User.objects.bulk_update(leads, ['team'], batch_size=self.batch_size)
+        self.counts['teams'] += len(teams)
+
+        # bulk_create sends no post_save, so do what the users signal receivers would have done
+        invalidate_all_principals()
+        invalidate_reference(Team)
+        invalidate_model_responses(Team)
+        return teams
+
+    def writers(self):
+        constants = {'created_at': self.now, 'updated_at': self.now}
+        return {
+            'users': RowWriter(User, [
+                'id', 'username', 'email', 'first_name', 'last_name', 'role', 'team', 'alias',
+            ], {
+                'password': self.password_hash, 'is_superuser': False, 'is_staff': False, 'is_active': True,
+                'date_joined': self.now, 'status': Status.ACTIVE, **constants,
+            }, self.batch_size),
+            'requests': RowWriter(LeaveRequest, [
+                'id', 'employee', 'leave_type', 'start_date', 'end_date', 'days_requested', 'days_by_month', 'reason',
+                'team_lead_approval', 'hr_approval', 'approved_by_team_lead', 'approved_by_hr', 'leave_status',
+                'alias', 'created_at', 'updated_at',
+            ], {'status': Status.ACTIVE}, self.batch_size),
+            'approvals': RowWriter(LeaveApproval, [
+                'leave_request', 'approved_by', 'approval_type', 'decision', 'approval_date', 'alias', 'created_at',
+                'updated_at',
+            ], {'status': Status.ACTIVE}, self.batch_size),
+            'allocations': RowWriter(LeaveAllocation, [
+                'employee', 'leave_type', 'valid_month', 'used_days', 'alias',
+            ], {'allocated_days': self.allocated_days, 'status': Status.ACTIVE, **constants}, self.batch_size),
+            'summaries': RowWriter(LeaveBalanceSummary, [
+                'employee', 'leave_type', 'year', 'allocated_days', 'used_days', 'pending_days', 'alias',
+            ], constants, self.batch_size),
+        }
+
+    def pick_dates(self, month, days):
+        # A run of `days` working days starting on a working day, inside the month
+        start = month.replace(day=self.rng.randint(1, 20))
+        while not working_days(start, start):
+            start += datetime.timedelta(days=1)
+        end, counted = start, 1
+        while counted < days:
+            following = end + datetime.timedelta(days=1)
+            if following.month != month.month:
+                break
+            end = following
+            counted += working_days(end, end)
+        return start, end, counted
+
+    def moment(self, day, hours=0):
+        return datetime.datetime(day.year, day.month, day.day, 9, tzinfo=datetime.timezone.utc) + datetime.timedelta(hours=hours)
+
+    def seed_chunk(self, numbers):
+        writers = self.writers()
+        leads = {team.pk: team.team_lead_id for team in self.team_list}
+        employee_role = self.roles['Employee'].pk
+        per_employee = min(len(self.months), self.requests_per_year * self.years) if self.allocated_days else 0
+        months_per_year = {}
+        for month in self.months:
+            months_per_year[month.year] = months_per_year.get(month.year, 0) + 1
+
+        for number in numbers:
+            employee_id = self.user_id
+            self.user_id += 1
+            team = self.team_list[number % len(self.team_list)]
+            username = f"{self.prefix}-{number:07d}"
+            writers['users'].add(
+                employee_id, username, f"{username}@{SEED_EMAIL_DOMAIN}", self.rng.choice(FIRST_NAMES),
+                self.rng.choice(LAST_NAMES), employee_role, team.pk, uuid.uuid4(),
+            )
+
+            used, pending = {}, {}
+            # At most one request per month keeps requests from overlapping and within each month's allocation
+            for month in sorted(self.rng.sample(self.months, per_employee)):
+                leave_type = self.rng.choice(self.leave_types)
+                start, end, days = self.pick_dates(month, self.rng.randint(1, self.allocated_days))
+                table = PAST_OUTCOMES if start < self.as_of else FUTURE_OUTCOMES
+                outcome = self.rng.choices([name for name, _ in table], weights=[weight for _, weight in table])[0]
+                leave_status, team_lead_approval, hr_approval, decisions = OUTCOMES[outcome]
+                team_lead_id = leads[team.pk] if team_lead_approval is not None else None
+                hr_id = self.rng.choice(self.hr_users).pk if hr_approval is not None else None
+
+                # Filed a few days ahead (never after as_of); each decision lands a day after the previous one
+                created_at = self.moment(min(start, self.as_of) - datetime.timedelta(days=self.rng.randint(3, 20)))
+                request_id = self.request_id
+                self.request_id += 1
+                for step, (approval_type, decision) in enumerate(decisions, start=1):
+                    decided_at = created_at + datetime.timedelta(days=step)
+                    writers['approvals'].add(
+                        request_id, team_lead_id if approval_type == ApprovalType.TEAM_LEAD else hr_id,
+                        approval_type, decision, decided_at, uuid.uuid4(), decided_at, decided_at,
+                    )
+                writers['requests'].add(
+                    request_id, employee_id, leave_type.pk, start, end, days, {month.isoformat(): days},
+                    f"{leave_type.name} leave", team_lead_approval, hr_approval, team_lead_id, hr_id, leave_status,
+                    uuid.uuid4(), created_at, created_at + datetime.timedelta(days=len(decisions)),
+                )
+
+                if leave_status == LeaveStatus.HR_APPROVED:
+                    used[(leave_type.pk, month)] = used.get((leave_type.pk, month), 0) + days
+                elif leave_status in PENDING_STATUSES:
+                    pending[(leave_type.pk, month.year)] = pending.get((leave_type.pk, month.year), 0) + days
+
+            for leave_type in self.leave_types:
+                used_by_year = {}
+                for month in self.months:
+                    days = used.get((leave_type.pk, month), 0)
+                    used_by_year[month.year] = used_by_year.get(month.year, 0) + days
+                    writers['allocations'].add(employee_id, leave_type.pk, month, days, uuid.uuid4())
+                for year, month_count in months_per_year.items():
+                    writers['summaries'].add(
+                        employee_id, leave_type.pk, year, month_count * self.allocated_days, used_by_year[year],
+                        pending.get((leave_type.pk, year), 0), uuid.uuid4(),
+                    )
+
+        for name, writer in writers.items():
+            writer.flush()
+            self.counts[name] += writer.count
@@ -1,12 +1,56 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.db import transaction
-from leaves.models import LeaveAllocation
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Greatest
+from leaves.models import LeaveAllocation, LeaveType
 from core.choices import LeaveStatus, ApprovalType, Decision, Status
+from core.principal import get_principal
+from leaves.balances import apply_status_change, leave_request_usage, refresh_balance_summaries
+from leaves.calendar import working_days_by_month
+from leaves.outbox import enqueue_approval_notifications
+from core.metrics import inc
 
+def count_decisions(approvals):
+    # Counted for /metrics once the transaction commits, so rolled-back decisions never show up
+    counts = {}
+    for approval in approvals:
+        key = (approval.approval_type, approval.decision)
+        counts[key] = counts.get(key, 0) + 1
+
+    def record():
+        for (approval_type, decision), count in counts.items():
+            inc('ems_leave_approvals_total', count, approval_type=approval_type, decision=decision)
+
+    transaction.on_commit(record)
+
+
+class LeaveProcessingError(Exception):
+    # Raised inside the approval/withdrawal transaction; nothing from the attempt is committed
+    pass
+
+
+class InsufficientLeaveBalance(LeaveProcessingError):
+    pass
+
+
+def _lock_leave_status(leave_request):
+    # Row lock on the request only, so two approvals of the same request serialize
+    from leaves.models import LeaveRequest
+
+    return LeaveRequest.objects.select_for_update().values_list('leave_status', flat=True).get(pk=leave_request.pk)
+
+
+@transaction.atomic
 def process_leave_approval(leave_request, approved_by, approval_type, decision, notes=""):
-    # Process leave approval and update allocations
+    # Approval record, request status and balance change commit together
     from leaves.models import LeaveApproval
     
+    current_status = _lock_leave_status(leave_request)
+    if approval_type == ApprovalType.HR and current_status == LeaveStatus.HR_APPROVED:
+        raise LeaveProcessingError("Leave request is already HR approved")
+    
     # Create approval record
     approval = LeaveApproval.objects.create(
         leave_request=leave_request,
@@ -17,6 +61,7 @@ def process_leave_approval(leave_request, approved_by, approval_type, decision,
     )
     
     # Update leave request status
+    previous_keys, split_recorded = set(), False
     if approval_type == ApprovalType.TEAM_LEAD:
         leave_request.team_lead_approval = (decision == Decision.APPROVE)
         leave_request.approved_by_team_lead = approved_by
@@ -29,37 +74,118 @@ def process_leave_approval(leave_request, approved_by, approval_type, decision,
         
         # Deduct leave days only when HR approves
         if decision == Decision.APPROVE:
+            previous_keys = set(leave_request_usage(leave_request))
+            split_recorded = record_month_split(leave_request)
             deduct_leave_days(leave_request)
     
     leave_request.save()
+    apply_status_change(leave_request, current_status)
+    if split_recorded:
+        # The pending days were booked under the old split; recompute both sets of rows
+        refresh_balance_summaries(previous_keys | set(leave_request_usage(leave_request)))
+    # Delivered by run_outbox_worker once this transaction commits
+    enqueue_approval_notifications([(approval, leave_request)])
+    count_decisions([approval])
     return approval
 
-def deduct_leave_days(leave_request):
-    # Deduct leave days from allocation
-    month_start = leave_request.start_date.replace(day=1)
-    allocation, created = LeaveAllocation.objects.get_or_create(
-        employee=leave_request.employee,
-        leave_type=leave_request.leave_type,
-        valid_month=month_start,
-        defaults={'allocated_days': 2}  # Default allocation
+def record_month_split(leave_request):
+    # Requests from before days_by_month existed get a calendar split, if it agrees with their day count
+    if leave_request.days_by_month:
+        return False
+    month_days = working_days_by_month(leave_request.start_date, leave_request.end_date)
+    if sum(month_days.values()) != leave_request.days_requested:
+        return False
+    leave_request.days_by_month = {month.isoformat(): days for month, days in month_days.items()}
+    return True
+
+def _lock_month_allocations(leave_request, months, create_missing=False):
+    # Lock the request's allocation rows for every month in one query, creating defaults if asked
+    def locked():
+        return {
+            allocation.valid_month: allocation
+            for allocation in LeaveAllocation.objects.select_for_update().filter(
+                employee_id=leave_request.employee_id,
+                leave_type_id=leave_request.leave_type_id,
+                valid_month__in=months,
+            )
+        }
+
+    allocations = locked()
+    missing = [month for month in months if month not in allocations]
+    if missing and create_missing:
+        LeaveAllocation.objects.bulk_create([
+            LeaveAllocation(
+                employee_id=leave_request.employee_id,
+                leave_type_id=leave_request.leave_type_id,
+                valid_month=month,
+                allocated_days=settings.DEFAULT_MONTHLY_LEAVE_DAYS,
+            )
+            for month in missing
+        ], ignore_conflicts=True)
+        refresh_balance_summaries(
+            {(leave_request.employee_id, leave_request.leave_type_id, month.year) for month in missing}
+        )
+        allocations = locked()
+    return allocations
+
+
+def _shift_used_days(leave_request, deltas):
+    # One UPDATE across all months: used_days += CASE valid_month WHEN ... THEN delta END
+    LeaveAllocation.objects.filter(
+        employee_id=leave_request.employee_id,
+        leave_type_id=leave_request.leave_type_id,
+        valid_month__in=deltas,
+    ).update(
+        used_days=F('used_days') + Case(
+            *[When(valid_month=month, then=Value(delta)) for month, delta in deltas.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        ),
+        updated_at=timezone.now(),
     )
-    allocation.used_days += leave_request.days_requested
-    allocation.save()
 
+def deduct_leave_days(leave_request):
+    # Charge each month its share; the rows stay locked from the balance check to the write
+    months = leave_request.month_days()
+    allocations = _lock_month_allocations(leave_request, months, create_missing=True)
+    short = [
+        month for month, days in sorted(months.items())
+        if month not in allocations
+        or allocations[month].status != Status.ACTIVE
+        or allocations[month].allocated_days - allocations[month].used_days < days
+    ]
+    if short:
+        raise InsufficientLeaveBalance(
+            f"Insufficient leave balance for {', '.join(f'{month:%Y-%m}' for month in short)}"
+        )
+    _shift_used_days(leave_request, months)
+
+def restore_leave_days(leave_request):
+    # Mirror of deduct_leave_days for withdrawals
+    months = leave_request.month_days()
+    allocations = _lock_month_allocations(leave_request, months)
+    missing = [
+        month for month, days in sorted(months.items())
+        if month not in allocations
+        or allocations[month].status != Status.ACTIVE
+        or allocations[month].used_days < days
+    ]
+    if missing:
+        raise LeaveProcessingError(
+            f"No active allocation to restore leave days to for {', '.join(f'{month:%Y-%m}' for month in missing)}"
+        )
+    _shift_used_days(leave_request, {month: -days for month, days in months.items()})
+
+@transaction.atomic
 def withdraw_leave(leave_request, withdrawn_by, notes=""):
     # Withdraw approved leave and restore days
     from leaves.models import LeaveApproval
     
+    if _lock_leave_status(leave_request) != LeaveStatus.HR_APPROVED:
+        raise LeaveProcessingError("Only HR-approved leaves can be withdrawn")
+    
     # Restore leave days
-    month_start = leave_request.start_date.replace(day=1)
-    allocation = LeaveAllocation.objects.get(
-        employee=leave_request.employee,
-        leave_type=leave_request.leave_type,
-        valid_month=month_start,
-        status=Status.ACTIVE
-    )
-    allocation.used_days -= leave_request.days_requested
-    allocation.save()
+    restore_leave_days(leave_request)
     
     # Create withdrawal record
     approval = LeaveApproval.objects.create(
@@ -74,5 +200,261 @@ def withdraw_leave(leave_request, withdrawn_by, notes=""):
     leave_request.leave_status = LeaveStatus.WITHDRAWN
     leave_request.hr_approval = False
     leave_request.save()
+    apply_status_change(leave_request, LeaveStatus.HR_APPROVED)
+    enqueue_approval_notifications([(approval, leave_request)])
+    count_decisions([approval])
     
-    return approval
\ No newline at end of file
+    return approval
+
+
+def approval_permission_error(user, leave_request, approval_type):
+    # Same rules as the single approve endpoint, evaluated from the cached principal
+    principal = get_principal(user)
+    role = principal.role_name if principal else None
+
+    if approval_type == ApprovalType.TEAM_LEAD:
+        if role != 'Team Lead':
+            return 'Only Team Leads can approve as team lead'
+        # A Team Lead without a team leads nobody, including other teamless employees
+        if principal.team_id is None or leave_request.employee.team_id != principal.team_id:
+            return 'Can only approve leaves for your team'
+        if leave_request.employee_id == principal.user_id:
+            return 'Cannot approve your own leave'
+    elif approval_type == ApprovalType.HR:
+        if role != 'HR':
+            return 'Only HR can give final approval'
+    return None
+
+
+@transaction.atomic
+def bulk_process_leave_approvals(leave_request_ids, approved_by, approval_type, decision, notes=""):
+    # Apply one decision to many requests in a constant number of queries; each item fails on its own
+    from leaves.models import LeaveApproval, LeaveRequest
+
+    leave_requests = {
+        leave_request.id: leave_request
+        for leave_request in LeaveRequest.objects.select_for_update(of=('self',))
+        .select_related('employee')
+        .filter(id__in=leave_request_ids, status=Status.ACTIVE)
+    }
+
+    ordered_ids = list(dict.fromkeys(leave_request_ids))
+    results = {}
+    accepted = []
+    for leave_request_id in ordered_ids:
+        leave_request = leave_requests.get(leave_request_id)
+        if leave_request is None:
+            results[leave_request_id] = 'Leave request not found'
+            continue
+        error = approval_permission_error(approved_by, leave_request, approval_type)
+        if error is None and approval_type == ApprovalType.HR and leave_request.leave_status == LeaveStatus.HR_APPROVED:
+            error = 'Leave request is already HR approved'
+        if error:
+            results[leave_request_id] = error
+            continue
+        accepted.append(leave_request)
+
+    previous_keys, split_recorded = set(), False
+    if approval_type == ApprovalType.HR and decision == Decision.APPROVE:
+        for leave_request in accepted:
+            previous_keys.update(leave_request_usage(leave_request))
+            split_recorded = record_month_split(leave_request) or split_recorded
+        accepted = _bulk_deduct_leave_days(accepted, results)
+
+    now = timezone.now()
+    approvals = LeaveApproval.objects.bulk_create([
+        LeaveApproval(
+            leave_request=leave_request,
+            approved_by=approved_by,
+            approval_type=approval_type,
+            decision=decision,
+            notes=notes,
+        )
+        for leave_request in accepted
+    ])
+
+    approved = decision == Decision.APPROVE
+    for leave_request in accepted:
+        if approval_type == ApprovalType.TEAM_LEAD:
+            leave_request.team_lead_approval = approved
+            leave_request.approved_by_team_lead = approved_by
+            leave_request.leave_status = LeaveStatus.TEAM_LEAD_APPROVED if approved else LeaveStatus.REJECTED
+        else:
+            leave_request.hr_approval = approved
+            leave_request.approved_by_hr = approved_by
+            leave_request.leave_status = LeaveStatus.HR_APPROVED if approved else LeaveStatus.REJECTED
+        leave_request.updated_at = now
+
+    status_fields = (
+        ['team_lead_approval', 'approved_by_team_lead'] if approval_type == ApprovalType.TEAM_LEAD
+        else ['hr_approval', 'approved_by_hr']
+    )
+    if split_recorded:
+        status_fields.append('days_by_month')
+    LeaveRequest.objects.bulk_update(accepted, status_fields + ['leave_status', 'updated_at'])
+    refresh_balance_summaries(
+        previous_keys | {key for leave_request in accepted for key in leave_request_usage(leave_request)}
+    )
+
+    enqueue_approval_notifications(zip(approvals, accepted))
+    count_decisions(approvals)
+
+    for leave_request, approval in zip(accepted, approvals):
+        results[leave_request.id] = (leave_request, approval)
+
+    return [
+        {'id': leave_request_id, 'success': False, 'error': results[leave_request_id]}
+        if isinstance(results[leave_request_id], str) else
+        {
+            'id': leave_request_id,
+            'success': True,
+            'leave_status': results[leave_request_id][0].leave_status,
+            'approval_id': results[leave_request_id][1].id,
+        }
+        for leave_request_id in ordered_ids
+    ]
+
+
+def _bulk_deduct_leave_days(leave_requests, results):
+    # Lock every affected allocation in one query, spend balances in request order, write back once
+    month_days = {leave_request.id: leave_request.month_days() for leave_request in leave_requests}
+    keys = {
+        (leave_request.employee_id, leave_request.leave_type_id, month)
+        for leave_request in leave_requests
+        for month in month_days[leave_request.id]
+    }
+    if not keys:
+        return []
+
+    def locked_allocations():
+        candidates = LeaveAllocation.objects.select_for_update().filter(
+            employee_id__in={key[0] for key in keys},
+            leave_type_id__in={key[1] for key in keys},
+            valid_month__in={key[2] for key in keys},
+        )
+        return {
+            (allocation.employee_id, allocation.leave_type_id, allocation.valid_month): allocation
+            for allocation in candidates
+            if (allocation.employee_id, allocation.leave_type_id, allocation.valid_month) in keys
+        }
+
+    allocations = locked_allocations()
+    missing = keys - allocations.keys()
+    if missing:
+        LeaveAllocation.objects.bulk_create([
+            LeaveAllocation(
+                employee_id=employee_id,
+                leave_type_id=leave_type_id,
+                valid_month=valid_month,
+                allocated_days=settings.DEFAULT_MONTHLY_LEAVE_DAYS,
+            )
+            for employee_id, leave_type_id, valid_month in missing
+        ], ignore_conflicts=True)
+        refresh_balance_summaries({(employee_id, leave_type_id, month.year) for employee_id, leave_type_id, month in missing})
+        allocations = locked_allocations()
+
+    now = timezone.now()
+    accepted, changed = [], {}
+    for leave_request in leave_requests:
+        # A request is charged for all of its months or for none of them
+        charges = [
+            (month, days, allocations.get((leave_request.employee_id, leave_request.leave_type_id, month)))
+            for month, days in sorted(month_days[leave_request.id].items())
+        ]
+        short = [
+            month for month, days, allocation in charges
+            if allocation is None
+            or allocation.status != Status.ACTIVE
+            or allocation.used_days + days > allocation.allocated_days
+        ]
+        if short:
+            results[leave_request.id] = f"Insufficient leave balance for {', '.join(f'{month:%Y-%m}' for month in short)}"
+            continue
+        for month, days, allocation in charges:
+            allocation.used_days += days
+            allocation.updated_at = now
+            changed[allocation.pk] = allocation
+        accepted.append(leave_request)
+
+    LeaveAllocation.objects.bulk_update(list(changed.values()), ['used_days', 'updated_at'])
+    return accepted
+
+
+# Roles that take leave; HR and superusers have no team and never apply
+PROVISIONED_ROLES = ("Employee", "Team Lead")
+
+
+def provision_allocations(valid_month, allocated_days, leave_type_ids=None, employee_ids=None,
+                          overwrite=True, chunk_size=1000):
+    # Upsert one allocation per active employee x leave type for the month, chunk by chunk
+    valid_month = valid_month.replace(day=1)
+
+    leave_types = LeaveType.objects.filter(status=Status.ACTIVE)
+    if leave_type_ids is not None:
+        leave_types = leave_types.filter(id__in=leave_type_ids)
+    leave_type_ids = list(leave_types.values_list('id', flat=True))
+
+    employees = get_user_model().objects.filter(
+        status=Status.ACTIVE, is_active=True, is_superuser=False, role__name__in=PROVISIONED_ROLES
+    )
+    if employee_ids is not None:
+        employees = employees.filter(id__in=employee_ids)
+    employee_ids = employees.order_by('id').values_list('id', flat=True)
+
+    result = {'created': 0, 'updated': 0, 'skipped': 0}
+    if not leave_type_ids:
+        return result
+
+    chunk = []
+    employees_per_chunk = max(1, chunk_size // len(leave_type_ids))
+    for employee_id in employee_ids.iterator(chunk_size=employees_per_chunk):
+        chunk.append(employee_id)
+        if len(chunk) == employees_per_chunk:
+            _provision_chunk(chunk, leave_type_ids, valid_month, allocated_days, overwrite, result)
+            chunk = []
+    if chunk:
+        _provision_chunk(chunk, leave_type_ids, valid_month, allocated_days, overwrite, result)
+    return result
+
+
+def _provision_chunk(employee_ids, leave_type_ids, valid_month, allocated_days, overwrite, result):
+    with transaction.atomic():
+        # (employee, leave type) -> (pk, status); locked so used_days can't move under the update below
+        existing = {
+            (employee_id, leave_type_id): (pk, allocation_status)
+            for pk, employee_id, leave_type_id, allocation_status in LeaveAllocation.objects.select_for_update().filter(
+                valid_month=valid_month,
+                employee_id__in=employee_ids,
+                leave_type_id__in=leave_type_ids,
+            ).values_list('pk', 'employee_id', 'leave_type_id', 'status')
+        }
+        allocations = [
+            LeaveAllocation(
+                employee_id=employee_id,
+                leave_type_id=leave_type_id,
+                valid_month=valid_month,
+                allocated_days=allocated_days,
+                status=Status.ACTIVE,
+            )
+            for employee_id in employee_ids
+            for leave_type_id in leave_type_ids
+            if (employee_id, leave_type_id) not in existing
+        ]
+        LeaveAllocation.objects.bulk_create(allocations, ignore_conflicts=True)
+
+        # Overwrite resets active rows only (HR-removed ones stay removed), never below the days already used
+        updated = 0
+        active_ids = [pk for pk, allocation_status in existing.values() if allocation_status == Status.ACTIVE]
+        if overwrite and active_ids:
+            updated = LeaveAllocation.objects.filter(pk__in=active_ids).update(
+                allocated_days=Greatest(Value(allocated_days), F('used_days')),
+                updated_at=timezone.now(),
+            )
+
+        refresh_balance_summaries(
+            (employee_id, leave_type_id, valid_month.year) for employee_id in employee_ids for leave_type_id in leave_type_ids
+        )
+
+    result['created'] += len(allocations)
+    result['updated'] += updated
+    result['skipped'] += len(existing) - updated
@@ -0,0 +1,17 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from leaves.models import HolidayCalendar, LeaveType
+from leaves.calendar import invalidate_holidays
+from core.reference import invalidate_reference
+from core.response_cache import invalidate_model_responses
+
+
+@receiver([post_save, post_delete], sender=HolidayCalendar)
+def invalidate_holiday_tables(sender, instance, **kwargs):
+    invalidate_holidays()
+
+
+@receiver([post_save, post_delete], sender=LeaveType)
+def invalidate_reference_caches(sender, instance, **kwargs):
+    invalidate_reference(sender)
+    invalidate_model_responses(sender)
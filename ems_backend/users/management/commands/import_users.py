@@ -0,0 +1,40 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from users.services import IMPORT_COLUMNS, import_users, missing_import_columns
+
+
+class Command(BaseCommand):
+    help = f"Create users from a CSV file (columns: {', '.join(IMPORT_COLUMNS)}; role/team by name or id)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV file with a header row")
+        parser.add_argument('--dry-run', action='store_true', help="Validate only; nothing is written")
+        parser.add_argument('--batch-size', type=int, default=500, help="Rows validated and inserted per batch")
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Password hashing processes (default: USER_IMPORT_HASH_WORKERS or CPU count)")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1")
+        try:
+            handle = open(options['path'], encoding='utf-8-sig', newline='')
+        except OSError as exc:
+            raise CommandError(f"Cannot read {options['path']}: {exc}")
+
+        with handle:
+            reader = csv.DictReader(handle)
+            missing = missing_import_columns(reader.fieldnames)
+            if missing:
+                raise CommandError(f"Missing column(s): {', '.join(missing)}")
+            report = import_users(
+                reader, batch_size=options['batch_size'], workers=options['workers'], dry_run=options['dry_run']
+            )
+
+        for error in report['errors']:
+            self.stderr.write(f"row {error['row']} ({error['email'] or '-'}): {'; '.join(error['errors'])}")
+        verb = "would be created" if options['dry_run'] else "created"
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['total']} row(s): {report['valid'] if options['dry_run'] else report['created']} {verb}, "
+            f"{report['failed']} failed"
+        ))
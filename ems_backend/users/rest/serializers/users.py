@@ -1,26 +1,39 @@
 from rest_framework import serializers
 from users.models import User, Team, UserRole
 from core.choices import Status
+from users.services import is_company_email
+from core.reference import get_reference
+from core.rest.serializers.core import InstrumentedSerializerMixin, ReferencePrimaryKeyField
 
 
-class UserRoleSerializer(serializers.ModelSerializer):
+class UserRoleSerializer(InstrumentedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = UserRole
         fields = ['id', 'alias', 'name']
 
-class TeamSerializer(serializers.ModelSerializer):
+class UserSummarySerializer(InstrumentedSerializerMixin, serializers.ModelSerializer):
+    # Compact read-only representation used when other resources embed a user
+    class Meta:
+        model = User
+        fields = ['id', 'alias', 'username', 'email', 'first_name', 'last_name', 'team']
+        read_only_fields = fields
+
+class TeamSerializer(InstrumentedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Team
         fields = ['id', 'alias', 'name', 'description', 'team_lead']
 
     def validate_team_lead(self, value):
         # Validate that team lead has appropriate role
-        if value and value.role.name != 'Team Lead':
+        role = get_reference(UserRole, value.role_id) if value and value.role_id else None
+        if value and getattr(role, 'name', None) != 'Team Lead':
             raise serializers.ValidationError("Team lead must have 'Team Lead' role")
         return value
     
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(InstrumentedSerializerMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=False)
+    role = ReferencePrimaryKeyField(model=UserRole, allow_null=True, required=False)
+    team = ReferencePrimaryKeyField(model=Team, allow_null=True, required=False)
     
     class Meta:
         model = User
@@ -33,7 +46,7 @@ class UserSerializer(serializers.ModelSerializer):
         }
     
     def validate_email(self, value):
-        if "riseuplabs" not in value:
+        if not is_company_email(value):
             raise serializers.ValidationError("Email must contain 'riseuplabs'")
         return value
     
@@ -64,3 +77,12 @@ class UserSerializer(serializers.ModelSerializer):
         return instance
     
 
+
+class UserImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    dry_run = serializers.BooleanField(default=False)
+
+    def validate_file(self, value):
+        if not value.name.lower().endswith('.csv'):
+            raise serializers.ValidationError("Upload a .csv file")
+        return value
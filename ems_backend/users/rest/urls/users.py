@@ -3,7 +3,7 @@ from users.rest.views.users import (
     UserRoleListCreateView, UserRoleRetrieveUpdateDestroyView,
     TeamListCreateView, TeamRetrieveUpdateDestroyView,
     UserListCreateView, UserRetrieveUpdateDestroyView,
-    UserTeamListView
+    UserTeamListView, UserImportView
 )
 
 urlpatterns = [
@@ -17,6 +17,7 @@ urlpatterns = [
     
     # User endpoints
     path('', UserListCreateView.as_view(), name='user-list-create'),
+    path('import/', UserImportView.as_view(), name='user-import'),
     path('<int:pk>/', UserRetrieveUpdateDestroyView.as_view(), name='user-detail'),
     path('teams/<int:team_id>/users/', UserTeamListView.as_view(), name='team-users-list'),
 ]
\ No newline at end of file
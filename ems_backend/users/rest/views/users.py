@@ -1,10 +1,17 @@
+import csv
+import io
+from itertools import islice
+
+from django.conf import settings
 from rest_framework import generics, status
 from rest_framework.response import Response
 from users.models import User, Team, UserRole
-from users.rest.serializers.users import UserSerializer, TeamSerializer, UserRoleSerializer
+from users.rest.serializers.users import UserSerializer, TeamSerializer, UserRoleSerializer, UserImportSerializer
+from users.services import import_users, missing_import_columns
 from core.permissions import UserPermissions, TeamPermissions, IsHR
-from core.permissions import get_user_role_name
+from core.permissions import get_user_role_name, get_user_team_id
 from core.choices import Status
+from core.rest.views.core import ConditionalGetMixin, ResponseCacheMixin
 
 
 # Mixins
@@ -20,7 +27,7 @@ class SoftDeleteMixin:
 
 
 # UserRole Views
-class UserRoleListCreateView(ActiveQuerysetMixin, generics.ListCreateAPIView):
+class UserRoleListCreateView(ResponseCacheMixin, ConditionalGetMixin, ActiveQuerysetMixin, generics.ListCreateAPIView):
     queryset = UserRole.objects.all()
     serializer_class = UserRoleSerializer
     permission_classes = [IsHR]
@@ -31,14 +38,14 @@ class UserRoleListCreateView(ActiveQuerysetMixin, generics.ListCreateAPIView):
     ordering_fields = ["name", "created_at"]
 
 
-class UserRoleRetrieveUpdateDestroyView(ActiveQuerysetMixin, SoftDeleteMixin, generics.RetrieveUpdateDestroyAPIView):
+class UserRoleRetrieveUpdateDestroyView(ConditionalGetMixin, ActiveQuerysetMixin, SoftDeleteMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = UserRole.objects.all()
     serializer_class = UserRoleSerializer
     permission_classes = [IsHR]
 
 
 # Team Views
-class TeamListCreateView(ActiveQuerysetMixin, generics.ListCreateAPIView):
+class TeamListCreateView(ResponseCacheMixin, ConditionalGetMixin, ActiveQuerysetMixin, generics.ListCreateAPIView):
     queryset = Team.objects.all()
     serializer_class = TeamSerializer
     permission_classes = [TeamPermissions]
@@ -48,14 +55,14 @@ class TeamListCreateView(ActiveQuerysetMixin, generics.ListCreateAPIView):
     ordering_fields = ["name", "created_at"]
     ordering = ["name"]
 
-class TeamRetrieveUpdateDestroyView(ActiveQuerysetMixin, SoftDeleteMixin, generics.RetrieveUpdateDestroyAPIView):
+class TeamRetrieveUpdateDestroyView(ConditionalGetMixin, ActiveQuerysetMixin, SoftDeleteMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Team.objects.all()
     serializer_class = TeamSerializer
     permission_classes = [TeamPermissions]
 
 
 # User views
-class UserListCreateView(ActiveQuerysetMixin, generics.ListCreateAPIView):
+class UserListCreateView(ConditionalGetMixin, ActiveQuerysetMixin, generics.ListCreateAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [UserPermissions]
@@ -79,7 +86,9 @@ class UserListCreateView(ActiveQuerysetMixin, generics.ListCreateAPIView):
             return qs
 
         if role == "Team Lead":
-            return qs.filter(team=self.request.user.team)
+            # A lead without a team sees nothing, not everyone whose team is also NULL
+            team_id = get_user_team_id(self.request.user)
+            return qs.filter(team_id=team_id) if team_id is not None else qs.none()
 
         if role == "Employee":
             return qs.filter(id=self.request.user.id)
@@ -87,13 +96,43 @@ class UserListCreateView(ActiveQuerysetMixin, generics.ListCreateAPIView):
         return qs.none()
     
 
-class UserRetrieveUpdateDestroyView(ActiveQuerysetMixin, SoftDeleteMixin, generics.RetrieveUpdateDestroyAPIView):
+class UserImportView(generics.GenericAPIView):
+    serializer_class = UserImportSerializer
+    permission_classes = [IsHR]
+
+    def post(self, request, *args, **kwargs):
+        # CSV columns: email, username, first_name, last_name, password, role, team
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        upload = serializer.validated_data['file']
+        reader = csv.DictReader(io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline=''))
+        max_rows = settings.USER_IMPORT_MAX_ROWS
+        try:
+            missing = missing_import_columns(reader.fieldnames)
+            rows = [] if missing else list(islice(reader, max_rows + 1))
+        except (UnicodeDecodeError, csv.Error) as e:
+            return Response({'error': f"Not a readable UTF-8 CSV file: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+        if missing:
+            return Response({'error': f"Missing column(s): {', '.join(missing)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(rows) > max_rows:
+            return Response(
+                {'error': f"At most {max_rows} rows per upload; import larger files with manage.py import_users"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # Hashes in this worker; the process pool is for the management command only
+        report = import_users(rows, workers=1, dry_run=serializer.validated_data['dry_run'])
+        return Response(report, status=status.HTTP_200_OK)
+
+class UserRetrieveUpdateDestroyView(ConditionalGetMixin, ActiveQuerysetMixin, SoftDeleteMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [UserPermissions]
 
 
-class UserTeamListView(ActiveQuerysetMixin, generics.ListAPIView):
+class UserTeamListView(ConditionalGetMixin, ActiveQuerysetMixin, generics.ListAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [UserPermissions]
@@ -108,8 +147,9 @@ class UserTeamListView(ActiveQuerysetMixin, generics.ListAPIView):
         qs = User.objects.filter(status=Status.ACTIVE, team_id=team_id)
         
         # Only allow if user has access to this team
-        if (self.request.user.role.name == 'HR' or 
-            (self.request.user.role.name == 'Team Lead' and self.request.user.team_id == team_id)):
+        role = get_user_role_name(self.request.user)
+        if (role == 'HR' or 
+            (role == 'Team Lead' and get_user_team_id(self.request.user) == team_id)):
             return qs
         
         return qs.none()
\ No newline at end of file
@@ -0,0 +1,200 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from users.models import User, Team, UserRole
+from core.choices import Status
+from core.reference import reference_rows
+
+
+COMPANY_EMAIL_MARKER = "riseuplabs"
+# Columns read from an import file; role and team accept a name or an id
+IMPORT_COLUMNS = ('email', 'username', 'first_name', 'last_name', 'password', 'role', 'team')
+REQUIRED_IMPORT_COLUMNS = ('email', 'username')
+
+
+def is_company_email(email):
+    return COMPANY_EMAIL_MARKER in email
+
+
+def field_errors(name, value):
+    # The model's own validators (max_length included), so an oversized value is a row error, not a DataError
+    try:
+        User._meta.get_field(name).run_validators(value)
+    except ValidationError as e:
+        return [f"{name}: {message}" for message in e.messages]
+    return []
+
+
+def _init_hash_worker():
+    # Spawned workers start without Django; forked ones already have it
+    if not apps.ready:
+        django.setup()
+
+
+def _hash_password(raw_password):
+    return make_password(raw_password)
+
+
+def _lookup(model):
+    # name (case-insensitive) or id -> id, for every active row, from the reference registry
+    lookup = {}
+    for row in reference_rows(model):
+        if row.status == Status.ACTIVE:
+            lookup[row.name.strip().lower()] = row.pk
+            lookup[str(row.pk)] = row.pk
+    return lookup
+
+
+class UserImporter:
+    # CSV onboarding: validate in batches against lookup dicts, hash on a process pool, bulk_create per batch
+
+    def __init__(self, batch_size=500, workers=None, dry_run=False):
+        self.batch_size = batch_size
+        self.workers = workers if workers is not None else getattr(settings, 'USER_IMPORT_HASH_WORKERS', None) or os.cpu_count() or 1
+        self.dry_run = dry_run
+        self.roles = _lookup(UserRole)
+        self.teams = _lookup(Team)
+        self.role_names = {row.pk: row.name for row in reference_rows(UserRole)}
+        self.seen_emails = set()
+        self.seen_usernames = set()
+        self.report = {'total': 0, 'valid': 0, 'created': 0, 'failed': 0, 'errors': []}
+
+    def run(self, rows):
+        pool = ProcessPoolExecutor(self.workers, initializer=_init_hash_worker) if self.workers > 1 and not self.dry_run else None
+        try:
+            batch = []
+            for line, row in enumerate(rows, start=2):  # line 1 is the header
+                batch.append((line, row))
+                if len(batch) >= self.batch_size:
+                    self.import_batch(batch, pool)
+                    batch = []
+            if batch:
+                self.import_batch(batch, pool)
+        finally:
+            if pool:
+                pool.shutdown()
+        return self.report
+
+    def import_batch(self, batch, pool):
+        self.report['total'] += len(batch)
+        cleaned = [(line, self.clean_row(row)) for line, row in batch]
+
+        # One query per batch for clashes with users already in the database
+        candidates = [(line, data) for line, data in cleaned if 'errors' not in data]
+        existing_emails, existing_usernames = set(), set()
+        if candidates:
+            emails = [data['email'] for _, data in candidates]
+            usernames = [data['username'] for _, data in candidates]
+            for email, username in User.objects.filter(Q(email__in=emails) | Q(username__in=usernames)).values_list('email', 'username'):
+                existing_emails.add(email.lower())
+                existing_usernames.add(username)
+
+        valid = []
+        for line, data in cleaned:
+            errors = data.pop('errors', [])
+            if not errors:
+                if data['email'].lower() in existing_emails or data['email'].lower() in self.seen_emails:
+                    errors.append(f"A user with email {data['email']} already exists")
+                if data['username'] in existing_usernames or data['username'] in self.seen_usernames:
+                    errors.append(f"A user with username {data['username']} already exists")
+            if errors:
+                self.fail(line, data.get('email'), errors)
+                continue
+            self.seen_emails.add(data['email'].lower())
+            self.seen_usernames.add(data['username'])
+            valid.append((line, data))
+
+        self.report['valid'] += len(valid)
+        if not valid or self.dry_run:
+            return
+
+        passwords = [data.pop('password') for _, data in valid]
+        hashes = list(pool.map(_hash_password, passwords, chunksize=max(1, len(passwords) // (self.workers * 4)))) if pool else [
+            _hash_password(password) for password in passwords
+        ]
+        users = [User(password=password_hash, **data) for (_, data), password_hash in zip(valid, hashes)]
+
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create(users)
+            self.report['created'] += len(users)
+        except IntegrityError:
+            # Someone created a clashing user meanwhile; fall back to row-by-row for this batch only
+            for (line, data), user in zip(valid, users):
+                try:
+                    with transaction.atomic():
+                        user.save()
+                    self.report['created'] += 1
+                except IntegrityError:
+                    self.fail(line, data['email'], ["A user with this email or username already exists"])
+
+    def clean_row(self, row):
+        row = {key.strip().lower(): (value or '').strip() for key, value in row.items() if key}
+        errors = []
+
+        email = row.get('email', '')
+        if not email:
+            errors.append("email is required")
+        else:
+            try:
+                validate_email(email)
+            except ValidationError:
+                errors.append(f"{email} is not a valid email address")
+            else:
+                errors += field_errors('email', email)
+            if not is_company_email(email):
+                errors.append("Email must contain 'riseuplabs'")
+
+        username = row.get('username', '')
+        if not username:
+            errors.append("username is required")
+        for name in ('username', 'first_name', 'last_name'):
+            if row.get(name):
+                errors += field_errors(name, row[name])
+
+        role_id = team_id = None
+        if row.get('role'):
+            role_id = self.roles.get(row['role'].lower())
+            if role_id is None:
+                errors.append(f"Unknown role {row['role']}")
+        if row.get('team'):
+            team_id = self.teams.get(row['team'].lower())
+            if team_id is None:
+                errors.append(f"Unknown team {row['team']}")
+        if role_id and self.role_names.get(role_id) == 'Employee' and not team_id:
+            errors.append("Employees must belong to a team")
+
+        data = {
+            'email': email,
+            'username': username,
+            'first_name': row.get('first_name', ''),
+            'last_name': row.get('last_name', ''),
+            # No password column means an unusable password until the user resets it
+            'password': row.get('password') or None,
+            'role_id': role_id,
+            'team_id': team_id,
+        }
+        if errors:
+            data['errors'] = errors
+        return data
+
+    def fail(self, line, email, errors):
+        self.report['failed'] += 1
+        self.report['errors'].append({'row': line, 'email': email, 'errors': errors})
+
+
+def missing_import_columns(fieldnames):
+    present = {name.strip().lower() for name in fieldnames or () if name}
+    return [column for column in REQUIRED_IMPORT_COLUMNS if column not in present]
+
+
+def import_users(rows, batch_size=500, workers=None, dry_run=False):
+    return UserImporter(batch_size=batch_size, workers=workers, dry_run=dry_run).run(rows)
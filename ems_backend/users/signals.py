@@ -0,0 +1,25 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from users.models import User, Team, UserRole
+from core.principal import invalidate_principal, invalidate_all_principals
+from core.reference import invalidate_reference
+from core.response_cache import invalidate_model_responses
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_principal(sender, instance, **kwargs):
+    invalidate_principal(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Team)
+@receiver([post_save, post_delete], sender=UserRole)
+def invalidate_role_team_principals(sender, instance, **kwargs):
+    # Role renames and team lead changes touch many principals at once
+    invalidate_all_principals()
+
+
+@receiver([post_save, post_delete], sender=Team)
+@receiver([post_save, post_delete], sender=UserRole)
+def invalidate_reference_caches(sender, instance, **kwargs):
+    invalidate_reference(sender)
+    invalidate_model_responses(sender)